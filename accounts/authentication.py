@@ -0,0 +1,73 @@
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .revocation import denylist
+from .tokens import (
+    NO_USER, VERSION_CLAIM, acached_user, atoken_version, cached_user, claims_user,
+    has_user_claims, token_version,
+)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a per-request user query.
+
+    Tokens from UserRefreshToken carry id, role and is_staff, so request.user
+    is built from the claims once the token's version matches the user's
+    current one (usually an in-process cache hit). Older tokens without
+    those claims fall back to the short-TTL user cache and count as version 0.
+    Tokens revoked one at a time (logout) are caught by the JTI denylist.
+    """
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed("Token contained no recognizable user identification")
+
+    @staticmethod
+    def check_version(validated_token, current):
+        if current == NO_USER:
+            raise exceptions.AuthenticationFailed("User not found or inactive", code="user_not_found")
+        if validated_token.get(VERSION_CLAIM, 0) != current:
+            raise exceptions.AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+    @staticmethod
+    def check_user(user):
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed("User not found or inactive", code="user_not_found")
+        return user
+
+    @staticmethod
+    def check_revoked(revoked):
+        if revoked:
+            raise exceptions.AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        self.check_version(validated_token, token_version(user_id))
+        self.check_revoked(denylist.is_revoked(validated_token[jwt_settings.JTI_CLAIM]))
+        if has_user_claims(validated_token):
+            return claims_user(validated_token)
+        return self.check_user(cached_user(user_id))
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Signature and expiry checks are pure CPU, so they run inline
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        self.check_version(validated_token, await atoken_version(user_id))
+        self.check_revoked(await denylist.ais_revoked(validated_token[jwt_settings.JTI_CLAIM]))
+        if has_user_claims(validated_token):
+            return claims_user(validated_token)
+        return self.check_user(await acached_user(user_id))
@@ -0,0 +1,241 @@
+"""
+Password hashers whose cost comes from settings, plus async helpers that
+run hashing in a bounded thread pool.
+
+PASSWORD_HASH_ALGORITHM picks the hasher new passwords are encoded with
+(settings.PASSWORD_HASHERS lists it first); PASSWORD_HASH_PARAMS sets each
+algorithm's cost, overridden by the JSON file that `calibrate_hashers
+--write` produces (PASSWORD_HASH_PARAMS_FILE). The hashers keep Django's
+algorithm names, so existing hashes still verify; when a stored hash uses
+another algorithm or cost, Django's check_password() re-encodes it with the
+current policy after a successful login.
+
+hashlib's PBKDF2 and scrypt (and argon2-cffi) release the GIL, so under
+ASGI the async helpers hash on PASSWORD_HASH_THREADS worker threads without
+blocking the event loop or the single thread sync_to_async uses by default.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+DEFAULT_PARAMS = {
+    "pbkdf2": {"iterations": hashers.PBKDF2PasswordHasher.iterations},
+    "scrypt": {"work_factor": 2**14, "block_size": 8, "parallelism": 1},
+    "argon2": {"time_cost": 2, "memory_cost": 65536, "parallelism": 1},
+}
+# The cheapest valid costs, for benchmarks that want hashing out of the way
+MINIMUM_PARAMS = {
+    "pbkdf2": {"iterations": 1},
+    "scrypt": {"work_factor": 2, "block_size": 1, "parallelism": 1},
+    "argon2": {"time_cost": 1, "memory_cost": 8, "parallelism": 1},
+}
+
+_file_params = {}
+_file_lock = threading.Lock()
+_overrides = {}
+
+
+def _params_file():
+    path = getattr(settings, "PASSWORD_HASH_PARAMS_FILE", None)
+    if not path or not os.path.exists(path):
+        return {}
+    mtime = os.path.getmtime(path)
+    cached = _file_params.get(str(path))
+    if cached is None or cached[0] != mtime:
+        with _file_lock, open(path) as f:
+            cached = (mtime, json.load(f))
+            _file_params[str(path)] = cached
+    return cached[1]
+
+
+def hash_params(algorithm):
+    """
+    Cost parameters for an algorithm: defaults < settings < calibration file
+    < cost_override().
+    """
+    params = dict(DEFAULT_PARAMS[algorithm])
+    params.update(getattr(settings, "PASSWORD_HASH_PARAMS", {}).get(algorithm, {}))
+    params.update(_params_file().get(algorithm, {}))
+    params.update(_overrides.get(algorithm, {}))
+    return params
+
+
+@contextmanager
+def cost_override(params):
+    """
+    Hash with these costs ({algorithm: params}) in every thread inside the
+    block. For benchmarks that drive the views in process; never for serving.
+    """
+    global _overrides
+    saved = _overrides
+    _overrides = {**saved, **params}
+    try:
+        yield
+    finally:
+        _overrides = saved
+
+
+class TunedHasherMixin:
+    """Costs from hash_params(), or the params passed in (calibration)."""
+    tuned_algorithm = None
+
+    def __init__(self, params=None):
+        self.params = None if params is None else {**DEFAULT_PARAMS[self.tuned_algorithm], **params}
+
+    def tuned(self, name):
+        return (self.params or hash_params(self.tuned_algorithm))[name]
+
+
+class TunedPBKDF2PasswordHasher(TunedHasherMixin, hashers.PBKDF2PasswordHasher):
+    tuned_algorithm = "pbkdf2"
+
+    @property
+    def iterations(self):
+        return self.tuned("iterations")
+
+
+class TunedScryptPasswordHasher(TunedHasherMixin, hashers.ScryptPasswordHasher):
+    tuned_algorithm = "scrypt"
+
+    @property
+    def work_factor(self):
+        return self.tuned("work_factor")
+
+    @property
+    def block_size(self):
+        return self.tuned("block_size")
+
+    @property
+    def parallelism(self):
+        return self.tuned("parallelism")
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        # OpenSSL refuses more than 32 MiB by default; scrypt needs ~128 * r * n
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash_)
+
+
+class TunedArgon2PasswordHasher(TunedHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2id; needs argon2-cffi (pip install argon2-cffi)."""
+    tuned_algorithm = "argon2"
+
+    @property
+    def time_cost(self):
+        return self.tuned("time_cost")
+
+    @property
+    def memory_cost(self):
+        return self.tuned("memory_cost")
+
+    @property
+    def parallelism(self):
+        return self.tuned("parallelism")
+
+
+HASHERS = {
+    "pbkdf2": TunedPBKDF2PasswordHasher,
+    "scrypt": TunedScryptPasswordHasher,
+    "argon2": TunedArgon2PasswordHasher,
+}
+
+
+def argon2_available():
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def time_hash(hasher, rounds=5):
+    """Median seconds to encode one password with the hasher's current params."""
+    salt = hasher.salt()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.encode("calibration-password", salt)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+# ----------------------------------------------------------------------------
+# Async helpers
+# ----------------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, "PASSWORD_HASH_THREADS", None) or os.cpu_count() or 1
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    return _pool
+
+
+async def run_hasher(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(hash_pool(), fn, *args)
+
+
+def _verify(password, encoded):
+    """(valid, new hash or None): the hashing half of check_password()."""
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, None
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False, None
+    preferred = hashers.get_hasher("default")
+    valid = hasher.verify(password, encoded)
+    if not valid:
+        return False, None
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, hashers.make_password(password)
+    return True, None
+
+
+async def acheck_password(user, password):
+    """
+    user.check_password() for async views: hashing runs in the pool and an
+    outdated hash is re-encoded and saved without going through User.save().
+    """
+    valid, upgraded = await run_hasher(_verify, password, user.password)
+    if upgraded is not None:
+        user.password = upgraded
+        await type(user)._default_manager.filter(pk=user.pk).aupdate(password=upgraded)
+        from .tokens import forget_user
+        forget_user(user.pk)
+    return valid
+
+
+async def aauthenticate(email, password):
+    """ModelBackend.authenticate() for async views, hashing in the pool."""
+    from .models import User
+    user = await User._default_manager.filter(email=email).afirst() if email else None
+    if user is None:
+        # Hash anyway so a missing account takes as long as a wrong password
+        await run_hasher(hashers.make_password, password)
+        return None
+    if await acheck_password(user, password) and user.is_active:
+        return user
+    return None
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts import referrals
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the referral closure table from User.refer_by. Run after "
+        "importing users without signals (bulk_create)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        total = referrals.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Referral tree rebuilt with {total} paths."))
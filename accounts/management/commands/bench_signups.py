@@ -0,0 +1,91 @@
+import json
+import statistics
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+
+from accounts.hashers import MINIMUM_PARAMS, cost_override
+from accounts.models import User
+from core import ratelimit
+from core.database import describe
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure signup write throughput with parallel clients against the "
+        "configured database. Run once per DB_* profile to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--signups", type=int, default=400, help="Total signups across all threads.")
+        parser.add_argument(
+            "--real-hasher", action="store_true",
+            help="Keep the configured hashing cost (by default the minimum isolates database cost).",
+        )
+        parser.add_argument("--keep", action="store_true", help="Do not delete the benchmark users.")
+        parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+
+    def worker(self, run_id, indexes, latencies, errors):
+        client = Client(HTTP_HOST="localhost")
+        try:
+            for i in indexes:
+                started = time.perf_counter()
+                response = client.post("/api/auth/sign-up/", {
+                    "full_name": f"Bench User {i}",
+                    "email_address": f"bench-{run_id}-{i}@example.com",
+                    "password": "Bench-pass-2024!",
+                    "confirm_password": "Bench-pass-2024!",
+                    "role": "viewer",
+                    "terms_agreed": True,
+                }, content_type="application/json")
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 201:
+                    errors.append(response.content.decode()[:200])
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        threads, total = options["threads"], options["signups"]
+        run_id = uuid.uuid4().hex[:8]
+        latencies, errors = [], []
+
+        with ratelimit.paused(), nullcontext() if options["real_hasher"] else cost_override(MINIMUM_PARAMS):
+            workers = [
+                threading.Thread(target=self.worker, args=(run_id, range(t, total, threads), latencies, errors))
+                for t in range(threads)
+            ]
+            started = time.perf_counter()
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            elapsed = time.perf_counter() - started
+
+        if not options["keep"]:
+            User.objects.filter(email__startswith=f"bench-{run_id}-").delete()
+
+        latencies.sort()
+        ok = total - len(errors)
+        result = {
+            "profile": describe(connection.settings_dict),
+            "threads": threads,
+            "signups": total,
+            "succeeded": ok,
+            "failed": len(errors),
+            "seconds": round(elapsed, 3),
+            "signups_per_sec": round(ok / elapsed, 1) if elapsed else None,
+            "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+            "sample_error": errors[0] if errors else None,
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(result))
+            return
+        for key, value in result.items():
+            self.stdout.write(f"{key:>16}: {value}")
@@ -0,0 +1,99 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.hashers import HASHERS, argon2_available, hash_params, time_hash
+
+
+def measure(algorithm, params, rounds):
+    # Only the candidate parameters, not the current calibration file
+    return time_hash(HASHERS[algorithm](params=params), rounds)
+
+
+class Command(BaseCommand):
+    help = (
+        "Find the strongest cost for each password hasher that stays within a "
+        "per-login latency budget on this machine, and optionally write it to "
+        "PASSWORD_HASH_PARAMS_FILE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=100.0, help="Target hashing time per login.")
+        parser.add_argument(
+            "--algorithms", default="pbkdf2,scrypt,argon2",
+            help="Comma-separated subset of: pbkdf2, scrypt, argon2.",
+        )
+        parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+        parser.add_argument("--rounds", type=int, default=3, help="Timed hashes per candidate (median is used).")
+        parser.add_argument("--write", action="store_true", help="Write the result to PASSWORD_HASH_PARAMS_FILE.")
+        parser.add_argument("--output", help="Write the result to this path instead.")
+
+    def handle(self, *args, **options):
+        budget = options["budget_ms"] / 1000
+        rounds = options["rounds"]
+        result = {}
+        for algorithm in [a.strip() for a in options["algorithms"].split(",") if a.strip()]:
+            if algorithm not in HASHERS:
+                raise CommandError(f"Unknown algorithm '{algorithm}'.")
+            if algorithm == "argon2" and not argon2_available():
+                self.stdout.write("argon2: skipped, argon2-cffi is not installed.")
+                continue
+            calibrate = getattr(self, f"calibrate_{algorithm}")
+            params, seconds = calibrate(budget, rounds, options)
+            result[algorithm] = params
+            self.stdout.write(
+                f"{algorithm}: {params} -> {seconds * 1000:.1f} ms per login, "
+                f"{1 / seconds:.1f} logins/sec per core"
+            )
+
+        path = options["output"] or (settings.PASSWORD_HASH_PARAMS_FILE if options["write"] else None)
+        if path:
+            with open(path, "w") as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
+        else:
+            self.stdout.write(json.dumps(result, indent=2))
+
+    def calibrate_pbkdf2(self, budget, rounds, options):
+        # Cost is linear in iterations: scale from one probe, then check
+        probe = 100_000
+        seconds = measure("pbkdf2", {"iterations": probe}, rounds)
+        iterations = max(10_000, int(probe * budget / seconds) // 10_000 * 10_000)
+        params = {"iterations": iterations}
+        return params, measure("pbkdf2", params, rounds)
+
+    def calibrate_scrypt(self, budget, rounds, options):
+        # work_factor must be a power of two; memory grows with it (128 * r * n)
+        base = hash_params("scrypt")
+        best = None
+        work_factor = 2 ** 12
+        while work_factor <= 2 ** 20:
+            params = {"work_factor": work_factor, "block_size": base["block_size"], "parallelism": base["parallelism"]}
+            seconds = measure("scrypt", params, rounds)
+            if best is not None and seconds > budget:
+                break
+            best = (params, seconds)
+            work_factor *= 2
+        return best
+
+    def calibrate_argon2(self, budget, rounds, options):
+        memory = options["argon2_memory_kib"]
+        base = hash_params("argon2")
+        # Less memory only if a single pass is already over budget
+        while True:
+            params = {"time_cost": 1, "memory_cost": memory, "parallelism": base["parallelism"]}
+            seconds = measure("argon2", params, rounds)
+            if seconds <= budget or memory <= 8192:
+                break
+            memory //= 2
+        best = (params, seconds)
+        time_cost = 2
+        while time_cost <= 20:
+            params = dict(best[0], time_cost=time_cost)
+            seconds = measure("argon2", params, rounds)
+            if seconds > budget:
+                break
+            best = (params, seconds)
+            time_cost += 1
+        return best
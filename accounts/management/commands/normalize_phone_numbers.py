@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.phones import InvalidPhoneNumber, normalize_many
+from accounts.tokens import forget_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate and normalize stored user phone numbers in batches, e.g. "
+        "after a bulk import. Invalid numbers are reported, not changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="Report only; do not save.")
+
+    def handle(self, *args, **options):
+        users = (
+            User.objects.exclude(phone_country_code__isnull=True).exclude(phone_country_code="")
+            .exclude(phone_number__isnull=True).exclude(phone_number="")
+            .only("pk", "phone_country_code", "phone_number").order_by("pk")
+        )
+        checked = changed = invalid = 0
+        batch = []
+        for user in users.iterator(chunk_size=options["batch_size"]):
+            batch.append(user)
+            if len(batch) >= options["batch_size"]:
+                counts = self.process(batch, options["dry_run"])
+                checked, changed, invalid = checked + len(batch), changed + counts[0], invalid + counts[1]
+                batch = []
+        if batch:
+            counts = self.process(batch, options["dry_run"])
+            checked, changed, invalid = checked + len(batch), changed + counts[0], invalid + counts[1]
+
+        verb = "would change" if options["dry_run"] else "changed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} numbers: {verb} {changed}, {invalid} invalid."))
+
+    def process(self, users, dry_run):
+        results = normalize_many((user.phone_country_code, user.phone_number) for user in users)
+        updates, invalid = [], 0
+        for user, result in zip(users, results):
+            if isinstance(result, InvalidPhoneNumber):
+                invalid += 1
+                self.stderr.write(f"{user.pk}: {result.message}")
+                continue
+            if (user.phone_country_code, user.phone_number) != (result.country_code, result.national):
+                user.phone_country_code, user.phone_number = result.country_code, result.national
+                updates.append(user)
+        if updates and not dry_run:
+            # bulk_update skips save(): phone fields do not affect tokens or
+            # referrals, only the cached user rows
+            User.objects.bulk_update(updates, ["phone_country_code", "phone_number"])
+            for user in updates:
+                forget_user(user.pk)
+        return len(updates), invalid
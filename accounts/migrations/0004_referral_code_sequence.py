@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:11
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of accounts.referral_codes as of this migration, so later
+# changes to the live allocator cannot change what it writes
+SEQUENCE_NAME = "referral_code"
+ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+CODE_LENGTH = 8
+HALF_BITS = 5 * CODE_LENGTH // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+def code_for(number, key):
+    left, right = number >> HALF_BITS, number & HALF_MASK
+    for i in range(ROUNDS):
+        data = i.to_bytes(1, "big") + right.to_bytes(4, "big")
+        digest = hashlib.blake2b(data, key=key, digest_size=4).digest()
+        left, right = right, left ^ (int.from_bytes(digest, "big") & HALF_MASK)
+    number = (left << HALF_BITS) | right
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, digit = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def backfill_referral_codes(apps, schema_editor):
+    """
+    Existing codes are kept as they are: users have already shared them, and
+    the allocator skips any number whose code is taken. Users without a code
+    get one from the sequence.
+    """
+    User = apps.get_model("accounts", "User")
+    ReferralCodeSequence = apps.get_model("accounts", "ReferralCodeSequence")
+    db = schema_editor.connection.alias
+    secret = getattr(settings, "REFERRAL_CODE_KEY", None) or settings.SECRET_KEY
+    key = hashlib.blake2b(secret.encode("utf-8"), digest_size=32).digest()
+    taken = set(User.objects.using(db).exclude(referral_code=None).exclude(referral_code="").values_list("referral_code", flat=True))
+    number = 0
+    missing = User.objects.using(db).filter(models.Q(referral_code=None) | models.Q(referral_code=""))
+    for user in missing.only("pk").iterator(chunk_size=500):
+        while code_for(number, key) in taken:
+            number += 1
+        User.objects.using(db).filter(pk=user.pk).update(referral_code=code_for(number, key))
+        number += 1
+    ReferralCodeSequence.objects.using(db).update_or_create(name=SEQUENCE_NAME, defaults={"next_value": number})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralCodeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_referral_codes, migrations.RunPython.noop),
+    ]
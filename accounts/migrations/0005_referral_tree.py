@@ -0,0 +1,73 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:13
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_referral_tree(apps, schema_editor):
+    """
+    A frozen copy of accounts.referrals.rebuild as of this migration: one
+    closure row per (ancestor, descendant) pair from refer_by, so existing
+    users have their tree without running backfill_referral_tree. Users on
+    a refer_by cycle are treated as roots.
+    """
+    User = apps.get_model("accounts", "User")
+    ReferralPath = apps.get_model("accounts", "ReferralPath")
+    db = schema_editor.connection.alias
+    parents = dict(User.objects.using(db).values_list("pk", "refer_by_id").iterator(chunk_size=5000))
+    children = defaultdict(list)
+    roots = []
+    for user_id, parent_id in parents.items():
+        if parent_id is None or parent_id not in parents:
+            roots.append(user_id)
+        else:
+            children[parent_id].append(user_id)
+
+    batch = []
+    seen = set()
+    pending = list(roots)
+    while True:
+        while pending:
+            root = pending.pop()
+            stack = [(root, [root])]
+            while stack:
+                node, path = stack.pop()
+                seen.add(node)
+                for depth, ancestor in enumerate(reversed(path)):
+                    batch.append(ReferralPath(ancestor_id=ancestor, descendant_id=node, depth=depth))
+                if len(batch) >= 5000:
+                    ReferralPath.objects.using(db).bulk_create(batch)
+                    batch = []
+                stack.extend((child, path + [child]) for child in children[node] if child not in seen)
+        rest = [user_id for user_id in parents if user_id not in seen]
+        if not rest:
+            break
+        pending = rest[:1]
+    ReferralPath.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_referral_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='referral_descendants', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='referral_ancestors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'depth'], name='referral_path_depth_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='referral_path_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_referral_tree, migrations.RunPython.noop),
+    ]
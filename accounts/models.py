@@ -1,11 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import shortuuid
-import phonenumbers
-from phonenumbers.phonenumberutil import NumberParseException
 from django.core.exceptions import ValidationError
+from .phones import InvalidPhoneNumber, normalize as normalize_phone
 
 # ============================
 # Custom User Manager
@@ -75,6 +75,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
     terms_agreed = models.BooleanField(default=False)
+    # Bumped when the password, role or access flags change; tokens carry the
+    # version they were issued with (see accounts.tokens)
+    token_version = models.PositiveIntegerField(default=0)
 
     refer_by = models.ForeignKey(
         'self',
@@ -104,23 +107,122 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def clean(self):
         if self.phone_country_code and self.phone_number:
-            cc = self.phone_country_code.lstrip("+").strip()
-            pn = self.phone_number.strip()
             try:
-                parsed = phonenumbers.parse(f"+{cc}{pn}", None)
-            except NumberParseException:
-                raise ValidationError({"phone_number": "Invalid phone number format."})
-
-            if not phonenumbers.is_valid_number(parsed):
-                raise ValidationError({"phone_number": "Invalid phone number for the given country code."})
+                normalize_phone(self.phone_country_code, self.phone_number)
+            except InvalidPhoneNumber as e:
+                raise ValidationError(e.as_dict())
+
+        if self._refer_by_changed():
+            from .referrals import check_parent
+            check_parent(self, self.refer_by_id)
+
+    # Fields whose change invalidates issued tokens, besides the password
+    TOKEN_FIELDS = ("role", "is_staff", "is_active")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = {name: instance.__dict__[name] for name in cls.TOKEN_FIELDS if name in instance.__dict__}
+        # The referrer as loaded, so a change can relink the referral tree
+        instance._loaded_refer_by_id = instance.__dict__.get("refer_by_id", DEFERRED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A user built from token claims loads the rest of its row from the
+        # user cache in one go instead of one query per deferred field
+        if fields is not None and getattr(self, "_from_claims", False):
+            from .tokens import fill_claims_user
+            if fill_claims_user(self):
+                return
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def _token_fields_changed(self):
+        if self._password is not None:
+            return True
+        state = getattr(self, "_token_state", {})
+        return any(self.__dict__.get(name, value) != value for name, value in state.items())
+
+    def _refer_by_changed(self):
+        loaded = getattr(self, "_loaded_refer_by_id", DEFERRED)
+        return not self._state.adding and loaded is not DEFERRED and loaded != self.refer_by_id
 
     def save(self, *args, **kwargs):
+        if self._refer_by_changed():
+            # Before the row is written, so a cycle never reaches the table
+            from .referrals import check_parent
+            check_parent(self, self.refer_by_id)
+
         if not self.referral_code:
-            self.referral_code = self.generate_unique_referral_code()
+            from .referral_codes import allocate_referral_code
+            self.referral_code = allocate_referral_code()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "referral_code"}
+
+        revoke = not self._state.adding and self._token_fields_changed()
+        if revoke:
+            self.token_version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "token_version"}
         super().save(*args, **kwargs)
+        self._token_state = {name: self.__dict__[name] for name in self.TOKEN_FIELDS if name in self.__dict__}
+
+        from .tokens import NO_USER, forget_user, publish_token_version
+        if revoke:
+            version = self.token_version if self.is_active else NO_USER
+            transaction.on_commit(lambda: publish_token_version(self.pk, version))
+        else:
+            transaction.on_commit(lambda: forget_user(self.pk))
+
+
+# ============================
+# Referral Tree
+# ============================
+class ReferralPath(models.Model):
+    """
+    Closure table over User.refer_by: one row per ancestor/descendant pair,
+    including each user to itself at depth 0. Maintained by accounts.referrals.
+    """
+    # The unique constraint's index leads with ancestor
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="referral_descendants", db_index=False)
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="referral_ancestors")
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="referral_path_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "depth"], name="referral_path_depth_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
 
-    def generate_unique_referral_code(self):
-        while True:
-            code = shortuuid.ShortUUID().random(length=8).upper()
-            if not User.objects.filter(referral_code=code).exists():
-                return code
+# ============================
+# Referral Code Sequence
+# ============================
+class ReferralCodeSequence(models.Model):
+    """Next unreserved number for a code allocator (see accounts.referral_codes)."""
+    name = models.CharField(primary_key=True, max_length=50)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+# ============================
+# Revoked Tokens
+# ============================
+class RevokedToken(models.Model):
+    """
+    Denylisted JWT ids (logout, rotated refresh tokens). Rows are only needed
+    until the token would have expired anyway; see accounts.revocation.
+    """
+    jti = models.CharField(primary_key=True, max_length=64)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="revoked_tokens")
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
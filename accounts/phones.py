@@ -0,0 +1,93 @@
+"""
+Phone number normalization shared by UserSerializer and User.clean.
+
+The set of country calling codes is built once at import. Results (valid or
+not) are memoized per (country code, number) pair in a bounded LRU, so
+repeated profile saves and imports with repeated numbers skip libphonenumber
+entirely. normalize_many() validates a batch, parsing each distinct pair once.
+"""
+from collections import namedtuple
+
+import phonenumbers
+from django.conf import settings
+from phonenumbers.phonenumberutil import NumberParseException
+
+from core.lru import LRUCache
+
+COUNTRY_CODES = frozenset(phonenumbers.supported_calling_codes())
+# Characters dropped from the national format before storage
+_NATIONAL_STRIP = str.maketrans("", "", " -")
+
+PhoneNumber = namedtuple("PhoneNumber", ["country_code", "national", "e164"])
+
+_cache = LRUCache(maxsize=getattr(settings, "PHONE_NORMALIZE_CACHE_SIZE", 50000))
+
+
+class InvalidPhoneNumber(ValueError):
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+    def as_dict(self):
+        return {self.field: self.message}
+
+
+def _normalize(cc, pn):
+    if not cc.isdigit():
+        return InvalidPhoneNumber("phone_country_code", "Country code must be numeric.")
+    if int(cc) not in COUNTRY_CODES:
+        return InvalidPhoneNumber("phone_country_code", "Invalid country calling code.")
+    try:
+        parsed = phonenumbers.parse(f"+{cc}{pn}", None)
+    except NumberParseException:
+        return InvalidPhoneNumber("phone_number", "Invalid phone number format.")
+    if not phonenumbers.is_valid_number(parsed):
+        return InvalidPhoneNumber("phone_number", "Invalid phone number for the given country code.")
+    national = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
+    return PhoneNumber(
+        country_code=str(parsed.country_code),
+        national=national.translate(_NATIONAL_STRIP),
+        e164=phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164),
+    )
+
+
+def _lookup(cc, pn):
+    key = (cc.lstrip("+").strip(), pn.strip())
+    result = _cache.get(key)
+    if result is None:
+        result = _normalize(*key)
+        _cache.set(key, result)
+    return result
+
+
+def _unshared(result):
+    # Exceptions carry per-raise state (traceback, context); the cached
+    # instance is shared between callers, so each gets its own copy
+    if isinstance(result, InvalidPhoneNumber):
+        return InvalidPhoneNumber(result.field, result.message)
+    return result
+
+
+def normalize(country_code, phone_number):
+    """PhoneNumber for the pair, or raises InvalidPhoneNumber."""
+    result = _unshared(_lookup(country_code, phone_number))
+    if isinstance(result, InvalidPhoneNumber):
+        raise result
+    return result
+
+
+def normalize_many(pairs):
+    """
+    For (country_code, phone_number) pairs, a list in the same order of
+    PhoneNumber or InvalidPhoneNumber (returned, not raised).
+    """
+    seen = {}
+    results = []
+    for country_code, phone_number in pairs:
+        key = (country_code, phone_number)
+        result = seen.get(key)
+        if result is None:
+            result = seen[key] = _lookup(country_code, phone_number)
+        results.append(_unshared(result))
+    return results
@@ -0,0 +1,121 @@
+"""
+Collision-free referral codes.
+
+Each process reserves a block of sequence numbers with one UPDATE on
+ReferralCodeSequence, then hands them out from memory. A number becomes a
+code through a keyed Feistel permutation of the 40-bit space and base-32
+encoding into 8 characters, so codes look random but two different numbers
+can never produce the same code. A signup needs no query for its code.
+
+Codes issued before the allocator (random 8-character strings) stay valid.
+Every new block is checked against existing codes once, and the few numbers
+whose code is already taken are skipped; the same check keeps uniqueness if
+REFERRAL_CODE_KEY ever changes.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+# No 0/1/I/O, so codes survive being read out or typed
+ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+CODE_LENGTH = 8
+BITS = 5 * CODE_LENGTH
+HALF_BITS = BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+SEQUENCE_NAME = "referral_code"
+
+
+def _key():
+    key = getattr(settings, "REFERRAL_CODE_KEY", None) or settings.SECRET_KEY
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=32).digest()
+
+
+def _round(value, round_index, key):
+    data = round_index.to_bytes(1, "big") + value.to_bytes(4, "big")
+    digest = hashlib.blake2b(data, key=key, digest_size=4).digest()
+    return int.from_bytes(digest, "big") & HALF_MASK
+
+
+def permute(number, key=None):
+    """Bijection on [0, 2**40): a balanced Feistel network over two 20-bit halves."""
+    key = key or _key()
+    left, right = number >> HALF_BITS, number & HALF_MASK
+    for i in range(ROUNDS):
+        left, right = right, left ^ _round(right, i, key)
+    return (left << HALF_BITS) | right
+
+
+def unpermute(number, key=None):
+    key = key or _key()
+    left, right = number >> HALF_BITS, number & HALF_MASK
+    for i in reversed(range(ROUNDS)):
+        left, right = right ^ _round(left, i, key), left
+    return (left << HALF_BITS) | right
+
+
+def encode(number):
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, digit = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def code_for(sequence_number, key=None):
+    return encode(permute(sequence_number % (1 << BITS), key))
+
+
+def reserve_block(size, using="default"):
+    """Reserve `size` sequence numbers; returns (start, end)."""
+    from .models import ReferralCodeSequence
+    with transaction.atomic(using=using):
+        sequence, _ = ReferralCodeSequence.objects.using(using).get_or_create(name=SEQUENCE_NAME)
+        # The UPDATE locks the row until commit, so the read below sees our increment
+        ReferralCodeSequence.objects.using(using).filter(pk=sequence.pk).update(next_value=F("next_value") + size)
+        end = ReferralCodeSequence.objects.using(using).values_list("next_value", flat=True).get(pk=sequence.pk)
+    return end - size, end
+
+
+def free_codes(start, end, using="default"):
+    """Codes for [start, end) minus any already held by a user."""
+    from .models import User
+    codes = [code_for(n) for n in range(start, end)]
+    taken = set(User.objects.using(using).filter(referral_code__in=codes).values_list("referral_code", flat=True))
+    return [code for code in codes if code not in taken]
+
+
+class CodeAllocator:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.codes = []
+
+    def allocate(self):
+        with self.lock:
+            if self.codes:
+                return self.codes.pop()
+        codes = []
+        while not codes:
+            start, end = reserve_block(getattr(settings, "REFERRAL_CODE_BLOCK_SIZE", 100))
+            codes = free_codes(start, end)
+        codes.reverse()
+        code = codes.pop()
+        # If the caller's transaction rolls back, so does the reservation and
+        # another process may be handed the same block; keep the rest only
+        # once it is committed
+        transaction.on_commit(lambda: self._keep(codes))
+        return code
+
+    def _keep(self, codes):
+        with self.lock:
+            self.codes = codes + self.codes
+
+
+allocator = CodeAllocator()
+
+
+def allocate_referral_code():
+    return allocator.allocate()
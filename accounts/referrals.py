@@ -0,0 +1,163 @@
+"""
+Referral tree as a closure table.
+
+ReferralPath holds one row per (ancestor, descendant) pair, including each
+user's row to itself at depth 0, so a downline is a single indexed range on
+ancestor and a user's upline is one on descendant. Signups add depth + 1
+rows (one SELECT and one INSERT); changing refer_by relinks the user's
+subtree. Migration 0005 fills the table for existing users; users created
+without signals (bulk_create, raw SQL) are picked up by the
+backfill_referral_tree command.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import ReferralPath, User
+
+
+def attach(user):
+    """Add the closure rows of a newly created user."""
+    rows = [ReferralPath(ancestor_id=user.pk, descendant_id=user.pk, depth=0)]
+    if user.refer_by_id:
+        upline = ReferralPath.objects.filter(descendant_id=user.refer_by_id).values_list("ancestor_id", "depth")
+        rows += [ReferralPath(ancestor_id=ancestor, descendant_id=user.pk, depth=depth + 1) for ancestor, depth in upline]
+    ReferralPath.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def check_parent(user, parent_id):
+    """Reject a referrer that is the user or somewhere in the user's downline."""
+    if parent_id is None or user.pk is None:
+        return
+    if parent_id == user.pk or ReferralPath.objects.filter(ancestor_id=user.pk, descendant_id=parent_id).exists():
+        raise ValidationError({"refer_by": "A user cannot be referred by their own downline."})
+
+
+@transaction.atomic
+def move(user, parent_id):
+    """Relink the user's subtree under parent_id (or make it a root)."""
+    check_parent(user, parent_id)
+    subtree = ReferralPath.objects.filter(ancestor_id=user.pk)
+    upline = ReferralPath.objects.filter(descendant_id=user.pk, depth__gt=0)
+    ReferralPath.objects.filter(
+        descendant_id__in=subtree.values("descendant_id"),
+        ancestor_id__in=upline.values("ancestor_id"),
+    ).delete()
+    if parent_id is None:
+        return
+    nodes = list(subtree.values_list("descendant_id", "depth"))
+    if not nodes:
+        nodes = [(user.pk, 0)]
+        ReferralPath.objects.create(ancestor_id=user.pk, descendant_id=user.pk, depth=0)
+    ancestors = ReferralPath.objects.filter(descendant_id=parent_id).values_list("ancestor_id", "depth")
+    ReferralPath.objects.bulk_create(
+        [
+            ReferralPath(ancestor_id=ancestor, descendant_id=node, depth=up + down + 1)
+            for ancestor, up in ancestors
+            for node, down in nodes
+        ],
+        batch_size=1000,
+    )
+
+
+def detach_referrals(user):
+    """Before a user is deleted: their direct referrals become roots."""
+    for child_id in user.referrals.values_list("pk", flat=True):
+        move(User(pk=child_id), None)
+
+
+def rebuild(batch_size=5000):
+    """Recreate the whole closure table from refer_by. Returns the row count."""
+    parents = dict(User.objects.values_list("pk", "refer_by_id").iterator(chunk_size=batch_size))
+    children = defaultdict(list)
+    roots = []
+    for user_id, parent_id in parents.items():
+        if parent_id is None or parent_id not in parents:
+            roots.append(user_id)
+        else:
+            children[parent_id].append(user_id)
+
+    def rows():
+        # Depth-first from every root, carrying the path; users left over
+        # after this sit on a refer_by cycle and are treated as roots
+        seen = set()
+        pending = list(roots)
+        while True:
+            while pending:
+                root = pending.pop()
+                stack = [(root, [root])]
+                while stack:
+                    node, path = stack.pop()
+                    seen.add(node)
+                    for depth, ancestor in enumerate(reversed(path)):
+                        yield ReferralPath(ancestor_id=ancestor, descendant_id=node, depth=depth)
+                    stack.extend((child, path + [child]) for child in children[node] if child not in seen)
+            rest = [user_id for user_id in parents if user_id not in seen]
+            if not rest:
+                return
+            pending = rest[:1]
+
+    with transaction.atomic():
+        ReferralPath.objects.all().delete()
+        total = 0
+        batch = []
+        for row in rows():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                ReferralPath.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        ReferralPath.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def downline(user, max_depth=None):
+    """Users below `user` (not including them), optionally limited in depth."""
+    paths = Q(referral_ancestors__ancestor=user, referral_ancestors__depth__gt=0)
+    if max_depth is not None:
+        paths &= Q(referral_ancestors__depth__lte=max_depth)
+    return User.objects.filter(paths)
+
+
+def downline_summary(user, since_days=30):
+    """Size, depth and recent growth of the user's downline in one query."""
+    since = timezone.now() - timedelta(days=since_days)
+    return ReferralPath.objects.filter(ancestor=user, depth__gt=0).aggregate(
+        total=Count("pk"),
+        direct=Count("pk", filter=Q(depth=1)),
+        max_depth=Max("depth"),
+        recent=Count("pk", filter=Q(descendant__date_joined__gte=since)),
+        affiliates=Count("pk", filter=Q(descendant__is_affiliate=True)),
+    )
+
+
+def downline_levels(user):
+    """[{"depth": 1, "users": n}, ...] for the user's downline."""
+    return list(
+        ReferralPath.objects.filter(ancestor=user, depth__gt=0)
+        .values("depth").annotate(users=Count("pk")).order_by("depth")
+    )
+
+
+def downline_earnings(user):
+    """Film count and total_earning across films made by the user's downline."""
+    from movieApp.models import Film
+    return Film.objects.filter(
+        filmmaker__referral_ancestors__ancestor=user,
+        filmmaker__referral_ancestors__depth__gt=0,
+    ).aggregate(films=Count("pk"), total_earning=Sum("total_earning"))
+
+
+def top_referrals(user, limit=10):
+    """Direct referrals ordered by the size of their own downline."""
+    return list(
+        ReferralPath.objects.filter(ancestor__refer_by=user)
+        .values("ancestor_id", "ancestor__full_name", "ancestor__date_joined")
+        .annotate(downline=Count("pk") - 1)
+        .order_by("-downline", "ancestor_id")[:limit]
+    )
@@ -0,0 +1,170 @@
+"""
+Token revocation: per-user versions (accounts.tokens) for "log out
+everywhere", and a JTI denylist for single tokens (logout, rotated refresh
+tokens).
+
+Denylist checks go through an in-process Bloom filter of every unexpired
+revoked JTI, so an unrevoked token (the common case) costs a memory lookup.
+Only Bloom hits reach a bounded LRU and then the primary key lookup in
+RevokedToken. Each process pulls rows added by others when the shared
+generation counter in Django's cache moves, at most every
+AUTH_DENYLIST_SYNC_INTERVAL seconds, and rebuilds the filter hourly so
+pruned rows drop out of it. With a process-local cache the counter is
+invisible to other processes, so each check pulls the recent rows from the
+table instead (an index range scan on created_at).
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from core.bloom import BloomFilter
+from core.checks import cache_is_shared
+from core.lru import LRUCache
+from .models import RevokedToken, User
+from .tokens import NO_USER, publish_token_version
+
+GENERATION_KEY = "auth:denylist:generation"
+# Rows can commit slightly out of created_at order; re-read this much overlap
+SYNC_OVERLAP = timedelta(seconds=60)
+REBUILD_INTERVAL = 60 * 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Denylist:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+        self.generation = None
+        self.watermark = None
+        self.hits = LRUCache(maxsize=_setting("AUTH_DENYLIST_CACHE_SIZE", 10000), ttl=REBUILD_INTERVAL)
+        self.prune_checked_at = 0.0
+
+    def needs_sync(self):
+        return self.bloom is None or time.monotonic() - self.checked_at >= _setting("AUTH_DENYLIST_SYNC_INTERVAL", 5)
+
+    def sync(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.bloom is not None and now - self.checked_at < _setting("AUTH_DENYLIST_SYNC_INTERVAL", 5):
+                return
+            shared = cache_is_shared()
+            generation = cache.get(GENERATION_KEY) if shared else None
+            if self.bloom is None or now - self.built_at >= REBUILD_INTERVAL:
+                self._rebuild()
+            elif generation != self.generation or not shared:
+                self._pull()
+            self.generation = generation
+            self.checked_at = now
+
+    def _rebuild(self):
+        live = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        capacity = max(_setting("AUTH_DENYLIST_BLOOM_CAPACITY", 100000), live.count() * 2)
+        bloom = BloomFilter(capacity, _setting("AUTH_DENYLIST_ERROR_RATE", 0.001))
+        watermark = None
+        for jti, created_at in live.values_list("jti", "created_at").iterator(chunk_size=5000):
+            bloom.add(jti)
+            watermark = created_at if watermark is None else max(watermark, created_at)
+        self.bloom = bloom
+        self.watermark = watermark
+        self.built_at = time.monotonic()
+        self.hits.clear()
+
+    def _pull(self):
+        rows = RevokedToken.objects.all()
+        if self.watermark is not None:
+            rows = rows.filter(created_at__gte=self.watermark - SYNC_OVERLAP)
+        for jti, created_at in rows.values_list("jti", "created_at").iterator(chunk_size=5000):
+            self.bloom.add(jti)
+            # A Bloom false positive may have cached this jti as not revoked
+            self.hits.delete(jti)
+            self.watermark = created_at if self.watermark is None else max(self.watermark, created_at)
+        if len(self.bloom) > self.bloom.capacity:
+            # Past capacity the false positive rate climbs; size up next check
+            self.built_at = 0.0
+
+    def is_revoked(self, jti):
+        if self.needs_sync():
+            self.sync()
+        if jti not in self.bloom:
+            return False
+        revoked = self.hits.get(jti)
+        if revoked is None:
+            revoked = RevokedToken.objects.filter(pk=jti).exists()
+            self.hits.set(jti, revoked)
+        return revoked
+
+    async def ais_revoked(self, jti):
+        if self.needs_sync():
+            await sync_to_async(self.sync)()
+        if jti not in self.bloom:
+            return False
+        revoked = self.hits.get(jti)
+        if revoked is None:
+            revoked = await RevokedToken.objects.filter(pk=jti).aexists()
+            self.hits.set(jti, revoked)
+        return revoked
+
+    def revoke(self, token):
+        """
+        Denylist one token until it expires. Returns False if it was already
+        revoked, which makes refresh rotation single-use under races.
+        """
+        jti = token[jwt_settings.JTI_CLAIM]
+        expires_at = datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, user_id=token[jwt_settings.USER_ID_CLAIM], expires_at=expires_at)
+        except IntegrityError:
+            return False
+        transaction.on_commit(lambda: self._published(jti))
+        return True
+
+    def _published(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+        self.hits.set(jti, True)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, None)
+        self._schedule_prune()
+
+    def _schedule_prune(self):
+        # At most one check per process per interval
+        interval = _setting("AUTH_DENYLIST_PRUNE_INTERVAL", 60 * 60)
+        now = time.monotonic()
+        if now - self.prune_checked_at < interval:
+            return
+        self.prune_checked_at = now
+        from .tasks import prune_revoked_tokens
+        prune_revoked_tokens.enqueue_unique(delay=timedelta(seconds=interval))
+
+
+denylist = Denylist()
+
+
+def revoke_all_tokens(user_id):
+    """Invalidate every token issued to the user so far."""
+    User.objects.filter(pk=user_id).update(token_version=F("token_version") + 1)
+    row = User.objects.filter(pk=user_id).values_list("token_version", "is_active").first()
+    version = row[0] if row and row[1] else NO_USER
+    transaction.on_commit(lambda: publish_token_version(user_id, version))
+
+
+def prune_expired():
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
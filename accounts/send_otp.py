@@ -1,13 +1,17 @@
 from django.core.mail import send_mail
 from django.conf import settings
 
-def send_otp(email, otp):
+def deliver_otp(email, otp):
+    """Send the OTP email; raises on SMTP errors."""
     subject = "Your OTP Code"
     message = f"Your OTP code is {otp}. It will expire in 5 minutes."
-    print(otp)
     from_email = settings.EMAIL_HOST_USER
+    send_mail(subject, message, from_email, [email])
+
+def send_otp(email, otp):
+    print(otp)
     try:
-        send_mail(subject, message, from_email, [email])
+        deliver_otp(email, otp)
         return True
     except Exception as e:
         print(f"Send OTP Error: {e}")
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from . import referrals
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def update_referral_tree(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "refer_by" not in update_fields):
+        return
+    if created:
+        referrals.attach(instance)
+    elif instance._refer_by_changed():
+        referrals.move(instance, instance.refer_by_id)
+    instance._loaded_refer_by_id = instance.refer_by_id
+
+
+@receiver(pre_delete, sender=User)
+def detach_referrals(sender, instance, **kwargs):
+    referrals.detach_referrals(instance)
@@ -0,0 +1,16 @@
+from jobs.queue import job
+
+from .send_otp import deliver_otp
+
+
+@job("accounts.send_otp_email", max_attempts=5, concurrency=4, timeout=60, backoff=5)
+def send_otp_email(email, otp):
+    """Deliver an OTP code; raises on SMTP errors so the queue retries."""
+    deliver_otp(email, otp)
+
+
+@job("accounts.prune_revoked_tokens", max_attempts=3, timeout=600)
+def prune_revoked_tokens():
+    """Delete denylist rows whose tokens have expired anyway."""
+    from .revocation import prune_expired
+    prune_expired()
@@ -1,3 +1,418 @@
-from django.test import TestCase
+import importlib
+import random
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+
+from core import ratelimit
+
+from . import hashers, phones, referral_codes, referrals, tokens
+from .models import ReferralPath, RevokedToken, User
+from .revocation import Denylist
+from .serializers import UserSerializer
+from .tokens import UserRefreshToken
+
+
+class TokenVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        tokens._versions.clear()
+        tokens._users.clear()
+
+    def test_bump_from_another_process_is_seen_after_the_ttl(self):
+        self.assertEqual(tokens.token_version(self.user.pk), 0)
+        # Another process commits a bump; its publish never reaches this
+        # process's LocMemCache
+        User.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+        self.assertEqual(tokens.token_version(self.user.pk), 0)
+        tokens._versions.clear()  # AUTH_TOKEN_VERSION_TTL elapsed
+        self.assertEqual(tokens.token_version(self.user.pk), 1)
+
+
+class UserProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.headers = {"authorization": f"Bearer {token}"}
+        tokens._users.clear()
+
+    def test_update_keeps_concurrent_changes(self):
+        # Cache the full row, then change another column behind the cache
+        self.assertEqual(self.client.get("/api/auth/get-user-profile/", headers=self.headers).status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(otp="123456", is_affiliate=True)
+
+        response = self.client.patch(
+            "/api/auth/get-user-profile/", {"full_name": "Ann B"}, content_type="application/json", headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["is_affiliate"])
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.full_name, user.otp, user.is_affiliate), ("Ann B", "123456", True))
+
+
+class DenylistTests(TestCase):
+    def test_revocation_by_another_process_is_seen_after_a_sync(self):
+        user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        local = Denylist()
+        self.assertFalse(local.is_revoked("other-process-jti"))
+
+        # Another process revokes; its generation bump stays in its own LocMemCache
+        RevokedToken.objects.create(jti="other-process-jti", user=user, expires_at=timezone.now() + timedelta(hours=1))
+        local.checked_at = 0.0  # AUTH_DENYLIST_SYNC_INTERVAL elapsed
+        self.assertTrue(local.is_revoked("other-process-jti"))
+        self.assertFalse(local.is_revoked("unrelated-jti"))
+
+    def test_false_positive_is_not_cached_past_a_revocation(self):
+        user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        local = Denylist()
+        local.sync()
+        # A Bloom false positive: the lookup finds no row and caches that
+        local.bloom.add("unlucky-jti")
+        self.assertFalse(local.is_revoked("unlucky-jti"))
+
+        RevokedToken.objects.create(jti="unlucky-jti", user=user, expires_at=timezone.now() + timedelta(hours=1))
+        local.checked_at = 0.0
+        self.assertTrue(local.is_revoked("unlucky-jti"))
+
+
+class PhoneNormalizeTests(TestCase):
+    def setUp(self):
+        phones._cache.clear()
+        parse = mock.patch.object(phones.phonenumbers, "parse", wraps=phones.phonenumbers.parse)
+        self.parse = parse.start()
+        self.addCleanup(parse.stop)
+
+    def test_repeated_pairs_are_parsed_once(self):
+        phone = phones.normalize("+44", "020 7946 0958")
+        self.assertEqual(phone, phones.PhoneNumber("44", "02079460958", "+442079460958"))
+        self.assertEqual(phones.normalize("44", " 020 7946 0958 "), phone)
+        self.assertEqual(self.parse.call_count, 1)
+
+    def test_batch_keeps_order_and_returns_unshared_errors(self):
+        pairs = [("44", "020-7946-0958"), ("999", "123"), ("44", "020-7946-0958"), ("999", "123"), ("44", "12")]
+        results = phones.normalize_many(pairs)
+        self.assertEqual([type(r).__name__ for r in results],
+                         ["PhoneNumber", "InvalidPhoneNumber", "PhoneNumber", "InvalidPhoneNumber", "InvalidPhoneNumber"])
+        self.assertEqual(results[1].as_dict(), {"phone_country_code": "Invalid country calling code."})
+        self.assertEqual(results[4].field, "phone_number")
+        self.assertIsNot(results[1], results[3])
+        self.assertIsNot(phones.normalize_many(pairs[1:2])[0], results[1])
+        # 999 is rejected before parsing; each distinct valid pair parses once
+        self.assertEqual(self.parse.call_count, 2)
+
+    def test_serializer_and_model_share_the_cache(self):
+        user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        serializer = UserSerializer(user, data={"phone_country_code": "+44", "phone_number": "020 7946 0958"}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+        self.assertEqual((user.phone_country_code, user.phone_number), ("44", "02079460958"))
+        user.phone_country_code, user.phone_number = "+44", "020 7946 0958"
+        user.clean()
+        self.assertEqual(self.parse.call_count, 1)
+
+        invalid = UserSerializer(user, data={"phone_number": "12"}, partial=True)
+        self.assertFalse(invalid.is_valid())
+        self.assertIn("phone_number", invalid.errors)
+        user.phone_country_code, user.phone_number = "44", "12"
+        with self.assertRaises(ValidationError) as raised:
+            user.clean()
+        self.assertIn("phone_number", raised.exception.message_dict)
+        self.assertEqual(self.parse.call_count, 2)
+
+    def test_command_normalizes_in_batches(self):
+        ann = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        bob = User.objects.create_user(email="bob@example.com", password="x", full_name="Bob", terms_agreed=True)
+        User.objects.filter(pk=ann.pk).update(phone_country_code="+44", phone_number="020-7946-0958")
+        User.objects.filter(pk=bob.pk).update(phone_country_code="44", phone_number="12")
+        call_command("normalize_phone_numbers", batch_size=1, stdout=mock.Mock(), stderr=mock.Mock())
+        self.assertEqual(
+            dict(User.objects.values_list("email", "phone_number")),
+            {"ann@example.com": "02079460958", "bob@example.com": "12"},
+        )
+        self.assertEqual(User.objects.get(pk=ann.pk).phone_country_code, "44")
+
+
+class ReferralCodeTests(TestCase):
+    def setUp(self):
+        referral_codes.allocator.codes = []
+
+    def test_permutation_round_trip(self):
+        key = referral_codes._key()
+        for number in [0, 1, 12345, (1 << 40) - 1] + [random.getrandbits(40) for _ in range(500)]:
+            self.assertEqual(referral_codes.unpermute(referral_codes.permute(number, key), key), number)
+        codes = {referral_codes.code_for(number) for number in range(5000)}
+        self.assertEqual(len(codes), 5000)
+        self.assertTrue(all(len(code) == referral_codes.CODE_LENGTH for code in codes))
+
+    def test_taken_codes_are_skipped(self):
+        start, _ = referral_codes.reserve_block(0)
+        # A code handed out before the allocator existed collides with the next number
+        User.objects.create(email="old@example.com", full_name="Old", referral_code=referral_codes.code_for(start))
+        user = User.objects.create_user(email="new@example.com", password="x", full_name="New", terms_agreed=True)
+        self.assertEqual(user.referral_code, referral_codes.code_for(start + 1))
+
+    def test_frozen_migration_copy_matches(self):
+        migration = importlib.import_module("accounts.migrations.0004_referral_code_sequence")
+        key = referral_codes._key()
+        for number in [0, 1, (1 << 40) - 1] + [random.getrandbits(40) for _ in range(200)]:
+            self.assertEqual(migration.code_for(number, key), referral_codes.code_for(number))
+
+
+class ReferralCodeConcurrencyTests(TransactionTestCase):
+    def test_concurrent_allocators_never_share_a_code(self):
+        # One allocator per thread stands in for separate processes
+        allocators = [referral_codes.CodeAllocator() for _ in range(4)]
+        results, errors = [], []
+
+        def allocate(allocator):
+            try:
+                done = 0
+                while done < 30:
+                    try:
+                        with transaction.atomic():
+                            code = allocator.allocate()
+                    except OperationalError as e:
+                        # The in-memory test database locks tables instead of
+                        # waiting for busy_timeout; the transaction rolled back
+                        if "locked" not in str(e):
+                            raise
+                        continue
+                    results.append(code)
+                    done += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with override_settings(REFERRAL_CODE_BLOCK_SIZE=10):
+            threads = [threading.Thread(target=allocate, args=(allocator,)) for allocator in allocators]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 120)
+        self.assertEqual(len(set(results)), 120)
+
+
+class ReferralTreeTests(TestCase):
+    def make_user(self, name, parent=None):
+        return User.objects.create_user(
+            email=f"{name}@example.com", password="x", full_name=name, terms_agreed=True, refer_by=parent,
+        )
+
+    def paths(self):
+        return sorted(ReferralPath.objects.values_list("ancestor_id", "descendant_id", "depth"))
+
+    def downline_ids(self, user):
+        return set(referrals.downline(user).values_list("pk", flat=True))
+
+    def setUp(self):
+        # a -> b -> c -> d, and a -> e
+        self.a = self.make_user("a")
+        self.b = self.make_user("b", self.a)
+        self.c = self.make_user("c", self.b)
+        self.d = self.make_user("d", self.c)
+        self.e = self.make_user("e", self.a)
+
+    def test_attach_adds_a_row_per_ancestor(self):
+        self.assertEqual(
+            sorted(ReferralPath.objects.filter(descendant=self.d).values_list("ancestor_id", "depth")),
+            sorted([(self.d.pk, 0), (self.c.pk, 1), (self.b.pk, 2), (self.a.pk, 3)]),
+        )
+        self.assertEqual(referrals.downline_levels(self.a), [
+            {"depth": 1, "users": 2}, {"depth": 2, "users": 1}, {"depth": 3, "users": 1},
+        ])
+
+    def test_move_relinks_the_subtree(self):
+        c = User.objects.get(pk=self.c.pk)
+        c.refer_by = self.e
+        c.save()
+        self.assertEqual(self.downline_ids(self.e), {self.c.pk, self.d.pk})
+        self.assertEqual(self.downline_ids(self.b), set())
+        self.assertEqual(ReferralPath.objects.get(ancestor=self.a, descendant=self.d).depth, 3)
+
+    def test_cycle_is_rejected(self):
+        a = User.objects.get(pk=self.a.pk)
+        a.refer_by = self.d
+        with self.assertRaises(ValidationError):
+            a.save()
+        self.assertIsNone(User.objects.get(pk=self.a.pk).refer_by_id)
+        self.assertEqual(self.downline_ids(self.a), {self.b.pk, self.c.pk, self.d.pk, self.e.pk})
+
+    def test_deleting_a_parent_makes_its_referrals_roots(self):
+        self.b.delete()
+        self.assertIsNone(User.objects.get(pk=self.c.pk).refer_by_id)
+        self.assertEqual(self.downline_ids(self.a), {self.e.pk})
+        self.assertEqual(self.downline_ids(self.c), {self.d.pk})
+        self.assertFalse(ReferralPath.objects.filter(ancestor=self.a, descendant=self.c).exists())
+
+    def test_migration_backfill_matches_incremental_maintenance(self):
+        migration = importlib.import_module("accounts.migrations.0005_referral_tree")
+        c = User.objects.get(pk=self.c.pk)
+        c.refer_by = self.e
+        c.save()
+        incremental = self.paths()
+        ReferralPath.objects.all().delete()
+        migration.backfill_referral_tree(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(self.paths(), incremental)
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        c = User.objects.get(pk=self.c.pk)
+        c.refer_by = self.e
+        c.save()
+        self.b.delete()
+        incremental = self.paths()
+        referrals.rebuild(batch_size=3)
+        self.assertEqual(self.paths(), incremental)
+
+
+class RateLimitKeyTests(SimpleTestCase):
+    def ident(self, **headers):
+        request = Request(RequestFactory().post("/", REMOTE_ADDR="10.0.0.5", **headers))
+        return ratelimit.Policy("sign-in", "ip").ident(ratelimit.RateLimitThrottle(), request)
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        self.assertEqual(self.ident(HTTP_X_FORWARDED_FOR="1.2.3.4"), "10.0.0.5")
+
+    def test_forwarded_for_is_read_behind_trusted_proxies(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            self.assertEqual(self.ident(HTTP_X_FORWARDED_FOR="1.2.3.4, 203.0.113.9"), "203.0.113.9")
+
+
+class RateLimitPauseTests(SimpleTestCase):
+    def test_paused_lets_every_request_through(self):
+        request = Request(RequestFactory().post("/", REMOTE_ADDR="10.0.0.5"))
+        view = mock.Mock(ratelimit_scope="sign-in")
+        denying = ratelimit.Policy("sign-in", "ip")
+        with mock.patch.object(ratelimit, "policies_for", return_value=[denying]), \
+                mock.patch.object(denying, "hit", return_value=(False, 30.0)):
+            self.assertFalse(ratelimit.RateLimitThrottle().allow_request(request, view))
+            with ratelimit.paused():
+                self.assertTrue(ratelimit.RateLimitThrottle().allow_request(request, view))
+            self.assertFalse(ratelimit.RateLimitThrottle().allow_request(request, view))
+
+
+class HasherParamsTests(SimpleTestCase):
+    def test_explicit_params_ignore_the_configured_costs(self):
+        hasher = hashers.TunedPBKDF2PasswordHasher(params={"iterations": 7})
+        self.assertEqual(hasher.iterations, 7)
+        self.assertEqual(hashers.TunedPBKDF2PasswordHasher().iterations, hashers.hash_params("pbkdf2")["iterations"])
+        scrypt = hashers.TunedScryptPasswordHasher(params={"work_factor": 4})
+        self.assertEqual((scrypt.work_factor, scrypt.block_size), (4, hashers.DEFAULT_PARAMS["scrypt"]["block_size"]))
+
+    def test_cost_override_applies_inside_the_block_only(self):
+        configured = hashers.hash_params("pbkdf2")["iterations"]
+        with hashers.cost_override(hashers.MINIMUM_PARAMS):
+            encoded = hashers.TunedPBKDF2PasswordHasher().encode("pw", "salt")
+            self.assertTrue(encoded.startswith("pbkdf2_sha256$1$"))
+        self.assertEqual(hashers.hash_params("pbkdf2")["iterations"], configured)
+        self.assertTrue(hashers.TunedPBKDF2PasswordHasher().must_update(encoded))
+
+
+@override_settings(PASSWORD_HASH_PARAMS={"pbkdf2": {"iterations": 1000}}, PASSWORD_HASH_PARAMS_FILE=None)
+class HasherUpgradeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        tokens._users.clear()
+
+    def store(self, encoded):
+        User.objects.filter(pk=self.user.pk).update(password=encoded)
+        self.user.password = encoded
+
+    def stored(self):
+        return User.objects.get(pk=self.user.pk).password
+
+    def sign_in(self, password):
+        return self.client.post("/api/auth/sign-in/", {
+            "email_address": "ann@example.com", "password": password, "role": "viewer",
+        }, content_type="application/json")
+
+    def test_sign_in_rehashes_at_the_configured_cost(self):
+        with hashers.cost_override(hashers.MINIMUM_PARAMS):
+            self.store(hashers.TunedPBKDF2PasswordHasher().encode("Secret-1", "salt"))
+        self.assertEqual(self.sign_in("wrong").status_code, 401)
+        self.assertTrue(self.stored().startswith("pbkdf2_sha256$1$"))
+        self.assertEqual(self.sign_in("Secret-1").status_code, 200)
+        self.assertTrue(self.stored().startswith("pbkdf2_sha256$1000$"))
+
+    def test_sign_in_moves_other_algorithms_to_the_preferred_one(self):
+        self.store(hashers.TunedScryptPasswordHasher(params=hashers.MINIMUM_PARAMS["scrypt"]).encode("Secret-1", "salt"))
+        self.assertEqual(self.sign_in("Secret-1").status_code, 200)
+        self.assertTrue(self.stored().startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(self.sign_in("Secret-1").status_code, 200)
+
+    def test_acheck_password_upgrades_without_save(self):
+        self.store(hashers.TunedPBKDF2PasswordHasher(params={"iterations": 10}).encode("Secret-1", "salt"))
+        old = self.user.password
+        self.assertFalse(async_to_sync(hashers.acheck_password)(self.user, "wrong"))
+        self.assertEqual(self.stored(), old)
+
+        with mock.patch.object(User, "save") as save, mock.patch.object(tokens, "forget_user") as forget:
+            self.assertTrue(async_to_sync(hashers.acheck_password)(self.user, "Secret-1"))
+        save.assert_not_called()
+        forget.assert_called_once_with(self.user.pk)
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(self.stored(), self.user.password)
+        self.assertTrue(async_to_sync(hashers.acheck_password)(self.user, "Secret-1"))
+
+    def test_aauthenticate(self):
+        self.assertEqual(async_to_sync(hashers.aauthenticate)("ann@example.com", "x"), self.user)
+        self.assertIsNone(async_to_sync(hashers.aauthenticate)("ann@example.com", "y"))
+        self.assertIsNone(async_to_sync(hashers.aauthenticate)("nobody@example.com", "x"))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(async_to_sync(hashers.aauthenticate)("ann@example.com", "x"))
+
+
+class CacheStoreTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = ratelimit.CacheStore()
+
+    def hammer(self, target, count=20):
+        barrier = threading.Barrier(count)
+
+        def run():
+            barrier.wait()
+            target()
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_updates_are_not_lost(self):
+        def slow_increment(value):
+            time.sleep(0.001)
+            return (value or 0) + 1, None
+        self.hammer(lambda: self.store.update("k", slow_increment, 60))
+        self.assertEqual(self.store.get("k"), 20)
+
+    def test_concurrent_requests_share_one_burst(self):
+        bucket = ratelimit.TokenBucket("5/min", burst=5)
+        allowed = []
+        self.hammer(lambda: allowed.append(bucket.hit(self.store, "sign-in:ip:10.0.0.5")[0]))
+        self.assertEqual(allowed.count(True), 5)
+
+    def test_busy_key_is_denied(self):
+        cache.add("ratelimit:sign-in:email:a@example.com:lock", "other", 60)
+        with mock.patch.object(ratelimit.CacheStore, "lock_wait", 0.01), \
+                mock.patch.object(ratelimit, "get_store", return_value=self.store):
+            policy = ratelimit.Policy("sign-in", "email", algorithm="token_bucket", rate="5/min")
+            request = Request(RequestFactory().post("/", {"email": "a@example.com"}, content_type="application/json"),
+                              parsers=[JSONParser()])
+            self.assertEqual(policy.hit(ratelimit.RateLimitThrottle(), request), (False, 1.0))
@@ -0,0 +1,167 @@
+"""
+Signed user claims and the per-user token version.
+
+Tokens issued through UserRefreshToken carry the user's role, is_staff and
+token_version, so ClaimsJWTAuthentication can build request.user without a
+query. Saving a user with a new password, role, is_staff or is_active bumps
+User.token_version, which rejects every token issued before the change.
+
+Current versions are read through a short-TTL in-process LRU, then Django's
+cache, then the database. With a per-process cache backend the middle layer
+is skipped, so other processes re-read the row and see a bump after
+AUTH_TOKEN_VERSION_TTL seconds at most. Full user rows for older tokens (and
+for deferred fields of claims users) come from a short-TTL in-process user
+cache; writes go to a freshly loaded row.
+"""
+import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.checks import cache_is_shared
+from core.lru import LRUCache
+
+ROLE_CLAIM = "role"
+STAFF_CLAIM = "is_staff"
+VERSION_CLAIM = "ver"
+VERSION_KEY = "auth:token_version:{}"
+# Cached version for users that are missing or inactive
+NO_USER = -1
+
+_versions = LRUCache(maxsize=50000, ttl=getattr(settings, "AUTH_TOKEN_VERSION_TTL", 5))
+_users = LRUCache(maxsize=10000, ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 30))
+
+
+class UserRefreshToken(RefreshToken):
+    """RefreshToken whose access tokens identify the user without a lookup."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[STAFF_CLAIM] = user.is_staff
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+def _version_timeout():
+    return getattr(settings, "AUTH_TOKEN_VERSION_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+def _version_from_row(row):
+    if row is None or not row[1]:
+        return NO_USER
+    return row[0]
+
+
+def token_version(user_id):
+    """Current token version for the user, or NO_USER."""
+    version = _versions.get(user_id)
+    if version is None:
+        shared = cache_is_shared()
+        version = cache.get(VERSION_KEY.format(user_id)) if shared else None
+        if version is None:
+            from .models import User
+            row = User.objects.filter(pk=user_id).values_list("token_version", "is_active").first()
+            version = _version_from_row(row)
+            if shared:
+                cache.set(VERSION_KEY.format(user_id), version, _version_timeout())
+        _versions.set(user_id, version)
+    return version
+
+
+async def atoken_version(user_id):
+    version = _versions.get(user_id)
+    if version is None:
+        shared = cache_is_shared()
+        version = await cache.aget(VERSION_KEY.format(user_id)) if shared else None
+        if version is None:
+            from .models import User
+            row = await User.objects.filter(pk=user_id).values_list("token_version", "is_active").afirst()
+            version = _version_from_row(row)
+            if shared:
+                await cache.aset(VERSION_KEY.format(user_id), version, _version_timeout())
+        _versions.set(user_id, version)
+    return version
+
+
+def publish_token_version(user_id, version):
+    """Make a new version (or NO_USER) visible; called after the row is committed."""
+    cache.set(VERSION_KEY.format(user_id), version, _version_timeout())
+    _versions.set(user_id, version)
+    _users.delete(user_id)
+
+
+def forget_user(user_id):
+    _users.delete(user_id)
+
+
+def claims_user(token):
+    """A User built from token claims; other fields load on first access."""
+    from .models import User
+    claims = {
+        "id": token[jwt_settings.USER_ID_CLAIM],
+        "role": token[ROLE_CLAIM],
+        "is_staff": token[STAFF_CLAIM],
+        "is_active": True,
+        "token_version": token[VERSION_CLAIM],
+    }
+    # from_db expects values in concrete field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+    user = User.from_db("default", names, [claims[name] for name in names])
+    user._from_claims = True
+    return user
+
+
+def has_user_claims(token):
+    return ROLE_CLAIM in token and STAFF_CLAIM in token and VERSION_CLAIM in token
+
+
+def _cache_user(user):
+    _users.set(user.pk, user)
+    return copy.copy(user)
+
+
+def cached_user(user_id):
+    """Full User row from the in-process cache; a copy, so callers may modify it."""
+    user = _users.get(user_id)
+    if user is not None:
+        return copy.copy(user)
+    from .models import User
+    user = User.objects.filter(pk=user_id).first()
+    return _cache_user(user) if user is not None else None
+
+
+async def acached_user(user_id):
+    user = _users.get(user_id)
+    if user is not None:
+        return copy.copy(user)
+    from .models import User
+    user = await User.objects.filter(pk=user_id).afirst()
+    return _cache_user(user) if user is not None else None
+
+
+def _fill(user, full):
+    for field in user.get_deferred_fields():
+        user.__dict__[field] = full.__dict__[field]
+    user._from_claims = False
+
+
+def fill_claims_user(user):
+    """Load the deferred fields of a claims user from the user cache."""
+    full = cached_user(user.pk)
+    if full is None:
+        return False
+    _fill(user, full)
+    return True
+
+
+async def aload_user(user):
+    """For async views: make sure a claims user has every field loaded."""
+    if getattr(user, "_from_claims", False):
+        full = await acached_user(user.pk)
+        if full is not None:
+            _fill(user, full)
+    return user
@@ -1,13 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
 
+# Native async views under ASGI (see ASYNC_VIEWS in settings)
+user_profile_view = UserProfileAsyncView if settings.ASYNC_VIEWS else UserProfileView
+sign_in_view = SigninAsyncView if settings.ASYNC_VIEWS else SigninView
+
 urlpatterns = [
     path('sign-up/', SignupView.as_view(), name='sign-up'),
     
     # path('verify-email/', verify_otp, name='verify-email'),
     # path('resend-verification-code/', send_otp, name='resend-verification-code'),
 
-    path('sign-in/', SigninView.as_view(), name='sign-in'),
+    path('sign-in/', sign_in_view.as_view(), name='sign-in'),
     path('admin-sign-in/', AdminLoginView.as_view(), name='admin-sign-in'),
 
     path('forgo-password/', ForgotPasswordView.as_view(), name='forgo-password'),
@@ -17,6 +22,10 @@ urlpatterns = [
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
 
     path('refresh/', RefreshTokenView.as_view(), name='token_refresh'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('logout-all/', LogoutAllView.as_view(), name='logout-all'),
+
+    path('get-user-profile/', user_profile_view.as_view(), name='user_profile'),
 
-    path('get-user-profile/', UserProfileView.as_view(), name='user_profile'),
+    path('affiliate/dashboard/', AffiliateDashboardView.as_view(), name='affiliate-dashboard'),
 ]
@@ -6,15 +6,23 @@ from .serializers import *
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from .tokens import NO_USER, VERSION_CLAIM, UserRefreshToken, aload_user, cached_user, token_version
+from .revocation import denylist, revoke_all_tokens
+from . import referrals
+from .hashers import aauthenticate
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework.permissions import AllowAny
 from django.utils import timezone
-from .send_otp import send_otp
+from .tasks import send_otp_email
 import random
 import string
 from datetime import timedelta
 from django.contrib.auth.password_validation import validate_password
 from .models import User, UserRole
+from core.async_views import AsyncAPIView
+from core.ratelimit import RateLimitThrottle
 import uuid
 
 
@@ -22,6 +30,9 @@ class SigninView(APIView):
     """
     Handle user login.
     """
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'sign-in'
+
     def post(self, request):
         email = request.data.get('email_address')
         password = request.data.get('password')
@@ -46,7 +57,7 @@ class SigninView(APIView):
         if user is None:
             return Response({"message": "Invalid credentials."}, status=status.HTTP_401_UNAUTHORIZED)
         
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         access_token = refresh.access_token
 
         return Response({
@@ -58,10 +69,48 @@ class SigninView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class SigninAsyncView(AsyncAPIView):
+    """SigninView for ASGI: the password is checked in the hasher thread pool."""
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'sign-in'
+
+    async def post(self, request):
+        email = request.data.get('email_address')
+        password = request.data.get('password')
+        role = request.data.get('role')
+
+        if not email:
+            return self.render({"message": "Email is required."}, status.HTTP_400_BAD_REQUEST)
+        if not password:
+            return self.render({"message": "Password is required."}, status.HTTP_400_BAD_REQUEST)
+
+        if not role or role not in [UserRole.FILMMAKER, UserRole.VIEWER]:
+            return self.render({"message": "Invalid role. Must be login as 'filmmaker' or 'viewer'."}, status.HTTP_400_BAD_REQUEST)
+
+        user = await aauthenticate(email, password)
+
+        if user is None:
+            return self.render({"message": "Invalid credentials."}, status.HTTP_401_UNAUTHORIZED)
+        if user.role != role:
+            return self.render({"message": 'Role mismatch'}, status.HTTP_400_BAD_REQUEST)
+
+        refresh = UserRefreshToken.for_user(user)
+        return {
+            "access_token": str(refresh.access_token),
+            "refresh_token": str(refresh),
+            "user_id": user.id,
+            "role": user.role,
+            "refer_code": user.referral_code
+        }
+
+
 class AdminLoginView(APIView):
     """
     Handle user login.
     """
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'sign-in'
+
     def post(self, request):
         email = request.data.get('email_address')
         password = request.data.get('password')
@@ -82,7 +131,7 @@ class AdminLoginView(APIView):
         if not user.is_active:
             return Response({"message": "Your account is inactive."}, status=status.HTTP_400_BAD_REQUEST)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         access_token = refresh.access_token
 
         return Response({
@@ -98,6 +147,9 @@ class SignupView(APIView):
     """
     Handle user signup.
     """
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'sign-up'
+
     def post(self, request):
         full_name = request.data.get('full_name')
         email = request.data.get('email_address')
@@ -105,6 +157,7 @@ class SignupView(APIView):
         confirm_password = request.data.get('confirm_password')
         role = request.data.get('role')
         terms_agreed = request.data.get('terms_agreed')
+        refer_code = request.data.get('refer_code')
 
         # Validate required fields
         if not full_name:
@@ -124,6 +177,12 @@ class SignupView(APIView):
         if User.objects.filter(email=email).exists():
             return Response({"message": "The email is already taken."}, status=status.HTTP_400_BAD_REQUEST)
 
+        refer_by = None
+        if refer_code:
+            refer_by = User.objects.filter(referral_code=refer_code.strip().upper()).first()
+            if refer_by is None:
+                return Response({"message": "Invalid referral code."}, status=status.HTTP_400_BAD_REQUEST)
+
         # Check password match
         if password != confirm_password:
             return Response({"message": "Passwords do not match."}, status=status.HTTP_400_BAD_REQUEST)
@@ -140,7 +199,8 @@ class SignupView(APIView):
                 email=email,
                 full_name=full_name,
                 role=role,
-                terms_agreed=terms_agreed
+                terms_agreed=terms_agreed,
+                refer_by=refer_by,
             )
             user.set_password(password)
             user.save()
@@ -157,6 +217,8 @@ class SignupView(APIView):
     
 class ForgotPasswordView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'otp-send'
 
     def post(self, request):
         email = request.data.get('email_address')
@@ -174,17 +236,17 @@ class ForgotPasswordView(APIView):
             user.otp = otp
             user.otp_expired = timezone.now() + timedelta(minutes=5)
             user.save()
-            send_email = send_otp(email, otp)
+            # SMTP runs in the job worker, not in the request
+            send_otp_email.enqueue(email, otp)
         except Exception as e:
             return Response({"message": f"Failed to process OTP. {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if send_email:
-            return Response({'user_id': user.id}, status=status.HTTP_200_OK)
-        else:
-            return Response({"message": "Failed to send OTP email. Please try again later."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'user_id': user.id}, status=status.HTTP_200_OK)
 
 class VerifyResetCodeView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'otp-verify'
 
     def post(self, request):
         user_id = request.data.get('user_id')
@@ -255,6 +317,9 @@ class ResetPasswordView(APIView):
 
 class ChangePasswordView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RateLimitThrottle]
+    ratelimit_scope = 'change-password'
+
     def post(self, request):
         email = request.user
         old_password = request.data.get('old_password')
@@ -284,8 +349,15 @@ class ChangePasswordView(APIView):
         user.set_password(new_password)
         user.save()
 
+        # The new password bumped token_version, so the caller's tokens are
+        # dead along with every other session's; hand back fresh ones
+        refresh = UserRefreshToken.for_user(user)
         return Response(
-            {"message": "Password changed successfully."},
+            {
+                "message": "Password changed successfully.",
+                "access_token": str(refresh.access_token),
+                "refresh_token": str(refresh),
+            },
             status=status.HTTP_200_OK,
         )
 
@@ -300,11 +372,54 @@ class RefreshTokenView(APIView):
 
         try:
             token = RefreshToken(refresh_token)
-            access_token = str(token.access_token)
-            return Response({'access_token': access_token}, status=status.HTTP_200_OK)
         except TokenError as e:
             return Response({'error': 'Invalid or expired refresh token.'}, status=status.HTTP_401_UNAUTHORIZED)
 
+        user_id = token.get(jwt_settings.USER_ID_CLAIM)
+        current = token_version(user_id)
+        if current == NO_USER or token.get(VERSION_CLAIM, 0) != current or denylist.is_revoked(token[jwt_settings.JTI_CLAIM]):
+            return Response({'error': 'Refresh token has been revoked.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS'):
+            return Response({'access_token': str(token.access_token)}, status=status.HTTP_200_OK)
+
+        # Rotation: each refresh token works once. revoke() is an insert on
+        # the jti primary key, so of two concurrent refreshes only one wins.
+        user = cached_user(user_id)
+        if user is None or not denylist.revoke(token):
+            return Response({'error': 'Refresh token has been revoked.'}, status=status.HTTP_401_UNAUTHORIZED)
+        refresh = UserRefreshToken.for_user(user)
+        return Response({
+            'access_token': str(refresh.access_token),
+            'refresh_token': str(refresh),
+        }, status=status.HTTP_200_OK)
+
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        refresh_token = request.data.get('refresh_token')
+        if refresh_token:
+            try:
+                token = RefreshToken(refresh_token)
+            except TokenError:
+                return Response({"message": "Invalid or expired refresh token."}, status=status.HTTP_400_BAD_REQUEST)
+            if token.get(jwt_settings.USER_ID_CLAIM) != request.user.pk:
+                return Response({"message": "Refresh token belongs to another user."}, status=status.HTTP_400_BAD_REQUEST)
+            denylist.revoke(token)
+        # The access token used for this request stops working too
+        denylist.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogoutAllView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_all_tokens(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
@@ -314,15 +429,70 @@ class UserProfileView(APIView):
         return Response({'data': serializer.data}, status=status.HTTP_200_OK)
 
     def patch(self, request):
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
+        # request.user may come from token claims and the short-lived user
+        # cache; write over the current row instead
+        serializer = UserSerializer(User.objects.get(pk=request.user.pk), data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response({'data': serializer.data}, status=status.HTTP_200_OK)
         return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request):
-        serializer = UserSerializer(request.user, data=request.data)
+        serializer = UserSerializer(User.objects.get(pk=request.user.pk), data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response({'data': serializer.data}, status=status.HTTP_200_OK)
-        return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserProfileAsyncView(AsyncAPIView):
+    """UserProfileView for ASGI: the token's user is loaded with the async ORM."""
+    requires_authentication = True
+
+    async def get(self, request):
+        user = await aload_user(request.user)
+        return {'data': UserSerializer(user).data}
+
+    async def patch(self, request):
+        return await self.delegate(UserProfileView, request)
+
+    async def put(self, request):
+        return await self.delegate(UserProfileView, request)
+
+
+class AffiliateDashboardView(APIView):
+    """Downline size, levels and earnings for an affiliate; staff may pass ?user_id=."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        user_id = request.query_params.get('user_id')
+        if user_id and user.is_staff:
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return Response({"message": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+        elif not user.is_affiliate:
+            return Response({"message": "Only affiliates have a referral dashboard."}, status=status.HTTP_403_FORBIDDEN)
+
+        earnings = referrals.downline_earnings(user)
+        return Response({
+            "data": {
+                "user_id": user.pk,
+                "referral_code": user.referral_code,
+                "downline": referrals.downline_summary(user),
+                "levels": referrals.downline_levels(user),
+                "earnings": {
+                    "films": earnings["films"],
+                    "total_earning": earnings["total_earning"] or 0,
+                },
+                "top_referrals": [
+                    {
+                        "user_id": row["ancestor_id"],
+                        "full_name": row["ancestor__full_name"],
+                        "date_joined": row["ancestor__date_joined"],
+                        "downline": row["downline"],
+                    }
+                    for row in referrals.top_referrals(user)
+                ],
+            }
+        }, status=status.HTTP_200_OK)
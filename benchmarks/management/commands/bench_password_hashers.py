@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from accounts.hashers import HASHERS, aauthenticate, argon2_available, hash_params
+from accounts.models import User, UserRole
+from benchmarks.runner import HOST
+from core import ratelimit
+
+PASSWORD = "Bench-pass-2024!"
+
+
+class Command(BaseCommand):
+    help = (
+        "Sign in repeatedly with each password hashing setting and report "
+        "logins/sec per core (sequential sign-ins through the sign-in view), "
+        "parallel throughput, and async throughput through the hash pool. "
+        "Algorithms other than PASSWORD_HASH_ALGORITHM run in a child process "
+        "configured for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--algorithms", default="pbkdf2,scrypt,argon2",
+            help="Comma-separated subset of: pbkdf2, scrypt, argon2.",
+        )
+        parser.add_argument("--logins", type=int, default=20, help="Sign-ins per measurement.")
+        parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+
+    def handle(self, *args, **options):
+        algorithms = [a.strip() for a in options["algorithms"].split(",") if a.strip()]
+        unknown = set(algorithms) - set(HASHERS)
+        if unknown:
+            raise CommandError(f"Unknown algorithms: {', '.join(sorted(unknown))}.")
+
+        results = {}
+        for algorithm in algorithms:
+            if algorithm == "argon2" and not argon2_available():
+                self.stderr.write("argon2: skipped, argon2-cffi is not installed.")
+                continue
+            if algorithm == settings.PASSWORD_HASH_ALGORITHM:
+                results[algorithm] = self.bench(algorithm, options["logins"], options["threads"])
+            else:
+                results[algorithm] = self.bench_in_child(algorithm, options["logins"], options["threads"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for algorithm, r in results.items():
+            self.stdout.write(
+                f"{algorithm:7} {r['params']}\n"
+                f"        sequential: {r['logins_per_sec_per_core']:.1f} logins/sec per core "
+                f"(p50 {r['p50_ms']:.1f} ms)\n"
+                f"        {r['threads']} threads: {r['parallel_logins_per_sec']:.1f} logins/sec\n"
+                f"        async pool: {r['async_logins_per_sec']:.1f} logins/sec"
+            )
+
+    def bench_in_child(self, algorithm, logins, threads):
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_password_hashers",
+            "--algorithms", algorithm, "--logins", str(logins), "--threads", str(threads), "--json",
+        ]
+        env = dict(os.environ, PASSWORD_HASH_ALGORITHM=algorithm)
+        try:
+            output = subprocess.run(command, env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"bench_password_hashers --algorithms {algorithm} failed with exit code {e.returncode}")
+        return json.loads(output)[algorithm]
+
+    def bench(self, algorithm, logins, threads):
+        """Benchmark the configured algorithm (PASSWORD_HASHERS[0]) in this process."""
+        email = f"hashbench-{uuid.uuid4().hex[:8]}@bench.local"
+        with ratelimit.paused():
+            User.objects.create(
+                email=email, full_name="Hash Bench", role=UserRole.VIEWER, terms_agreed=True,
+                password=make_password(PASSWORD),
+            )
+            try:
+                latencies = self.sign_in(email, logins)
+                parallel = self.parallel(email, logins, threads)
+                in_pool = self.async_pool(email, logins)
+            finally:
+                User.objects.filter(email=email).delete()
+        return {
+            "params": hash_params(algorithm),
+            "logins_per_sec_per_core": len(latencies) / sum(latencies),
+            "p50_ms": statistics.median(latencies) * 1000,
+            "threads": threads,
+            "parallel_logins_per_sec": parallel,
+            "async_logins_per_sec": in_pool,
+        }
+
+    def sign_in(self, email, count):
+        client = Client(HTTP_HOST=HOST)
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.post("/api/auth/sign-in/", {
+                "email_address": email, "password": PASSWORD, "role": UserRole.VIEWER,
+            }, content_type="application/json")
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"Sign-in failed: {response.status_code} {response.content[:200]!r}")
+        return latencies
+
+    def parallel(self, email, count, threads):
+        def worker():
+            try:
+                self.sign_in(email, count)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return count * threads / (time.perf_counter() - started)
+
+    def async_pool(self, email, count):
+        async def main():
+            started = time.perf_counter()
+            users = await asyncio.gather(*(aauthenticate(email, PASSWORD) for _ in range(count)))
+            if not all(users):
+                raise CommandError("Async authentication failed.")
+            return count / (time.perf_counter() - started)
+        return asyncio.run(main())
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Metrics where a higher value is a regression; throughput is the reverse
+HIGHER_IS_WORSE = ("p50_ms", "p95_ms", "p99_ms", "queries_per_request")
+
+
+class Command(BaseCommand):
+    help = "Diff two run_benchmarks JSON files and fail when a metric regresses past the threshold."
+
+    def add_arguments(self, parser):
+        parser.add_argument("baseline")
+        parser.add_argument("current")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Allowed relative slowdown for latency and throughput (0.2 = 20%%).",
+        )
+
+    @staticmethod
+    def load(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["scenarios"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+    def handle(self, *args, **options):
+        baseline, current = self.load(options["baseline"]), self.load(options["current"])
+        threshold = options["threshold"]
+        regressions = []
+
+        for name, before in baseline.items():
+            after = current.get(name)
+            if after is None:
+                self.stdout.write(f"{name}: missing from current run")
+                continue
+            checks = [(metric, before.get(metric), after.get(metric), True) for metric in HIGHER_IS_WORSE]
+            checks.append(("throughput_rps", before.get("throughput_rps"), after.get("throughput_rps"), False))
+            for metric, old, new, higher_is_worse in checks:
+                if old is None or new is None:
+                    continue
+                if metric == "queries_per_request":
+                    # Averages move a little with cache hit rates; a whole extra query per request is real
+                    regressed = new >= old + 1
+                elif higher_is_worse:
+                    regressed = new > old * (1 + threshold)
+                else:
+                    regressed = new < old * (1 - threshold)
+                change = (new - old) / old * 100 if old else 0.0
+                line = f"{name:14} {metric:20} {old:>10} -> {new:<10} ({change:+.1f}%)"
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+                if regressed:
+                    regressions.append(f"{name}.{metric}")
+            if after.get("errors", 0) > before.get("errors", 0):
+                regressions.append(f"{name}.errors")
+
+        if regressions:
+            raise CommandError(f"Regressions: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
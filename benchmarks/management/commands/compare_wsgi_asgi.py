@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+READ_SCENARIOS = "film_list,film_detail,user_profile"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare WSGI (sync views, threaded test client) with ASGI (async "
+        "views, concurrent AsyncClient) on the read endpoints. Each side runs "
+        "run_benchmarks in its own process so URL routing picks the right views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=READ_SCENARIOS)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--concurrency", default="8,64",
+            help="Comma-separated concurrency levels to run on both sides.",
+        )
+        parser.add_argument("--wsgi-url", help="Benchmark a running WSGI server over HTTP instead of in-process.")
+        parser.add_argument("--asgi-url", help="Benchmark a running ASGI server over HTTP instead of in-process.")
+        parser.add_argument("--output", help="Write the combined JSON results here.")
+
+    def run_side(self, async_views, concurrency, url, options):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            output = f.name
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "run_benchmarks",
+            "--scenarios", options["scenarios"],
+            "--requests", str(options["requests"]),
+            "--concurrency", str(concurrency),
+            "--output", output,
+        ]
+        if url:
+            command += ["--transport", "http", "--url", url]
+        else:
+            command += ["--transport", "asgi" if async_views else "wsgi"]
+        env = dict(os.environ, ASYNC_VIEWS="1" if async_views else "0")
+        try:
+            subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+            with open(output, encoding="utf-8") as f:
+                return json.load(f)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"run_benchmarks failed with exit code {e.returncode}")
+        finally:
+            os.unlink(output)
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",") if level.strip()]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of integers.")
+
+        results = []
+        for concurrency in levels:
+            wsgi = self.run_side(False, concurrency, options["wsgi_url"], options)
+            asgi = self.run_side(True, concurrency, options["asgi_url"], options)
+            for name, before in wsgi["scenarios"].items():
+                after = asgi["scenarios"][name]
+                results.append({"scenario": name, "concurrency": concurrency, "wsgi": before, "asgi": after})
+                ratio = (after["throughput_rps"] or 0) / before["throughput_rps"] if before["throughput_rps"] else 0
+                self.stdout.write(
+                    f"{name:14} c={concurrency:<4} "
+                    f"wsgi {before['throughput_rps']:>8} req/s p95 {before['p95_ms']:>9}ms | "
+                    f"asgi {after['throughput_rps']:>8} req/s p95 {after['p95_ms']:>9}ms | x{ratio:.2f}"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump({"meta": wsgi["meta"], "results": results}, f, indent=2)
+                f.write("\n")
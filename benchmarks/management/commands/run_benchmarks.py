@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import SCENARIOS, run_suite
+
+
+@contextmanager
+def asgi_server(port):
+    """Serve core.asgi with uvicorn on localhost for the duration of the block."""
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        raise CommandError("--serve needs uvicorn installed (pip install uvicorn).")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "core.asgi:application", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, RATELIMIT_ENABLED="0"),
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            raise CommandError("uvicorn did not start within 30s.")
+        yield f"http://localhost:{port}"
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the auth and catalog endpoints and write p50/p95/p99 latency, "
+        "queries per request and throughput to a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios", default=",".join(SCENARIOS),
+            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}.",
+        )
+        parser.add_argument(
+            "--transport", choices=["wsgi", "asgi", "http"], default="wsgi",
+            help="wsgi: test client (counts queries); asgi: in-process AsyncClient; http: a running server.",
+        )
+        parser.add_argument("--url", help="Base URL for --transport http, e.g. http://localhost:8000.")
+        parser.add_argument("--serve", action="store_true", help="Start a local uvicorn server for --transport http.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+        parser.add_argument(
+            "--auth-requests", type=int, default=100,
+            help="Requests for signin/signup, which are dominated by the password hasher.",
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--fast-hasher", action="store_true",
+            help="Hash signup passwords at minimum cost so its numbers reflect the database rather than the hasher.",
+        )
+        parser.add_argument("--output", help="Write the JSON results here (default: stdout).")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",") if name.strip()]
+        unknown = set(scenarios) - SCENARIOS.keys()
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        transport = options["transport"]
+        if transport == "http" and not (options["url"] or options["serve"]):
+            raise CommandError("--transport http needs --url or --serve.")
+
+        requests = {
+            "default": options["requests"],
+            "signin": options["auth_requests"],
+            "signup": options["auth_requests"],
+        }
+        server = asgi_server(options["port"]) if options["serve"] else nullcontext(options["url"])
+        log = lambda message: self.stderr.write(message)
+
+        # Expected 4xx responses would otherwise flood stderr
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        with server as base_url:
+            try:
+                results = run_suite(
+                    scenarios, transport, requests, options["concurrency"],
+                    base_url=base_url, fast_signup_hasher=options["fast_hasher"], log=log,
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        results["meta"]["fast_hasher"] = options["fast_hasher"]
+
+        payload = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(payload + "\n")
+            for name, stats in results["scenarios"].items():
+                self.stdout.write(
+                    f"{name:14} p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms  "
+                    f"{stats['throughput_rps']} req/s  queries {stats['queries_per_request']}  errors {stats['errors']}"
+                )
+        else:
+            self.stdout.write(payload)
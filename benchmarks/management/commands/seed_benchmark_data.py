@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.seed import seed_films, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users, genres and films for the benchmark suite. "
+        "Re-running tops the data up to the requested counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--films", type=int, default=10000, help="Total benchmark films (10k to 1M).")
+        parser.add_argument("--users", type=int, default=2000, help="Total benchmark users.")
+        parser.add_argument("--filmmakers", type=int, default=200, help="How many of the users are filmmakers.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        log = lambda message: self.stdout.write(message)
+        seed_users(options["users"], options["filmmakers"], log=log)
+        seed_films(options["films"], options["filmmakers"], batch_size=options["batch_size"], log=log)
+        self.stdout.write(self.style.SUCCESS("Benchmark data ready."))
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import platform
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextlib import nullcontext
+
+import django
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.hashers import MINIMUM_PARAMS, cost_override
+from accounts.models import User
+from accounts.tokens import UserRefreshToken
+from core import ratelimit
+from core.database import describe
+from movieApp.models import Film
+from .seed import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD
+
+HOST = "localhost"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, queries, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+class Fixtures:
+    """Ids and credentials the scenarios draw from, loaded once per run."""
+
+    def __init__(self, sample_size=1000):
+        users = list(
+            User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}")
+            .order_by("?").values_list("id", "email", "role", "token_version")[:sample_size]
+        )
+        if not users:
+            raise ValueError("No benchmark users found; run seed_benchmark_data first.")
+        self.users = [(user_id, email, role) for user_id, email, role, _ in users]
+        self.film_ids = list(Film.objects.order_by("?").values_list("id", flat=True)[:sample_size])
+        if not self.film_ids:
+            raise ValueError("No films found; run seed_benchmark_data first.")
+        self.tokens = {
+            user_id: str(UserRefreshToken.for_user(User(id=user_id, role=role, token_version=version)).access_token)
+            for user_id, _, role, version in users[:100]
+        }
+        self.run_id = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def next_index(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+
+# Each scenario returns (method, path, json body or None, headers)
+def signin(fx):
+    _, email, role = random.choice(fx.users)
+    return "POST", "/api/auth/sign-in/", {"email_address": email, "password": BENCH_PASSWORD, "role": role}, {}
+
+
+def signup(fx):
+    i = fx.next_index()
+    return "POST", "/api/auth/sign-up/", {
+        "full_name": f"Signup Bench {i}",
+        "email_address": f"signup-{fx.run_id}-{i}@{BENCH_EMAIL_DOMAIN}",
+        "password": BENCH_PASSWORD,
+        "confirm_password": BENCH_PASSWORD,
+        "role": "viewer",
+        "terms_agreed": True,
+    }, {}
+
+
+def film_list(fx):
+    query = random.choice(["", "?status=published&ordering=-views", "?type=drama&status=published"])
+    return "GET", f"/flims/films-list/{query}", None, {}
+
+
+def film_detail(fx):
+    return "GET", f"/flims/films/{random.choice(fx.film_ids)}/", None, {}
+
+
+def user_profile(fx):
+    token = random.choice(list(fx.tokens.values()))
+    return "GET", "/api/auth/get-user-profile/", None, {"Authorization": f"Bearer {token}"}
+
+
+SCENARIOS = {
+    "signin": signin,
+    "signup": signup,
+    "film_list": film_list,
+    "film_detail": film_detail,
+    "user_profile": user_profile,
+}
+EXPECTED_STATUS = {"signin": 200, "signup": 201, "film_list": 200, "film_detail": 200, "user_profile": 200}
+
+
+def run_sync(name, fixtures, requests, concurrency, send):
+    """Run a scenario on `concurrency` threads; send(method, path, body, headers) -> status."""
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+    build = SCENARIOS[name]
+
+    def worker(count):
+        try:
+            for _ in range(count):
+                request = build(fixtures)
+                started = time.perf_counter()
+                status_code, query_count = send(*request)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    if query_count is not None:
+                        queries.append(query_count)
+                    if status_code != EXPECTED_STATUS[name]:
+                        errors[0] += 1
+        finally:
+            connections.close_all()
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares if share]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], queries, time.perf_counter() - started)
+
+
+def wsgi_sender():
+    """django.test.Client per thread; also counts SQL queries per request."""
+    local = threading.local()
+
+    def send(method, path, body, headers):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client(HTTP_HOST=HOST)
+        with CaptureQueriesContext(connection) as captured:
+            if method == "GET":
+                response = client.get(path, headers=headers)
+            else:
+                response = client.post(path, body, content_type="application/json", headers=headers)
+        return response.status_code, len(captured.captured_queries)
+
+    return send
+
+
+def http_sender(base_url):
+    """Plain HTTP against a running server (uvicorn, gunicorn, runserver)."""
+
+    def send(method, path, body, headers):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(base_url.rstrip("/") + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        for key, value in headers.items():
+            request.add_header(key, value)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        except OSError:
+            return 0, None
+
+    return send
+
+
+class HostAsyncClient(AsyncClient):
+    """AsyncClient sending Host: HOST; the stock one always sends testserver."""
+
+    def request(self, **request):
+        request["headers"] = [
+            (b"host", HOST.encode("ascii")) if key == b"host" else (key, value)
+            for key, value in request["headers"]
+        ]
+        return super().request(**request)
+
+
+def run_asgi(name, fixtures, requests, concurrency):
+    """Drive Django's ASGI handler in-process with AsyncClient coroutines."""
+    build = SCENARIOS[name]
+    # Build requests up front: scenario builders may touch the ORM
+    planned = [build(fixtures) for _ in range(requests)]
+
+    async def main():
+        client = HostAsyncClient()
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(method, path, body, headers):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                if method == "GET":
+                    response = await client.get(path, headers=headers)
+                else:
+                    response = await client.post(path, body, content_type="application/json", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != EXPECTED_STATUS[name]:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*request) for request in planned))
+        return summarize(latencies, errors, [], time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+def run_suite(scenarios, transport, requests, concurrency, base_url=None,
+              fast_signup_hasher=False, rate_limits=False, log=print):
+    """
+    Run each scenario and return {"meta": ..., "scenarios": {name: stats}}.
+    fast_signup_hasher hashes signup passwords at the lowest cost the
+    configured algorithm allows; signin keeps the configured cost so seeded
+    hashes are never upgraded. Rate limits are off for in-process transports
+    unless rate_limits is set; start a server under test with
+    RATELIMIT_ENABLED=0 for --transport http.
+    """
+    fixtures = Fixtures()
+    results = {}
+    for name in scenarios:
+        count = requests.get(name, requests["default"]) if isinstance(requests, dict) else requests
+        log(f"{name}: {count} requests, concurrency {concurrency}, {transport}")
+        fast_hasher = fast_signup_hasher and name == "signup"
+        # Every benchmark request comes from one client; rate limits would
+        # turn most of them into 429s
+        with nullcontext() if rate_limits else ratelimit.paused(), \
+                cost_override(MINIMUM_PARAMS) if fast_hasher else nullcontext():
+            if transport == "asgi":
+                results[name] = run_asgi(name, fixtures, count, concurrency)
+            else:
+                send = wsgi_sender() if transport == "wsgi" else http_sender(base_url)
+                results[name] = run_sync(name, fixtures, count, concurrency, send)
+
+    User.objects.filter(email__startswith=f"signup-{fixtures.run_id}-").delete()
+    return {
+        "meta": {
+            "timestamp": timezone.now().isoformat(),
+            "transport": transport,
+            "concurrency": concurrency,
+            "database": describe(connection.settings_dict),
+            "films": Film.objects.count(),
+            "users": User.objects.count(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "scenarios": results,
+    }
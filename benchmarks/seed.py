@@ -0,0 +1,102 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User, UserRole
+from movieApp.ingest import FilmImporter
+from movieApp.models import Film, FilmStatus, FilmType, Genre
+from movieApp.search import get_search_backend
+
+BENCH_EMAIL_DOMAIN = "bench.streamlab.test"
+BENCH_PASSWORD = "Bench-pass-2024!"
+GENRES = (
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+    "Romance", "Sci-Fi", "Thriller", "War", "Western",
+)
+WORDS = (
+    "night", "river", "silent", "city", "last", "journey", "golden", "shadow",
+    "storm", "garden", "echo", "winter", "broken", "secret", "light", "road",
+    "ocean", "empire", "dream", "signal", "harbor", "mirror", "north", "fire",
+)
+
+
+def bench_email(index):
+    return f"user{index}@{BENCH_EMAIL_DOMAIN}"
+
+
+def seed_users(count, filmmakers, batch_size=2000, log=print):
+    """
+    Create `count` users (the first `filmmakers` are filmmakers). All share
+    one password hash, so seeding does not pay the hasher per user.
+    """
+    password = make_password(BENCH_PASSWORD)
+    existing = User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").count()
+    for start in range(existing, count, batch_size):
+        users = [
+            User(
+                email=bench_email(i),
+                full_name=f"{random.choice(WORDS).title()} {random.choice(WORDS).title()} {i}",
+                role=UserRole.FILMMAKER if i < filmmakers else UserRole.VIEWER,
+                terms_agreed=True,
+                password=password,
+            )
+            for i in range(start, min(start + batch_size, count))
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        log(f"users: {min(start + batch_size, count)}/{count}")
+
+
+def seed_genres():
+    Genre.objects.bulk_create([Genre(name=name) for name in GENRES], ignore_conflicts=True)
+    return dict(Genre.objects.filter(name__in=GENRES).values_list("name", "id"))
+
+
+def seed_films(count, filmmakers, batch_size=5000, log=print):
+    genres = seed_genres()
+    makers = list(
+        User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}", role=UserRole.FILMMAKER)
+        .only("id", "full_name")[:filmmakers]
+    )
+    if not makers:
+        raise ValueError("Seed filmmakers before films.")
+
+    existing = Film.objects.filter(filmmaker__email__endswith=f"@{BENCH_EMAIL_DOMAIN}").count()
+    statuses = [FilmStatus.PUBLISHED] * 8 + [FilmStatus.REVIEW, FilmStatus.REJECTED]
+    now = timezone.now()
+    started = time.monotonic()
+    for start in range(existing, count, batch_size):
+        films, through, documents = [], [], []
+        for i in range(start, min(start + batch_size, count)):
+            maker = makers[i % len(makers)]
+            film_status = random.choice(statuses)
+            film = Film(
+                filmmaker=maker,
+                title=" ".join(random.sample(WORDS, 3)).title(),
+                year=random.randint(1960, now.year),
+                logline=" ".join(random.choices(WORDS, k=12)),
+                type=random.choice(FilmType.values),
+                thumbnail=f"image/upload/v1/thumbnails/bench_{i}.jpg",
+                trailer=f"video/upload/v1/trailers/bench_{i}.mp4",
+                full_film=f"video/upload/v1/full_films/bench_{i}.mp4",
+                status=film_status,
+                duration_s=random.randint(300, 3 * 3600),
+                rent_price=random.choice(["0.00", "1.99", "2.99", "4.99"]),
+                buy_price=random.choice(["0.00", "9.99", "14.99"]),
+                views=random.randint(0, 100000),
+                published_at=now if film_status == FilmStatus.PUBLISHED else None,
+            )
+            names = random.sample(GENRES, random.randint(1, 3))
+            films.append(film)
+            through.extend((film.pk, genres[name]) for name in names)
+            documents.append((film.pk, film.title, film.logline, " ".join(names), maker.full_name))
+
+        with transaction.atomic():
+            Film.objects.bulk_create(films, batch_size=1000)
+            FilmImporter.insert_through_rows(through)
+            get_search_backend().add_documents(documents)
+        done = min(start + batch_size, count)
+        log(f"films: {done}/{count} ({(done - existing) / max(time.monotonic() - started, 1e-9):.0f}/s)")
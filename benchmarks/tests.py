@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from accounts.models import User
+from movieApp.models import Film
+from .runner import percentile, run_suite, summarize
+from .seed import BENCH_EMAIL_DOMAIN, seed_films, seed_users
+
+
+class SummaryTests(SimpleTestCase):
+    def test_nearest_rank_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summary_of_a_run(self):
+        stats = summarize([0.003, 0.001, 0.002], 1, [2, 4], 0.5)
+        self.assertEqual(
+            (stats["requests"], stats["errors"], stats["p50_ms"], stats["p99_ms"], stats["queries_per_request"]),
+            (3, 1, 2.0, 3.0, 3.0),
+        )
+        self.assertEqual(stats["throughput_rps"], 6.0)
+
+
+# Worker threads open their own connections, so seeded rows must be committed
+@override_settings(PASSWORD_HASH_PARAMS={"pbkdf2": {"iterations": 1000}}, PASSWORD_HASH_PARAMS_FILE=None)
+class BenchmarkSuiteTests(TransactionTestCase):
+    def setUp(self):
+        quiet = lambda message: None
+        seed_users(6, 2, log=quiet)
+        seed_films(12, 2, log=quiet)
+
+    def test_seeding_tops_up_to_the_requested_counts(self):
+        seed_users(8, 2, log=lambda message: None)
+        self.assertEqual(User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").count(), 8)
+        self.assertEqual(Film.objects.count(), 12)
+        self.assertEqual(Film.objects.filter(genre__isnull=True).count(), 0)
+
+    def run_suite(self, transport, scenarios, concurrency=2):
+        return run_suite(scenarios, transport, 6, concurrency, fast_signup_hasher=True, log=lambda message: None)
+
+    def test_wsgi_scenarios_succeed_and_clean_up(self):
+        users = User.objects.count()
+        # One thread: the in-memory test database locks tables on concurrent writes
+        results = self.run_suite("wsgi", ["signin", "signup", "film_list", "film_detail", "user_profile"], 1)
+        self.assertEqual({name: stats["errors"] for name, stats in results["scenarios"].items()},
+                         dict.fromkeys(results["scenarios"], 0))
+        self.assertEqual(results["scenarios"]["film_list"]["requests"], 6)
+        self.assertIsNotNone(results["scenarios"]["film_detail"]["queries_per_request"])
+        self.assertEqual(results["meta"]["films"], 12)
+        # Signup users are deleted; seeded hashes were not upgraded by signin
+        self.assertEqual(User.objects.count(), users)
+        self.assertTrue(all(password.startswith("pbkdf2_sha256$1000$")
+                            for password in User.objects.values_list("password", flat=True)))
+
+    def test_asgi_scenarios_succeed(self):
+        results = self.run_suite("asgi", ["film_list", "user_profile"])
+        self.assertEqual([stats["errors"] for stats in results["scenarios"].values()], [0, 0])
+
+    def test_rate_limits_stay_on_outside_the_runner(self):
+        response = None
+        for _ in range(30):
+            response = self.client.post("/api/auth/sign-in/", {
+                "email_address": f"user3@{BENCH_EMAIL_DOMAIN}", "password": "wrong", "role": "viewer",
+            }, content_type="application/json")
+            if response.status_code == 429:
+                break
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,99 @@
+"""
+Async counterparts of DRF's APIView for read-heavy endpoints.
+
+DRF views are synchronous, so under ASGI every request is handed to a
+worker thread. AsyncAPIView is a plain Django view with `async def`
+handlers: it authenticates the JWT without blocking (see
+ClaimsJWTAuthentication.aauthenticate), runs the handler on
+the event loop and renders the returned data as JSON the way DRF would.
+Handlers must only touch the database through the async ORM (aget,
+afirst, aiterator, ...) and may await slow outbound calls.
+
+Methods that are not defined as coroutines can be delegated to an
+existing sync APIView with `delegate()`. DRF throttle_classes are honoured;
+their counters are updated in a worker thread.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from accounts.authentication import ClaimsJWTAuthentication
+
+
+class AsyncAPIView(View):
+    authentication = ClaimsJWTAuthentication()
+    requires_authentication = False
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = ()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token auth only, like the DRF views
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None:
+            return HttpResponseNotAllowed(self._allowed_methods())
+        drf_request = Request(request, parsers=[parser() for parser in self.parser_classes], authenticators=())
+        try:
+            drf_request.user = await self.aauthenticate(drf_request)
+            await self.check_throttles(drf_request)
+            data = await handler(drf_request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+        if isinstance(data, HttpResponse):
+            return data
+        return self.render(data)
+
+    async def aauthenticate(self, request):
+        result = await self.authentication.aauthenticate(request)
+        if result is None:
+            if self.requires_authentication:
+                raise exceptions.NotAuthenticated()
+            return AnonymousUser()
+        request.auth = result[1]
+        return result[0]
+
+    async def check_throttles(self, request):
+        waits = []
+        for throttle in (throttle_class() for throttle_class in self.throttle_classes):
+            if not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    @staticmethod
+    def render(data, status_code=status.HTTP_200_OK):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, content_type="application/json")
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound()
+        if not isinstance(exc, exceptions.APIException):
+            raise exc
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = self.render(detail, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response["WWW-Authenticate"] = self.authentication.authenticate_header(None)
+        if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+            response["Retry-After"] = "%d" % exc.wait
+        return response
+
+    @staticmethod
+    async def delegate(view_class, request, *args, **kwargs):
+        """Run a sync DRF view (e.g. for writes) in a worker thread."""
+        response = await sync_to_async(view_class.as_view())(request._request, *args, **kwargs)
+        # DRF responses render lazily; do it off the event loop
+        if hasattr(response, "render") and not response.is_rendered:
+            response = await sync_to_async(response.render)()
+        return response
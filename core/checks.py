@@ -0,0 +1,32 @@
+"""
+System checks for settings the apps rely on across processes.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries are only visible to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_is_shared():
+    """True if entries in the default cache are visible to every process."""
+    return settings.CACHES.get("default", {}).get("BACKEND") not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    backend = settings.CACHES["default"]["BACKEND"]
+    return [Error(
+        f"The default cache ({backend}) is local to each process.",
+        hint=(
+            "Film detail, entitlement, token version and denylist invalidations "
+            "would not reach other worker processes. Configure a shared cache "
+            "with CACHE_BACKEND and CACHE_LOCATION."
+        ),
+        id="core.E001",
+    )]
@@ -0,0 +1,84 @@
+"""
+Environment-driven DATABASES configuration.
+
+DB_ENGINE=sqlite (default) keeps a local db.sqlite3 file (not tracked; run
+migrate to create it), tuned for concurrent writers with Django's own
+OPTIONS: a WAL journal and synchronous=NORMAL through init_command, a busy
+timeout, and IMMEDIATE transactions so writers queue instead of failing on
+lock upgrade. Set DB_SQLITE_TUNED=0 to get Django's stock SQLite behaviour.
+
+DB_ENGINE=postgres needs psycopg[binary,pool]. With DB_POOL=1 (default)
+Django's built-in psycopg connection pool is used; with DB_POOL=0
+connections persist for DB_CONN_MAX_AGE seconds instead. Health checks are
+on in both cases.
+"""
+import os
+
+TRUTHY = ("1", "true", "yes", "on")
+
+
+def _flag(env, name, default):
+    return env.get(name, default).lower() in TRUTHY
+
+
+def sqlite_config(base_dir, env):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.get('DB_NAME') or base_dir / 'db.sqlite3',
+        'OPTIONS': {},
+    }
+    if _flag(env, 'DB_SQLITE_TUNED', '1'):
+        config['OPTIONS'] = {
+            'transaction_mode': 'IMMEDIATE',
+            # sqlite3.connect() sets the busy timeout, in seconds
+            'timeout': int(env.get('DB_BUSY_TIMEOUT_MS', 5000)) / 1000,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        }
+    return config
+
+
+def postgres_config(env):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('DB_NAME', 'streamlab'),
+        'USER': env.get('DB_USER', 'streamlab'),
+        'PASSWORD': env.get('DB_PASSWORD', ''),
+        'HOST': env.get('DB_HOST', 'localhost'),
+        'PORT': env.get('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': int(env.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+    }
+    if _flag(env, 'DB_POOL', '1'):
+        # The pool owns connection reuse; Django requires CONN_MAX_AGE = 0 with it
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(env.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(env.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(env.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        config['CONN_MAX_AGE'] = int(env.get('DB_CONN_MAX_AGE', 60))
+    return config
+
+
+def database_config(base_dir, env=None):
+    env = os.environ if env is None else env
+    engine = env.get('DB_ENGINE', 'sqlite').lower()
+    if engine in ('postgres', 'postgresql'):
+        return {'default': postgres_config(env)}
+    if engine == 'sqlite':
+        return {'default': sqlite_config(base_dir, env)}
+    raise ValueError(f"Unsupported DB_ENGINE '{engine}'. Use 'sqlite' or 'postgres'.")
+
+
+def describe(settings_dict):
+    """Short human-readable name of a database profile, for benchmark output."""
+    engine = settings_dict['ENGINE'].rsplit('.', 1)[-1]
+    options = settings_dict.get('OPTIONS', {})
+    if engine == 'sqlite3':
+        return 'sqlite-tuned' if options.get('init_command') else 'sqlite-default'
+    if options.get('pool'):
+        return f"postgres-pool({options['pool'].get('max_size')})"
+    return f"postgres-persistent({settings_dict.get('CONN_MAX_AGE')}s)"
@@ -0,0 +1,198 @@
+"""
+File delivery for MEDIA_ROOT and locally stored playback assets.
+
+serve_file() answers conditional (If-None-Match, If-Modified-Since) and byte
+range (Range, If-Range) requests with a strong ETag built from the file's
+size and mtime. Bodies are a FileResponse over a MappedRange: WSGI servers
+with a sendfile-backed wsgi.file_wrapper (gunicorn, uWSGI) send the range
+straight from the page cache using its fileno()/tell() and Content-Length,
+and everything else reads slices of a read-only mmap instead of issuing a
+read() per block.
+
+With MEDIA_ACCEL set, no bytes pass through Python at all: the response only
+carries X-Accel-Redirect (nginx: MEDIA_ACCEL_PREFIX plus the absolute path)
+or X-Sendfile (Apache, lighttpd) and the front proxy serves the file, ranges
+included. Conditional requests are still answered here.
+"""
+import io
+import mimetypes
+import mmap
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# The system table maps .ts to Qt translations on some platforms
+mimetypes.add_type("video/mp2t", ".ts")
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class MappedRange:
+    """
+    Read-only file object over bytes [start, stop) of a file. Positions are
+    absolute file offsets, and the descriptor's own offset is kept at the
+    same position: sendfile-based file wrappers (gunicorn) read it with
+    os.lseek(fileno(), 0, SEEK_CUR) rather than calling tell().
+    """
+
+    def __init__(self, path, start, stop):
+        self.name = str(path)
+        self.start = start
+        self.stop = stop
+        self._pos = start
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        # mmap refuses empty files
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stop > start else None
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.stop}[whence]
+        self._pos = min(max(base + offset, self.start), self.stop)
+        self._file.seek(self._pos)
+        return self._pos
+
+    def read(self, size=-1):
+        end = self.stop if size is None or size < 0 else min(self.stop, self._pos + size)
+        if self._map is None or end <= self._pos:
+            return b""
+        data = self._map[self._pos:end]
+        self._pos = end
+        self._file.seek(end)
+        return data
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, stop) for a single-range Range header, or None to send the whole
+    file. Multiple ranges are answered with the whole file, which RFC 9110
+    allows. Raises RangeNotSatisfiable when the range lies past the end.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size
+    start = int(first)
+    stop = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, stop
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if value is None:
+        return True
+    if value.startswith('"'):
+        # Strong comparison only
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _accel_response(path, content_type):
+    mode = settings.MEDIA_ACCEL
+    response = HttpResponse(content_type=content_type)
+    if mode == "x-accel-redirect":
+        # An internal nginx location rooted at / maps the prefix back to the path
+        absolute = Path(path).resolve().as_posix().lstrip("/")
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(absolute)
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = str(Path(path).resolve())
+    else:
+        raise ValueError(f"Unknown MEDIA_ACCEL '{mode}'.")
+    return response
+
+
+def serve_file(request, path, cache_control=None):
+    """Response for the file at path (which must exist), honouring ranges."""
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = '"%x-%x"' % (stat.st_mtime_ns, size)
+    content_type, encoding = mimetypes.guess_type(str(path))
+    if encoding or not content_type:
+        # .gz and friends are served as is; don't let clients decode them
+        content_type = "application/octet-stream"
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        response = not_modified
+    elif getattr(settings, "MEDIA_ACCEL", None):
+        response = _accel_response(path, content_type)
+    else:
+        span = None
+        if request.method == "GET" and _if_range_matches(request, etag, last_modified):
+            try:
+                span = parse_range(request.headers.get("Range"), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416, content_type=content_type)
+                response["Content-Range"] = f"bytes */{size}"
+                response["Accept-Ranges"] = "bytes"
+                return response
+        start, stop = span or (0, size)
+        response = FileResponse(MappedRange(path, start, stop), content_type=content_type)
+        response.block_size = getattr(settings, "MEDIA_BLOCK_SIZE", 256 * 1024)
+        if span is not None:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if cache_control and not isinstance(response, HttpResponseNotModified):
+        response["Cache-Control"] = cache_control
+    return response
+
+
+def serve(request, path, document_root=None, cache_control=None):
+    """
+    Drop-in replacement for django.views.static.serve:
+
+        re_path(r"^media/(?P<path>.*)$", serve)  # document_root defaults to MEDIA_ROOT
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponse(status=405, headers={"Allow": "GET, HEAD"})
+    try:
+        full_path = Path(safe_join(document_root or settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+    if not full_path.is_file():
+        raise Http404("File not found.")
+    return serve_file(request, full_path, cache_control or getattr(settings, "MEDIA_CACHE_CONTROL", None))
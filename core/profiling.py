@@ -0,0 +1,352 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware records, per request, the resolved view, SQL query
+count and time, serializer time, total latency and response size. Queries
+whose SQL repeats within one request (the N+1 pattern) are flagged and
+logged. Measurements feed per-endpoint rolling histograms kept in this
+process, reported as JSON for admins and in the Prometheus text format.
+
+Turn it on with PROFILING_ENABLED = True. When off, Django drops the
+middleware at startup (MiddlewareNotUsed), so it costs nothing.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (buckets, help text); durations in seconds, sizes in bytes
+METRICS = {
+    "duration_seconds": (LATENCY_BUCKETS, "Request latency."),
+    "db_queries": (QUERY_BUCKETS, "SQL queries per request."),
+    "db_duration_seconds": (LATENCY_BUCKETS, "Time spent in SQL per request."),
+    "serializer_duration_seconds": (LATENCY_BUCKETS, "Time spent in DRF serializer .data per request."),
+    "response_size_bytes": (SIZE_BUCKETS, "Response body size."),
+}
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= buckets[i], the last slot is +Inf."""
+    __slots__ = ("buckets", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.sum += other.sum
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket, clamped to the observed range."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = max(self.buckets[i - 1] if i else 0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+class RollingHistogram:
+    """
+    A cumulative histogram (for Prometheus) plus a ring of per-slot
+    histograms covering the last `window` seconds (for percentiles).
+    """
+
+    def __init__(self, buckets, window=600, slots=10):
+        self.buckets = buckets
+        self.slot_seconds = window / slots
+        self.total = Histogram(buckets)
+        self.slots = deque(maxlen=slots)
+
+    def observe(self, value, now):
+        self.total.observe(value)
+        slot = int(now // self.slot_seconds)
+        if not self.slots or self.slots[-1][0] != slot:
+            self.slots.append((slot, Histogram(self.buckets)))
+        self.slots[-1][1].observe(value)
+
+    def recent(self, now):
+        oldest = int(now // self.slot_seconds) - self.slots.maxlen + 1
+        merged = Histogram(self.buckets)
+        for slot, histogram in self.slots:
+            if slot >= oldest:
+                merged.merge(histogram)
+        return merged
+
+
+class EndpointStats:
+    def __init__(self, window):
+        self.histograms = {name: RollingHistogram(buckets, window) for name, (buckets, _) in METRICS.items()}
+        self.statuses = Counter()
+        self.n_plus_one = 0
+        self.duplicates = deque(maxlen=5)
+
+
+class ProfileRegistry:
+    """Per-process aggregate of request profiles, keyed by (view, method)."""
+
+    def __init__(self, window=600):
+        self.window = window
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, profile):
+        now = time.time()
+        with self.lock:
+            stats = self.endpoints.get((profile.view, profile.method))
+            if stats is None:
+                stats = self.endpoints[(profile.view, profile.method)] = EndpointStats(self.window)
+            for name, value in profile.metrics().items():
+                if value is not None:
+                    stats.histograms[name].observe(value, now)
+            stats.statuses[profile.status] += 1
+            if profile.duplicates:
+                stats.n_plus_one += 1
+                stats.duplicates.append({"at": now, "queries": profile.duplicates})
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def report(self):
+        """Percentiles over the rolling window, per endpoint, in ms/bytes/queries."""
+        now = time.time()
+        scale = lambda name, value: (
+            None if value is None else round(value * 1000, 3) if name.endswith("_seconds") else round(value, 1)
+        )
+        endpoints = []
+        with self.lock:
+            for (view, method), stats in self.endpoints.items():
+                entry = {
+                    "view": view, "method": method,
+                    "requests": stats.histograms["duration_seconds"].total.count,
+                    "statuses": dict(stats.statuses),
+                    "n_plus_one_requests": stats.n_plus_one,
+                    "recent_duplicates": list(stats.duplicates),
+                }
+                for name, histogram in stats.histograms.items():
+                    recent = histogram.recent(now)
+                    label = name.replace("_seconds", "_ms")
+                    entry[label] = {
+                        "count": recent.count,
+                        "mean": scale(name, recent.sum / recent.count) if recent.count else None,
+                        "p50": scale(name, recent.quantile(0.5)),
+                        "p95": scale(name, recent.quantile(0.95)),
+                        "p99": scale(name, recent.quantile(0.99)),
+                    }
+                endpoints.append(entry)
+        endpoints.sort(key=lambda entry: -entry["requests"])
+        return {"window_s": self.window, "endpoints": endpoints}
+
+    def prometheus(self):
+        """Render cumulative histograms in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            for name, (buckets, help_text) in METRICS.items():
+                metric = f"streamlab_request_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for (view, method), stats in items:
+                    histogram = stats.histograms[name].total
+                    labels = f'view="{_escape(view)}",method="{method}"'
+                    cumulative = 0
+                    for bound, n in zip(buckets + ("+Inf",), histogram.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+            lines += ["# HELP streamlab_requests_total Requests by view and status.", "# TYPE streamlab_requests_total counter"]
+            for (view, method), stats in items:
+                for code, n in sorted(stats.statuses.items()):
+                    lines.append(f'streamlab_requests_total{{view="{_escape(view)}",method="{method}",status="{code}"}} {n}')
+
+            lines += [
+                "# HELP streamlab_request_n_plus_one_total Requests that repeated the same SQL past the threshold.",
+                "# TYPE streamlab_request_n_plus_one_total counter",
+            ]
+            for (view, method), stats in items:
+                lines.append(f'streamlab_request_n_plus_one_total{{view="{_escape(view)}",method="{method}"}} {stats.n_plus_one}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = ProfileRegistry(window=getattr(settings, "PROFILING_WINDOW", 600))
+
+
+class RequestProfile:
+    __slots__ = (
+        "view", "method", "status", "started", "duration", "queries", "db_time",
+        "serializer_time", "serializer_depth", "size", "sql", "duplicates",
+    )
+
+    def __init__(self, method):
+        self.view = "unresolved"
+        self.method = method
+        self.status = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.size = None
+        self.sql = Counter()
+        self.duplicates = []
+
+    def metrics(self):
+        return {
+            "duration_seconds": self.duration,
+            "db_queries": self.queries,
+            "db_duration_seconds": self.db_time,
+            "serializer_duration_seconds": self.serializer_time,
+            "response_size_bytes": self.size,
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.sql[sql] += 1
+
+
+def view_name(view_func):
+    view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(view_func, "__name__", type(view_func).__name__)
+
+
+def _install_serializer_timer():
+    """Time BaseSerializer.data for the outermost serializer of each request."""
+    from rest_framework.serializers import BaseSerializer, ListSerializer, Serializer
+
+    def timed(prop):
+        getter = prop.fget
+        if getattr(getter, "_profiled", False):
+            return prop
+
+        def data(self):
+            profile = _current.get()
+            if profile is None:
+                return getter(self)
+            profile.serializer_depth += 1
+            started = time.perf_counter()
+            try:
+                return getter(self)
+            finally:
+                profile.serializer_depth -= 1
+                if not profile.serializer_depth:
+                    profile.serializer_time += time.perf_counter() - started
+
+        data._profiled = True
+        return property(data)
+
+    # Serializer and ListSerializer override .data, so each needs wrapping
+    for cls in (BaseSerializer, Serializer, ListSerializer):
+        if "data" in cls.__dict__:
+            cls.data = timed(cls.__dict__["data"])
+
+
+class ProfilingMiddleware:
+    """
+    Place it first in MIDDLEWARE so latency includes the other middleware.
+
+    PROFILING_SAMPLE_RATE (0-1) profiles a fraction of requests.
+    PROFILING_DUPLICATE_THRESHOLD is how many runs of one SQL statement in a
+    request count as an N+1 pattern.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        self.duplicate_threshold = getattr(settings, "PROFILING_DUPLICATE_THRESHOLD", 5)
+        _install_serializer_timer()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile(request.method)
+        token = _current.set(profile)
+        wrappers = [connection.execute_wrapper(profile) for connection in connections.all()]
+        try:
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            response = self.get_response(request)
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+            _current.reset(token)
+
+        profile.duration = time.perf_counter() - profile.started
+        profile.status = response.status_code
+        if not response.streaming:
+            profile.size = len(response.content)
+        self.flag_duplicates(profile, request)
+        registry.record(profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.view = view_name(view_func)
+
+    def flag_duplicates(self, profile, request):
+        repeated = [(sql, n) for sql, n in profile.sql.items() if n >= self.duplicate_threshold]
+        if not repeated:
+            return
+        profile.duplicates = [{"sql": sql[:500], "count": n} for sql, n in repeated]
+        for sql, n in repeated:
+            logger.warning("Possible N+1 in %s %s (%s): %d x %s", request.method, request.path, profile.view, n, sql[:200])
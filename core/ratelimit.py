@@ -0,0 +1,345 @@
+"""
+Rate limiting for abuse-prone endpoints (sign-in, sign-up, OTP).
+
+Views opt in with `throttle_classes = [RateLimitThrottle]` and a
+`ratelimit_scope`; RATELIMIT_POLICIES maps each scope to a list of limits,
+each keyed by client IP, submitted email or user id:
+
+    'sign-in': [
+        {'key': 'ip', 'algorithm': 'token_bucket', 'rate': '30/min', 'burst': 10},
+        {'key': 'email', 'algorithm': 'sliding_window', 'rate': '10/15min'},
+    ]
+
+The client IP is DRF's get_ident(): REMOTE_ADDR, or the address
+REST_FRAMEWORK['NUM_PROXIES'] hops back in X-Forwarded-For when the app
+runs behind that many trusted proxies.
+
+DRF checks throttles in APIView.initial(), before the handler runs, so a
+rejected request costs a counter update and gets a 429 with Retry-After
+without touching the password hasher, the database or SMTP.
+
+Counters live in Django's cache when it is shared between processes, and
+otherwise in a small SQLite file (RATELIMIT_SQLITE_PATH) so every worker on
+the host sees the same counts. RATELIMIT_STORE forces either one.
+RATELIMIT_ENABLED=0 turns limiting off for a process; paused() turns it off
+for the duration of a block (in-process benchmarks).
+"""
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from core.checks import cache_is_shared
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+RATE_RE = re.compile(r"^(\d+)/(\d*)([a-z]+)$")
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60.0); '5/15min' -> (5, 900.0)."""
+    match = RATE_RE.match(rate.replace(" ", ""))
+    if not match or match.group(3) not in PERIODS:
+        raise ImproperlyConfigured(f"Invalid rate {rate!r}; expected e.g. '10/min' or '5/15min'.")
+    count, multiplier, unit = match.groups()
+    return int(count), float(int(multiplier or 1) * PERIODS[unit])
+
+
+# ----------------------------------------------------------------------------
+# Stores
+# ----------------------------------------------------------------------------
+class StoreBusy(Exception):
+    """update() could not get exclusive access to a counter in time."""
+
+
+class CacheStore:
+    """
+    Counters in Django's cache. incr() is the cache's atomic increment.
+    update() is a read-modify-write, so it holds a per-key lock taken with
+    cache.add(), which every shared backend performs atomically (SET NX on
+    Redis, add on memcached, an INSERT on the database cache). Concurrent
+    requests for the same key are serialized instead of all reading the
+    same value and all passing.
+    """
+
+    prefix = "ratelimit:"
+    lock_timeout = 5
+    lock_wait = 1.0
+
+    def incr(self, key, ttl):
+        key = self.prefix + key
+        cache.add(key, 0, int(ttl) + 1)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(key, 1, int(ttl) + 1)
+            return 1
+
+    def get(self, key):
+        return cache.get(self.prefix + key, 0)
+
+    def update(self, key, fn, ttl):
+        key = self.prefix + key
+        lock = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        while not cache.add(lock, token, self.lock_timeout):
+            if time.monotonic() > deadline:
+                raise StoreBusy(key)
+            time.sleep(0.002)
+        try:
+            value, result = fn(cache.get(key))
+            cache.set(key, value, int(ttl) + 1)
+        finally:
+            # Held for far less than lock_timeout, so the token is still ours
+            if cache.get(lock) == token:
+                cache.delete(lock)
+        return result
+
+
+class SQLiteStore:
+    """
+    Counters in a SQLite file shared by every process on the host. Each
+    thread keeps its own connection; update() runs in an IMMEDIATE
+    transaction, so it is atomic across processes.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+        self.ops = 0
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit "
+                "(key TEXT PRIMARY KEY, value REAL NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+            )
+            self.local.conn = conn
+        return conn
+
+    def _maybe_prune(self, conn, now):
+        self.ops += 1
+        if self.ops % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM ratelimit WHERE expires < ?", (now,))
+
+    def incr(self, key, ttl):
+        conn = self.connection()
+        now = time.time()
+        self._maybe_prune(conn, now)
+        (value,) = conn.execute(
+            "INSERT INTO ratelimit (key, value, expires) VALUES (?, 1, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CASE WHEN expires < ? THEN 1 ELSE value + 1 END, "
+            "expires = CASE WHEN expires < ? THEN excluded.expires ELSE expires END "
+            "RETURNING value",
+            (key, now + ttl, now, now),
+        ).fetchone()
+        return int(value)
+
+    def get(self, key):
+        row = self.connection().execute(
+            "SELECT value FROM ratelimit WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def update(self, key, fn, ttl):
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM ratelimit WHERE key = ? AND expires >= ?", (key, now)).fetchone()
+            value, result = fn(row[0] if row else None)
+            conn.execute(
+                "INSERT INTO ratelimit (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+                (key, value, now + ttl),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_prune(conn, now)
+        return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = getattr(settings, "RATELIMIT_STORE", None)
+                if kind is None:
+                    kind = "cache" if cache_is_shared() else "sqlite"
+                if kind == "cache":
+                    _store = CacheStore()
+                elif kind == "sqlite":
+                    _store = SQLiteStore(settings.RATELIMIT_SQLITE_PATH)
+                else:
+                    _store = import_string(kind)()
+    return _store
+
+
+# ----------------------------------------------------------------------------
+# Algorithms
+# ----------------------------------------------------------------------------
+class TokenBucket:
+    """
+    `rate` requests per period on average with bursts of up to `burst`,
+    tracked as a single theoretical arrival time (GCRA).
+    """
+
+    def __init__(self, rate, burst=None):
+        count, period = parse_rate(rate)
+        self.interval = period / count
+        self.burst = burst or count
+        self.ttl = self.interval * self.burst
+
+    def hit(self, store, key):
+        """Returns (allowed, seconds to wait)."""
+        def consume(tat):
+            now = time.time()
+            tat = max(tat or now, now)
+            allowed_at = tat - self.ttl + self.interval
+            if now < allowed_at:
+                return tat, (False, allowed_at - now)
+            return tat + self.interval, (True, 0.0)
+        return store.update(key, consume, self.ttl)
+
+
+class SlidingWindow:
+    """
+    At most `rate` requests in any window of the period, approximated from
+    the current and previous fixed windows weighted by their overlap.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.limit, self.period = parse_rate(rate)
+
+    def hit(self, store, key):
+        now = time.time()
+        window = int(now // self.period)
+        elapsed = now - window * self.period
+        previous = store.get(f"{key}:{window - 1}")
+        weight = 1 - elapsed / self.period
+        current = store.incr(f"{key}:{window}", self.period * 2)
+        if previous * weight + current <= self.limit:
+            return True, 0.0
+        # Rejected hits count too, so a client that keeps hammering stays out
+        return False, max(self.period - elapsed, 1.0)
+
+
+ALGORITHMS = {
+    "token_bucket": TokenBucket,
+    "sliding_window": SlidingWindow,
+}
+
+
+# ----------------------------------------------------------------------------
+# Keys
+# ----------------------------------------------------------------------------
+def _email(request):
+    email = request.data.get("email_address") or request.data.get("email")
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def _user_id(request):
+    # Authentication has already run when throttles are checked
+    user = request.user
+    if user is not None and user.is_authenticated:
+        return str(user.pk)
+    user_id = request.data.get("user_id")
+    return str(user_id) if user_id else None
+
+
+class Policy:
+    def __init__(self, scope, key, algorithm="sliding_window", rate="10/min", burst=None):
+        if algorithm not in ALGORITHMS:
+            raise ImproperlyConfigured(f"Unknown rate limit algorithm {algorithm!r}.")
+        if key not in ("ip", "email", "user_id"):
+            raise ImproperlyConfigured(f"Unknown rate limit key {key!r}.")
+        self.scope = scope
+        self.key = key
+        self.limiter = ALGORITHMS[algorithm](rate, burst)
+
+    def ident(self, throttle, request):
+        if self.key == "ip":
+            return throttle.get_ident(request)
+        if self.key == "email":
+            return _email(request)
+        return _user_id(request)
+
+    def hit(self, throttle, request):
+        ident = self.ident(throttle, request)
+        if ident is None:
+            return True, 0.0
+        try:
+            return self.limiter.hit(get_store(), f"{self.scope}:{self.key}:{ident}")
+        except StoreBusy:
+            # Too many concurrent requests for one key: fail closed
+            return False, 1.0
+
+
+_policies = {}
+
+
+def policies_for(scope):
+    configured = getattr(settings, "RATELIMIT_POLICIES", {}).get(scope, [])
+    cached = _policies.get(scope)
+    if cached is None or cached[0] is not configured:
+        cached = (configured, [Policy(scope, **options) for options in configured])
+        _policies[scope] = cached
+    return cached[1]
+
+
+_paused = 0
+_paused_lock = threading.Lock()
+
+
+@contextmanager
+def paused():
+    """Let every request through while the block runs, in every thread."""
+    global _paused
+    with _paused_lock:
+        _paused += 1
+    try:
+        yield
+    finally:
+        with _paused_lock:
+            _paused -= 1
+
+
+class RateLimitThrottle(BaseThrottle):
+    """DRF throttle applying RATELIMIT_POLICIES[view.ratelimit_scope]."""
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if _paused or not getattr(settings, "RATELIMIT_ENABLED", True):
+            return True
+        scope = getattr(view, "ratelimit_scope", None)
+        waits = [wait for allowed, wait in (policy.hit(self, request) for policy in policies_for(scope or "")) if not allowed]
+        if waits:
+            self.retry_after = max(waits)
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import shutil
 from pathlib import Path
 
 # for cloudinary
@@ -62,6 +64,8 @@ INSTALLED_APPS = [
     # Custom apps
     'accounts',
     'movieApp',
+    'jobs',
+    'benchmarks',
 ]
 
 
@@ -77,6 +81,7 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 AUTH_USER_MODEL = 'accounts.User'
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -108,15 +113,139 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Configured from DB_* environment variables, see core/database.py
 
-DATABASES = {
+from core.database import database_config
+DATABASES = database_config(BASE_DIR)
+
+
+# Cache
+# Film detail, entitlement, token version and denylist invalidations are
+# published through the default cache, so every process must share it
+# (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379). The process-local default only
+# suits a single development process; `check --deploy` rejects it.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
 }
 
 
+# Film search backend (movieApp.search). When unset, SQLite FTS5 is used on
+# sqlite and a plain database scan elsewhere.
+# FILM_SEARCH_BACKEND = 'movieApp.search.SQLiteFTSBackend'
+
+
+# Resumable chunked uploads (movieApp.uploads)
+UPLOAD_STAGING_ROOT = BASE_DIR / 'upload_staging'
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+# Write-behind view counter (movieApp.counters)
+VIEW_COUNTER_SPOOL_DIR = BASE_DIR / 'view_counter_spool'
+VIEW_COUNTER_FLUSH_INTERVAL = 5.0
+VIEW_COUNTER_FLUSH_THRESHOLD = 1000
+
+
+# Watch progress (movieApp.progress): heartbeats are coalesced per
+# (user, film) and upserted every FLUSH_INTERVAL seconds or once
+# FLUSH_THRESHOLD pairs are pending. A film counts as finished once the
+# position reaches COMPLETE_RATIO of its duration.
+WATCH_PROGRESS_FLUSH_INTERVAL = 10.0
+WATCH_PROGRESS_FLUSH_THRESHOLD = 500
+WATCH_PROGRESS_COMPLETE_RATIO = 0.95
+CONTINUE_WATCHING_MAX = 50
+
+
+# Rentals and purchases (movieApp.entitlements). Each user's entitlements
+# are cached per process and in Django's cache; the sweep job marks ended
+# rentals as expired RENTAL_SWEEP_BATCH_SIZE rows at a time.
+ENTITLEMENT_CACHE_TIMEOUT = 15 * 60
+ENTITLEMENT_LRU_SIZE = 4096
+RENTAL_SWEEP_INTERVAL = 15 * 60
+RENTAL_SWEEP_BATCH_SIZE = 1000
+
+
+# Signed playback URLs (movieApp.playback). URLs live for PLAYBACK_URL_TTL
+# seconds, rounded up to a PLAYBACK_URL_BUCKET so repeat requests reuse a
+# cached signature. Signing keys are derived per PLAYBACK_KEY_ROTATION period
+# from the master keys below, given as PLAYBACK_SIGNING_KEYS=id:secret,...
+# (newest first; defaults to SECRET_KEY). To replace a master key, put the
+# new one first and keep the old one until URLs it signed have expired.
+PLAYBACK_URL_TTL = 15 * 60
+# HLS package URLs (master playlist and segments) must last a whole film
+PLAYBACK_HLS_URL_TTL = 4 * 60 * 60
+PLAYBACK_URL_BUCKET = 5 * 60
+PLAYBACK_URL_CACHE_SIZE = 50000
+PLAYBACK_KEY_ROTATION = 24 * 60 * 60
+# Serve playback assets from this directory (by Cloudinary public id) instead
+# of redirecting to Cloudinary, e.g. on self-hosted nodes and in development.
+PLAYBACK_MEDIA_ROOT = os.environ.get('PLAYBACK_MEDIA_ROOT') or None
+# Cloudinary token-based authentication key (hex). With it, redirects to
+# Cloudinary carry a token expiring with the playback URL; without it they are
+# only signed.
+PLAYBACK_CLOUDINARY_TOKEN_KEY = os.environ.get('PLAYBACK_CLOUDINARY_TOKEN_KEY', '')
+PLAYBACK_SIGNING_KEYS = {
+    key_id: secret
+    for key_id, _, secret in (
+        entry.partition(':') for entry in os.environ.get('PLAYBACK_SIGNING_KEYS', '').split(',') if entry
+    )
+}
+
+
+# HLS packaging (movieApp.packaging). Finished uploads are encoded into the
+# ladder below by PACKAGING_WORKERS processes and stored, content addressed,
+# under PACKAGING_ROOT. Packages are only served through signed per-user URLs
+# (movieApp.views.PackageView). On by default when ffmpeg is installed;
+# PACKAGING_ENABLED=0/1 overrides.
+PACKAGING_ENABLED = os.environ.get(
+    'PACKAGING_ENABLED', '1' if shutil.which('ffmpeg') else '0',
+).lower() in ('1', 'true', 'yes', 'on')
+PACKAGING_ROOT = BASE_DIR / 'packages'
+PACKAGING_WORKERS = None
+PACKAGING_ENCODER = 'movieApp.packaging.FFmpegEncoder'
+PACKAGING_ENCODER_OPTIONS = {'segment_seconds': 6}
+# Bitrates in bits per second; rungs taller than the source are skipped
+PACKAGING_LADDER = [
+    {'name': '1080p', 'height': 1080, 'video_bitrate': 5_000_000, 'audio_bitrate': 128_000},
+    {'name': '720p', 'height': 720, 'video_bitrate': 2_800_000, 'audio_bitrate': 128_000},
+    {'name': '480p', 'height': 480, 'video_bitrate': 1_400_000, 'audio_bitrate': 96_000},
+    {'name': '360p', 'height': 360, 'video_bitrate': 800_000, 'audio_bitrate': 96_000},
+]
+
+
+# Film detail response cache (movieApp.cache). Invalidation goes through
+# Django's cache, so production needs a cache shared by all processes (see
+# CACHES).
+FILM_DETAIL_CACHE_TIMEOUT = 60 * 60
+FILM_DETAIL_LRU_SIZE = 2048
+
+
+# Background jobs (jobs app). Start a worker with `python manage.py run_jobs`.
+# JOBS_EAGER runs jobs inline on commit instead, e.g. when no worker is running.
+JOBS_EAGER = False
+JOBS_WORKER_THREADS = 4
+JOBS_POLL_INTERVAL = 1.0
+# Seconds a claimed job stays locked without a worker heartbeat (capped at the
+# job's timeout). Workers renew it until the timeout, so only a crashed worker
+# or a hung job gets its job requeued.
+JOBS_LEASE_SECONDS = 60
+
+# Request profiling (core.profiling). Reports at /api/profiling/ and
+# /api/profiling/metrics/ (Prometheus). The middleware removes itself when off.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 1.0
+PROFILING_DUPLICATE_THRESHOLD = 5
+PROFILING_WINDOW = 600
+
+# Route the read-heavy catalog and profile endpoints to native async views.
+# core/asgi.py turns this on, so ASGI servers get them and WSGI keeps the
+# sync views; set ASYNC_VIEWS=0/1 in the environment to override.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0').lower() in ('1', 'true', 'yes', 'on')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -135,6 +264,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (accounts.hashers). New passwords use
+# PASSWORD_HASH_ALGORITHM ('pbkdf2', 'scrypt' or 'argon2', which needs
+# argon2-cffi); the others stay listed so existing hashes verify and are
+# re-encoded on the next successful login. Costs come from
+# PASSWORD_HASH_PARAMS, overridden by the file `manage.py calibrate_hashers
+# --write` produces. Async views hash on PASSWORD_HASH_THREADS threads
+# (default: one per CPU).
+PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.TunedScryptPasswordHasher',
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASH_ALGORITHM],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASH_ALGORITHM),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_PARAMS = {
+    'pbkdf2': {'iterations': 1_000_000},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 1},
+}
+PASSWORD_HASH_PARAMS_FILE = BASE_DIR / 'password_hash_params.json'
+PASSWORD_HASH_THREADS = None
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -153,11 +309,24 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-# MEDIA_URL = '/media/'
+MEDIA_URL = '/media/'
 
 # STATICFILES_DIRS = [BASE_DIR / 'static']
 # STATIC_ROOT = BASE_DIR / 'assets'
-# MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Media delivery (core.media). MEDIA_SERVE routes MEDIA_URL to Django with
+# Range/If-Range support. It follows DEBUG, as static() did; production opts
+# in with MEDIA_SERVE=1, since everything under MEDIA_ROOT becomes public.
+# MEDIA_ACCEL hands the bytes to the proxy instead:
+#   'x-accel-redirect': nginx, with an internal location for the prefix, e.g.
+#       location /protected/ { internal; alias /; }
+#   'x-sendfile': Apache mod_xsendfile or lighttpd
+MEDIA_SERVE = os.environ.get('MEDIA_SERVE', '1' if DEBUG else '0').lower() in ('1', 'true', 'yes', 'on')
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL') or None
+MEDIA_ACCEL_PREFIX = '/protected/'
+MEDIA_BLOCK_SIZE = 256 * 1024
+MEDIA_CACHE_CONTROL = 'public, max-age=3600'
 
 
 # Default primary key field type
@@ -169,8 +338,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'accounts.authentication.ClaimsJWTAuthentication',
+    ),
+    # Reverse proxies in front of the app. Throttles and rate limits key on
+    # the client address NUM_PROXIES hops back in X-Forwarded-For; with 0
+    # the header is ignored and REMOTE_ADDR is used, so a client cannot pick
+    # its own key by sending the header.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 # JWT settings
@@ -181,6 +355,55 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer'),
+    # Each refresh returns a new refresh token and denylists the old one
+    'ROTATE_REFRESH_TOKENS': True,
+}
+# Token claims fast path (accounts.tokens): seconds a process may trust its
+# cached token version, and keep full user rows for older tokens.
+AUTH_TOKEN_VERSION_TTL = 5
+AUTH_USER_CACHE_TTL = 30
+# JTI denylist (accounts.revocation): how often each process checks for
+# tokens revoked elsewhere, Bloom filter sizing, the LRU of Bloom hits, and
+# how often expired rows are pruned.
+AUTH_DENYLIST_SYNC_INTERVAL = 5
+AUTH_DENYLIST_BLOOM_CAPACITY = 100000
+AUTH_DENYLIST_ERROR_RATE = 0.001
+AUTH_DENYLIST_CACHE_SIZE = 10000
+AUTH_DENYLIST_PRUNE_INTERVAL = 60 * 60
+# Referral codes (accounts.referral_codes): numbers each process reserves per
+# query, and the permutation key (defaults to SECRET_KEY).
+REFERRAL_CODE_BLOCK_SIZE = 100
+REFERRAL_CODE_KEY = os.environ.get('REFERRAL_CODE_KEY', '')
+
+
+# Rate limits for sign-in, sign-up and OTP endpoints (core.ratelimit).
+# Counters use Django's cache when it is shared between processes, otherwise
+# the SQLite file below; RATELIMIT_STORE = 'cache' or 'sqlite' forces one.
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+RATELIMIT_SQLITE_PATH = BASE_DIR / 'ratelimit.sqlite3'
+RATELIMIT_POLICIES = {
+    # Every attempt runs the password hasher
+    'sign-in': [
+        {'key': 'ip', 'algorithm': 'token_bucket', 'rate': '30/min', 'burst': 10},
+        {'key': 'email', 'algorithm': 'sliding_window', 'rate': '10/15min'},
+    ],
+    'sign-up': [
+        {'key': 'ip', 'algorithm': 'token_bucket', 'rate': '10/min', 'burst': 5},
+        {'key': 'ip', 'algorithm': 'sliding_window', 'rate': '50/day'},
+    ],
+    # Sends mail
+    'otp-send': [
+        {'key': 'ip', 'algorithm': 'sliding_window', 'rate': '20/hour'},
+        {'key': 'email', 'algorithm': 'sliding_window', 'rate': '3/15min'},
+    ],
+    # Six-digit codes: keep guessing far below 10**6 per code lifetime
+    'otp-verify': [
+        {'key': 'ip', 'algorithm': 'token_bucket', 'rate': '30/min', 'burst': 10},
+        {'key': 'user_id', 'algorithm': 'sliding_window', 'rate': '5/15min'},
+    ],
+    'change-password': [
+        {'key': 'user_id', 'algorithm': 'sliding_window', 'rate': '5/15min'},
+    ],
 }
 
 
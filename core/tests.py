@@ -0,0 +1,67 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .media import MappedRange, serve_file
+
+
+@override_settings(MEDIA_ACCEL=None)
+class RangeTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "clip.ts"
+        self.data = bytes(range(256)) * 4
+        self.path.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get(self, **headers):
+        request = RequestFactory().get("/media/clip.ts", headers=headers)
+        return serve_file(request, self.path)
+
+    def body(self, response):
+        content = b"".join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_descriptor_offset_follows_the_range(self):
+        f = MappedRange(self.path, 100, 200)
+        try:
+            self.assertEqual(os.lseek(f.fileno(), 0, os.SEEK_CUR), 100)
+            f.seek(150)
+            self.assertEqual(os.lseek(f.fileno(), 0, os.SEEK_CUR), 150)
+            f.read(20)
+            self.assertEqual(os.lseek(f.fileno(), 0, os.SEEK_CUR), 170)
+        finally:
+            f.close()
+
+    def test_suffix_range(self):
+        response = self.get(range="bytes=-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes {len(self.data) - 10}-{len(self.data) - 1}/{len(self.data)}")
+        self.assertEqual(self.body(response), self.data[-10:])
+
+    def test_open_ended_range(self):
+        response = self.get(range="bytes=1000-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], str(len(self.data) - 1000))
+        self.assertEqual(self.body(response), self.data[1000:])
+
+    def test_range_past_the_end(self):
+        response = self.get(range=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_if_range_mismatch_sends_the_whole_file(self):
+        full = self.get()
+        etag = full["ETag"]
+        full.close()
+        response = self.get(range="bytes=0-9", if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        response = self.get(range="bytes=0-9", if_range=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[:10])
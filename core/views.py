@@ -0,0 +1,25 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+
+from .profiling import registry
+
+
+class ProfilingReportView(APIView):
+    """Per-endpoint percentiles and N+1 samples from ProfilingMiddleware (this process only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"data": registry.report()}, status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        registry.reset()
+        return Response({"message": "Profiling data cleared."}, status=status.HTTP_200_OK)
+
+
+class PrometheusMetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_at", "started_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "last_error")
+    ordering = ("-id",)
+    readonly_fields = ("created_at", "started_at", "finished_at", "locked_by", "locked_until")
@@ -0,0 +1,32 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=getattr(settings, "JOBS_WORKER_THREADS", 4))
+        parser.add_argument("--poll-interval", type=float, default=getattr(settings, "JOBS_POLL_INTERVAL", 1.0))
+        parser.add_argument("--only", nargs="*", metavar="NAME", help="Only run these job types.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is ready.")
+
+    def handle(self, *args, **options):
+        names = options["only"]
+        unknown = set(names or []) - set(queue.registry)
+        if unknown:
+            self.stderr.write(f"Unknown job types: {', '.join(sorted(unknown))}")
+            return
+
+        worker = Worker(threads=options["threads"], poll_interval=options["poll_interval"], names=names)
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+        self.stdout.write(f"Worker {worker.worker_id} running: {', '.join(worker.job_names()) or '-'}")
+        worker.run(burst=options["burst"])
+        self.stdout.write("Worker stopped.")
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from . import queue
+from .models import Job, JobStatus
+
+
+def _seconds(value):
+    return round(value.total_seconds(), 3) if value is not None else None
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Per job type: queue depth, running count, failures, the age of the oldest
+    ready job, and latency (run_at -> started_at) and runtime averages over
+    jobs that finished within `window`.
+    """
+    now = timezone.now()
+    stats = {
+        name: {
+            "concurrency": job_type.concurrency,
+            "ready": 0, "scheduled": 0, "running": 0, "failed": 0,
+            "oldest_ready_age_s": None,
+            "recent_succeeded": 0, "avg_latency_s": None, "max_latency_s": None,
+            "avg_runtime_s": None,
+        }
+        for name, job_type in queue.registry.items()
+    }
+
+    depth = Job.objects.filter(status__in=[JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.FAILED]).values("name").annotate(
+        ready=Count("id", filter=Q(status=JobStatus.QUEUED, run_at__lte=now)),
+        scheduled=Count("id", filter=Q(status=JobStatus.QUEUED, run_at__gt=now)),
+        running=Count("id", filter=Q(status=JobStatus.RUNNING)),
+        failed=Count("id", filter=Q(status=JobStatus.FAILED)),
+        oldest_ready=Min("run_at", filter=Q(status=JobStatus.QUEUED, run_at__lte=now)),
+    )
+    for row in depth:
+        entry = stats.setdefault(row["name"], {})
+        entry.update(ready=row["ready"], scheduled=row["scheduled"], running=row["running"], failed=row["failed"])
+        if row["oldest_ready"] is not None:
+            entry["oldest_ready_age_s"] = _seconds(now - row["oldest_ready"])
+
+    recent = Job.objects.filter(status=JobStatus.SUCCEEDED, finished_at__gte=now - window).values("name").annotate(
+        count=Count("id"),
+        avg_latency=Avg(F("started_at") - F("run_at")),
+        max_latency=Max(F("started_at") - F("run_at")),
+        avg_runtime=Avg(F("finished_at") - F("started_at")),
+    )
+    for row in recent:
+        entry = stats.setdefault(row["name"], {})
+        entry.update(
+            recent_succeeded=row["count"],
+            avg_latency_s=_seconds(row["avg_latency"]),
+            max_latency_s=_seconds(row["max_latency"]),
+            avg_runtime_s=_seconds(row["avg_runtime"]),
+        )
+    return stats
@@ -0,0 +1,247 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class LeaseExpired(Exception):
+    """A running job stopped heartbeating (worker crash) or ran past its timeout."""
+
+
+class JobType:
+    """
+    A registered background job. Call enqueue() to schedule it; calling the
+    object itself runs the function inline.
+    """
+
+    def __init__(self, func, name, max_attempts=3, concurrency=1, timeout=600,
+                 backoff=10, max_backoff=3600, on_give_up=None):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.on_give_up = on_give_up
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<JobType {self.name}>"
+
+    def enqueue(self, *args, delay=None, **kwargs):
+        """
+        Store the job; it is visible to workers once the surrounding
+        transaction commits. Arguments must be JSON serializable.
+        """
+        if getattr(settings, "JOBS_EAGER", False):
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+        run_at = timezone.now() + (delay or timedelta(0))
+        return Job.objects.create(
+            name=self.name, args=list(args), kwargs=kwargs,
+            max_attempts=self.max_attempts, run_at=run_at,
+        )
+
+    def enqueue_unique(self, *args, delay=None, **kwargs):
+        """enqueue() unless a job of this type is already waiting to run."""
+        if Job.objects.filter(name=self.name, status=JobStatus.QUEUED).exists():
+            return None
+        return self.enqueue(*args, delay=delay, **kwargs)
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with full jitter."""
+        ceiling = min(self.max_backoff, self.backoff * (2 ** max(attempts - 1, 0)))
+        return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def job(name=None, **options):
+    """
+    Register a function as a background job type.
+
+        @job("accounts.send_otp_email", max_attempts=5, concurrency=4)
+        def send_otp_email(email, otp): ...
+
+        send_otp_email.enqueue(email, otp)
+    """
+    def decorator(func):
+        job_name = name or f"{func.__module__}.{func.__name__}"
+        if job_name in registry:
+            raise ValueError(f"Job type '{job_name}' is already registered.")
+        job_type = JobType(func, job_name, **options)
+        registry[job_name] = job_type
+        return job_type
+    return decorator
+
+
+def lease_seconds(job_type):
+    """
+    How long a claim lasts without a heartbeat. Workers renew it while the
+    job runs, so a crashed worker's jobs come back after one lease rather
+    than after the full timeout.
+    """
+    return min(job_type.timeout, getattr(settings, "JOBS_LEASE_SECONDS", 60))
+
+
+def claim(job_id, worker_id, job_type):
+    """
+    Atomically move a queued job to running. Returns the job, or None when
+    another worker won the race.
+    """
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job_id, status=JobStatus.QUEUED).update(
+        status=JobStatus.RUNNING,
+        attempts=F("attempts") + 1,
+        started_at=now,
+        locked_by=worker_id,
+        locked_until=now + timedelta(seconds=lease_seconds(job_type)),
+    )
+    if not claimed:
+        return None
+    return Job.objects.get(pk=job_id)
+
+
+def heartbeat(job_rows, worker_id):
+    """
+    Extend the lease of running jobs this worker still holds. A job is never
+    extended past started_at + timeout, so one that hangs is reclaimed by
+    requeue_stale() and its late result discarded. Returns the number of
+    leases renewed.
+    """
+    now = timezone.now()
+    renewed = 0
+    for job_row in job_rows:
+        job_type = registry.get(job_row.name)
+        if job_type is None:
+            continue
+        deadline = job_row.started_at + timedelta(seconds=job_type.timeout)
+        if deadline <= now:
+            continue
+        renewed += Job.objects.filter(
+            pk=job_row.pk, status=JobStatus.RUNNING, locked_by=worker_id, attempts=job_row.attempts,
+        ).update(locked_until=min(deadline, now + timedelta(seconds=lease_seconds(job_type))))
+    return renewed
+
+
+def ready_jobs(limits):
+    """
+    (id, name) of jobs ready to run, at most limits[name] of each type, in
+    run_at order. One query per type, so a backlog of one type never hides
+    ready jobs of the others.
+    """
+    now = timezone.now()
+    ready = []
+    for name, limit in limits.items():
+        if limit <= 0:
+            continue
+        ready.extend(
+            Job.objects.filter(status=JobStatus.QUEUED, name=name, run_at__lte=now)
+            .order_by("run_at", "id")
+            .values_list("run_at", "id", "name")[:limit]
+        )
+    ready.sort()
+    return [(job_id, name) for _, job_id, name in ready]
+
+
+def _finish(job_row, **fields):
+    """
+    Record the outcome of a run, but only if this run still holds the job.
+    Once its lease expires the job may be requeued and claimed again (by
+    another worker, or by this one as a new attempt); a late finish must not
+    overwrite that run. Returns whether the row was updated.
+    """
+    updated = Job.objects.filter(
+        pk=job_row.pk, status=JobStatus.RUNNING,
+        locked_by=job_row.locked_by, attempts=job_row.attempts,
+    ).update(**fields)
+    if not updated:
+        logger.warning("Job %s lost its lease before finishing; its result was discarded", job_row)
+    return bool(updated)
+
+
+def execute(job_row):
+    """Run a claimed job and record the outcome, scheduling a retry on failure."""
+    job_type = registry.get(job_row.name)
+    if job_type is None:
+        _finish(
+            job_row, status=JobStatus.FAILED, finished_at=timezone.now(),
+            last_error=f"Unknown job type '{job_row.name}'.", locked_until=None,
+        )
+        return
+
+    try:
+        job_type.func(*job_row.args, **job_row.kwargs)
+    except Exception as e:
+        error = traceback.format_exc()
+        if job_row.attempts < job_row.max_attempts:
+            logger.warning("Job %s failed (attempt %s), retrying: %s", job_row, job_row.attempts, e)
+            _finish(
+                job_row, status=JobStatus.QUEUED, last_error=error, locked_by="", locked_until=None,
+                run_at=timezone.now() + job_type.retry_delay(job_row.attempts),
+            )
+            return
+
+        logger.error("Job %s failed permanently: %s", job_row, e)
+        if _finish(
+            job_row, status=JobStatus.FAILED, last_error=error,
+            finished_at=timezone.now(), locked_until=None,
+        ):
+            _give_up(job_type, job_row, e)
+        return
+
+    _finish(job_row, status=JobStatus.SUCCEEDED, finished_at=timezone.now(), locked_until=None)
+
+
+def _give_up(job_type, job_row, error):
+    if job_type.on_give_up is None:
+        return
+    try:
+        job_type.on_give_up(error, *job_row.args, **job_row.kwargs)
+    except Exception:
+        logger.exception("on_give_up hook for job %s failed", job_row)
+
+
+def requeue_stale():
+    """
+    Return running jobs whose lease expired (crashed worker, or past their
+    timeout) to the queue. Jobs that have used all their attempts fail
+    instead, and their on_give_up hook runs. Returns the number requeued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=JobStatus.RUNNING, locked_until__lt=now)
+    for job_row in stale.filter(attempts__gte=F("max_attempts")):
+        error = LeaseExpired(f"Lease expired after {job_row.attempts} attempts (worker {job_row.locked_by}).")
+        failed = Job.objects.filter(pk=job_row.pk, status=JobStatus.RUNNING, locked_until__lt=now).update(
+            status=JobStatus.FAILED, last_error=str(error), finished_at=now, locked_until=None,
+        )
+        if not failed:
+            continue
+        logger.error("Job %s failed permanently: %s", job_row, error)
+        job_type = registry.get(job_row.name)
+        if job_type is not None:
+            _give_up(job_type, job_row, error)
+    return stale.filter(attempts__lt=F("max_attempts")).update(
+        status=JobStatus.QUEUED, locked_by="", locked_until=None, run_at=now,
+        last_error="Lease expired.",
+    )
+
+
+def prune(older_than):
+    """Delete succeeded jobs that finished before `older_than` ago."""
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status=JobStatus.SUCCEEDED, finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job, JobStatus
+from .worker import Worker
+
+
+class InlineExecutor:
+    """Records submitted jobs instead of running them on threads."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, job_row):
+        self.submitted.append(job_row)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class QueueTestCase(TestCase):
+    def setUp(self):
+        self.given_up = []
+        self.slow = queue.JobType(lambda: None, "tests.slow", concurrency=1, timeout=600)
+        self.fast = queue.JobType(lambda: None, "tests.fast", concurrency=2, timeout=60, max_attempts=2,
+                                  on_give_up=lambda error, *args: self.given_up.append((error, args)))
+        self.saved_registry = dict(queue.registry)
+        queue.registry.clear()
+        queue.registry.update({self.slow.name: self.slow, self.fast.name: self.fast})
+
+    def tearDown(self):
+        queue.registry.clear()
+        queue.registry.update(self.saved_registry)
+
+    def make_worker(self, threads=4):
+        worker = Worker(threads=threads)
+        worker.executor.shutdown()
+        worker.executor = InlineExecutor()
+        return worker
+
+    def make_jobs(self, job_type, count, **fields):
+        past = timezone.now() - timedelta(minutes=5)
+        return [
+            Job.objects.create(name=job_type.name, max_attempts=job_type.max_attempts, run_at=past, **fields)
+            for _ in range(count)
+        ]
+
+
+class DispatchTests(QueueTestCase):
+    def test_saturated_type_does_not_block_others(self):
+        self.make_jobs(self.slow, 50)
+        fast = self.make_jobs(self.fast, 1)[0]
+        fast.run_at = timezone.now()
+        fast.save()
+
+        worker = self.make_worker()
+        self.assertEqual(worker.dispatch(), 2)
+        names = sorted(job_row.name for job_row in worker.executor.submitted)
+        self.assertEqual(names, ["tests.fast", "tests.slow"])
+
+        # The slow type is at its cap: the next dispatch claims nothing more
+        self.assertEqual(worker.dispatch(), 0)
+        self.assertEqual(Job.objects.filter(status=JobStatus.RUNNING).count(), 2)
+
+    def test_ready_jobs_respects_limits_and_order(self):
+        self.make_jobs(self.slow, 3)
+        self.make_jobs(self.fast, 3)
+        ready = queue.ready_jobs({self.slow.name: 1, self.fast.name: 2})
+        self.assertEqual([name for _, name in ready].count("tests.slow"), 1)
+        self.assertEqual([name for _, name in ready].count("tests.fast"), 2)
+        self.assertEqual([job_id for job_id, _ in ready], sorted(job_id for job_id, _ in ready))
+
+
+@override_settings(JOBS_LEASE_SECONDS=30)
+class LeaseTests(QueueTestCase):
+    def test_claim_takes_a_short_lease(self):
+        job_row = self.make_jobs(self.slow, 1)[0]
+        claimed = queue.claim(job_row.pk, "w1", self.slow)
+        self.assertLessEqual(claimed.locked_until - claimed.started_at, timedelta(seconds=30))
+
+    def test_heartbeat_renews_until_timeout(self):
+        job_row = self.make_jobs(self.fast, 1)[0]
+        claimed = queue.claim(job_row.pk, "w1", self.fast)
+        Job.objects.filter(pk=claimed.pk).update(locked_until=timezone.now())
+        self.assertEqual(queue.heartbeat([claimed], "w1"), 1)
+        self.assertGreater(Job.objects.get(pk=claimed.pk).locked_until, timezone.now() + timedelta(seconds=20))
+
+        # Another worker's heartbeat does not touch the lease
+        self.assertEqual(queue.heartbeat([claimed], "w2"), 0)
+
+        # Past its timeout the job is left to expire
+        claimed.started_at = timezone.now() - timedelta(seconds=61)
+        self.assertEqual(queue.heartbeat([claimed], "w1"), 0)
+
+    def test_requeue_stale_respects_max_attempts(self):
+        retry, exhausted = self.make_jobs(self.fast, 2, args=["x"])
+        expired = timezone.now() - timedelta(seconds=1)
+        Job.objects.filter(pk=retry.pk).update(status=JobStatus.RUNNING, attempts=1, locked_until=expired)
+        Job.objects.filter(pk=exhausted.pk).update(status=JobStatus.RUNNING, attempts=2, locked_until=expired)
+
+        self.assertEqual(queue.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=retry.pk).status, JobStatus.QUEUED)
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, JobStatus.FAILED)
+        self.assertIn("Lease expired", exhausted.last_error)
+        self.assertEqual(len(self.given_up), 1)
+        self.assertIsInstance(self.given_up[0][0], queue.LeaseExpired)
+        self.assertEqual(self.given_up[0][1], ("x",))
+
+    def test_late_finish_does_not_overwrite_the_next_run(self):
+        calls = []
+        self.fast.func = lambda: calls.append(1)
+        job_row = self.make_jobs(self.fast, 1)[0]
+        first = queue.claim(job_row.pk, "w1", self.fast)
+        # The first run hangs past its lease and the job is claimed again
+        Job.objects.filter(pk=first.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(queue.requeue_stale(), 1)
+        second = queue.claim(job_row.pk, "w1", self.fast)
+
+        with self.assertLogs("jobs.queue", "WARNING"):
+            queue.execute(first)
+        job_row.refresh_from_db()
+        self.assertEqual((job_row.status, job_row.attempts), (JobStatus.RUNNING, 2))
+        self.assertEqual(queue.heartbeat([first], "w1"), 0)
+
+        queue.execute(second)
+        self.assertEqual(Job.objects.get(pk=job_row.pk).status, JobStatus.SUCCEEDED)
+        self.assertEqual(len(calls), 2)
+
+    def test_late_failure_neither_requeues_nor_gives_up(self):
+        self.fast.func = lambda: 1 / 0
+        job_row = self.make_jobs(self.fast, 1)[0]
+        stale = queue.claim(job_row.pk, "w1", self.fast)
+        Job.objects.filter(pk=job_row.pk).update(locked_by="w2")
+        with self.assertLogs("jobs.queue", "WARNING"):
+            queue.execute(stale)
+        self.assertEqual(Job.objects.get(pk=job_row.pk).status, JobStatus.RUNNING)
+
+        stale.attempts = 2
+        Job.objects.filter(pk=job_row.pk).update(attempts=2)
+        with self.assertLogs("jobs.queue", "WARNING"):
+            queue.execute(stale)
+        self.assertEqual(self.given_up, [])
@@ -0,0 +1,139 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Polls the job table and runs jobs on a thread pool.
+
+    A single dispatcher thread claims jobs, so per-type concurrency limits
+    (JobType.concurrency) are exact within one worker process. The same
+    thread renews the leases of running jobs every third of
+    JOBS_LEASE_SECONDS.
+    """
+
+    def __init__(self, threads=4, poll_interval=1.0, names=None,
+                 maintenance_interval=60, retention=timedelta(days=7)):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.names = names
+        self.maintenance_interval = maintenance_interval
+        self.retention = retention
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = {}
+        self.active = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job")
+
+    def job_names(self):
+        return self.names or list(queue.registry)
+
+    def free_slots(self):
+        with self.lock:
+            return self.threads - sum(self.running.values())
+
+    def has_capacity(self, name):
+        with self.lock:
+            return self.running.get(name, 0) < queue.registry[name].concurrency
+
+    def limits(self, slots):
+        """How many jobs of each type could start now."""
+        with self.lock:
+            return {
+                name: min(slots, queue.registry[name].concurrency - self.running.get(name, 0))
+                for name in self.job_names() if name in queue.registry
+            }
+
+    def _run(self, job_row):
+        close_old_connections()
+        try:
+            queue.execute(job_row)
+        except Exception:
+            logger.exception("Worker failed to record the result of %s", job_row)
+        finally:
+            close_old_connections()
+            with self.lock:
+                self.running[job_row.name] -= 1
+                self.active.pop(job_row.pk, None)
+
+    def dispatch(self):
+        """Claim as many ready jobs as there is capacity for. Returns the count."""
+        slots = self.free_slots()
+        if slots <= 0:
+            return 0
+
+        started = 0
+        for job_id, name in queue.ready_jobs(self.limits(slots)):
+            if started >= slots:
+                break
+            if not self.has_capacity(name):
+                continue
+            job_row = queue.claim(job_id, self.worker_id, queue.registry[name])
+            if job_row is None:
+                continue
+            with self.lock:
+                self.running[name] = self.running.get(name, 0) + 1
+                self.active[job_row.pk] = job_row
+            self.executor.submit(self._run, job_row)
+            started += 1
+        return started
+
+    def heartbeat(self):
+        with self.lock:
+            job_rows = list(self.active.values())
+        if job_rows:
+            queue.heartbeat(job_rows, self.worker_id)
+
+    def maintenance(self):
+        requeued = queue.requeue_stale()
+        if requeued:
+            logger.warning("Requeued %s jobs with expired leases", requeued)
+        queue.prune(self.retention)
+
+    def idle(self):
+        with self.lock:
+            return not any(self.running.values())
+
+    def run(self, burst=False):
+        """Process jobs until stop(); in burst mode, until nothing is ready."""
+        last_maintenance = last_heartbeat = 0.0
+        heartbeat_interval = getattr(settings, "JOBS_LEASE_SECONDS", 60) / 3
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_heartbeat > heartbeat_interval:
+                    self.heartbeat()
+                    last_heartbeat = time.monotonic()
+                if time.monotonic() - last_maintenance > self.maintenance_interval:
+                    self.maintenance()
+                    last_maintenance = time.monotonic()
+
+                started = self.dispatch()
+                if burst and not started and self.idle():
+                    break
+                if not started:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            # Keep the leases of jobs still finishing alive while shutting down
+            while not self.idle():
+                if time.monotonic() - last_heartbeat > heartbeat_interval:
+                    self.heartbeat()
+                    last_heartbeat = time.monotonic()
+                time.sleep(min(self.poll_interval, heartbeat_interval))
+            self.executor.shutdown(wait=True)
+            close_old_connections()
+
+    def stop(self):
+        self.stopping.set()
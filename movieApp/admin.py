@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Genre, Film
+from .models import Genre, Film, WatchProgress, Purchase, Rental
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
@@ -33,3 +33,26 @@ class FilmAdmin(admin.ModelAdmin):
             "fields": ("created_at", "updated_at", "published_at", "views", "total_earning")
         }),
     )
+
+
+@admin.register(WatchProgress)
+class WatchProgressAdmin(admin.ModelAdmin):
+    list_display = ("user", "film", "position_s", "duration_s", "completed", "last_watched_at")
+    list_filter = ("completed",)
+    search_fields = ("user__email", "film__title")
+    raw_id_fields = ("user", "film")
+
+
+@admin.register(Purchase)
+class PurchaseAdmin(admin.ModelAdmin):
+    list_display = ("user", "film", "price", "currency", "purchased_at")
+    search_fields = ("user__email", "film__title")
+    raw_id_fields = ("user", "film")
+
+
+@admin.register(Rental)
+class RentalAdmin(admin.ModelAdmin):
+    list_display = ("user", "film", "price", "currency", "rented_at", "expires_at", "expired")
+    list_filter = ("expired",)
+    search_fields = ("user__email", "film__title")
+    raw_id_fields = ("user", "film")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MovieappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movieApp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from core import checks  # noqa: F401
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.lru import LRUCache
+
+VERSION_KEY = "film:detail:version:{}"
+PAYLOAD_KEY = "film:detail:{}:{}"
+
+# Serialized payloads live in this process first, then in Django's cache.
+# Entries are keyed by (film id, version), so a bumped version makes the old
+# entry unreachable without having to reach into every process.
+_local = LRUCache(maxsize=getattr(settings, "FILM_DETAIL_LRU_SIZE", 2048))
+
+
+class CachedFilm:
+    __slots__ = ("data", "etag", "last_modified")
+
+    def __init__(self, data, etag, last_modified):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def _timeout():
+    return getattr(settings, "FILM_DETAIL_CACHE_TIMEOUT", 60 * 60)
+
+
+def current_version(film_id):
+    version = cache.get(VERSION_KEY.format(film_id))
+    if version is None:
+        # add() keeps concurrent fillers from overwriting each other's version
+        cache.add(VERSION_KEY.format(film_id), uuid.uuid4().hex, _timeout())
+        version = cache.get(VERSION_KEY.format(film_id))
+    return version
+
+
+async def acurrent_version(film_id):
+    version = await cache.aget(VERSION_KEY.format(film_id))
+    if version is None:
+        await cache.aadd(VERSION_KEY.format(film_id), uuid.uuid4().hex, _timeout())
+        version = await cache.aget(VERSION_KEY.format(film_id))
+    return version
+
+
+def get_film_detail(film_id, build):
+    """
+    Return a CachedFilm for the film, calling build(film_id) on a miss.
+    build returns (serialized data, updated_at) or None if the film is gone.
+    """
+    version = current_version(film_id)
+    key = PAYLOAD_KEY.format(film_id, version)
+
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
+
+    entry = cache.get(key)
+    if entry is None:
+        built = build(film_id)
+        if built is None:
+            return None
+        entry = _make_entry(*built)
+        cache.set(key, entry, _timeout())
+    _local.set(key, entry)
+    return entry
+
+
+async def aget_film_detail(film_id, abuild):
+    """get_film_detail for async views; abuild is a coroutine function."""
+    version = await acurrent_version(film_id)
+    key = PAYLOAD_KEY.format(film_id, version)
+
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
+
+    entry = await cache.aget(key)
+    if entry is None:
+        built = await abuild(film_id)
+        if built is None:
+            return None
+        entry = _make_entry(*built)
+        await cache.aset(key, entry, _timeout())
+    _local.set(key, entry)
+    return entry
+
+
+def _make_entry(data, updated_at):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode("utf-8")
+    etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+    return CachedFilm(data, etag, updated_at.timestamp())
+
+
+def invalidate_film(*film_ids):
+    """Drop cached detail payloads for the given films (all processes)."""
+    cache.delete_many([VERSION_KEY.format(film_id) for film_id in film_ids])
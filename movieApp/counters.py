@@ -0,0 +1,237 @@
+import atexit
+import fcntl
+import logging
+import os
+import threading
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+
+from .models import Film, ViewCountBatch
+from .cache import invalidate_film
+
+logger = logging.getLogger(__name__)
+
+
+def _lock(path, blocking=True):
+    """
+    flock() the file at path and return its descriptor, or None if another
+    process holds it (blocking=False) or the file was replaced while we
+    waited. The kernel drops the lock when its holder dies, however it dies.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # A recovery may have unlinked the file after we opened it
+        if os.fstat(fd).st_ino == os.stat(path).st_ino:
+            return fd
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    os.close(fd)
+    return None
+
+
+class ViewCounter:
+    """
+    Write-behind counter for Film.views.
+
+    Increments are summed in memory and appended to a per-process journal in
+    the spool directory. Every flush_interval seconds, or once
+    flush_threshold increments are pending, the journal is sealed into a
+    batch file and applied with one `views = views + n` UPDATE per distinct
+    delta. The batch id is stored in the same transaction, so a batch left
+    behind by a crash is replayed exactly once by recover(). The batch id
+    is deleted only after its file, so a file that outlives a crash (or a
+    restored volume) always finds its id and is never counted twice.
+
+    Each process holds an flock on views-<pid>.lock for as long as it has a
+    journal. recover() takes over another pid's files only when it can take
+    that lock, so a live process (even one that reused a dead one's pid)
+    keeps its files.
+    """
+
+    def __init__(self, spool_dir=None, flush_interval=None, flush_threshold=None):
+        self._spool_dir = spool_dir
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = Counter()
+        self.pending_total = 0
+        self.journal = None
+        self.journal_pid = None
+        self.lock_fd = None
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    @property
+    def spool_dir(self):
+        path = self._spool_dir or getattr(settings, "VIEW_COUNTER_SPOOL_DIR", Path(settings.BASE_DIR) / "view_counter_spool")
+        return Path(path)
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, "VIEW_COUNTER_FLUSH_INTERVAL", 5.0)
+
+    @property
+    def flush_threshold(self):
+        return self._flush_threshold or getattr(settings, "VIEW_COUNTER_FLUSH_THRESHOLD", 1000)
+
+    def journal_path(self, pid=None):
+        return self.spool_dir / f"views-{pid or os.getpid()}.journal"
+
+    def lock_path(self, pid=None):
+        return self.spool_dir / f"views-{pid or os.getpid()}.lock"
+
+    def _open_journal(self):
+        # Reopen after fork so children never share the parent's journal
+        if self.journal is None or self.journal_pid != os.getpid():
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            if self.lock_fd is not None:
+                # Inherited from the parent; the parent keeps its own copy
+                os.close(self.lock_fd)
+            self.lock_fd = None
+            while self.lock_fd is None:
+                self.lock_fd = _lock(self.lock_path())
+            self.journal = open(self.journal_path(), "a", buffering=1, encoding="utf-8")
+            self.journal_pid = os.getpid()
+            self.pending = Counter()
+            self.pending_total = 0
+            self.thread = None
+        return self.journal
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+            self.thread.start()
+
+    def increment(self, film_id, n=1):
+        with self.lock:
+            self._open_journal().write(f"{film_id}\t{n}\n")
+            self.pending[film_id] += n
+            self.pending_total += n
+            self._ensure_thread()
+            if self.pending_total >= self.flush_threshold:
+                self.wakeup.set()
+
+    def pending_for(self, film_id):
+        """Views recorded in this process that are not yet in the database."""
+        return self.pending.get(film_id, 0)
+
+    def _run(self):
+        self.recover()
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("View counter flush failed; batch kept for retry")
+            finally:
+                close_old_connections()
+
+    def _seal(self):
+        """Swap out the live journal and pending counts. Returns the batch file or None."""
+        with self.lock:
+            if self.journal is None or self.journal_pid != os.getpid() or not self.pending_total:
+                return None
+            self.journal.close()
+            batch = self.spool_dir / f"views-{os.getpid()}-{uuid.uuid4().hex}.batch"
+            os.replace(self.journal_path(), batch)
+            self.journal = open(self.journal_path(), "a", buffering=1, encoding="utf-8")
+            self.pending = Counter()
+            self.pending_total = 0
+            return batch
+
+    def flush(self):
+        """Seal the current journal and apply every batch this process owns."""
+        with self.flush_lock:
+            self._seal()
+            for batch in sorted(self.spool_dir.glob(f"views-{os.getpid()}-*.batch")):
+                self.apply_batch(batch)
+
+    @staticmethod
+    def read_batch(path):
+        totals = Counter()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                film_id, _, n = line.rstrip("\n").partition("\t")
+                if film_id and n.isdigit():
+                    totals[film_id] += int(n)
+        return totals
+
+    def apply_batch(self, path):
+        # views-<pid>-<batch id>.batch; the pid part changes when recovered
+        batch_id = path.stem.rsplit("-", 1)[1]
+        try:
+            totals = self.read_batch(path)
+        except FileNotFoundError:
+            # Applied by a concurrent flush() or recover() in this process
+            return
+
+        # Films sharing the same delta are updated together
+        by_delta = defaultdict(list)
+        for film_id, n in totals.items():
+            by_delta[n].append(film_id)
+
+        try:
+            with transaction.atomic():
+                ViewCountBatch.objects.create(id=batch_id)
+                for n, film_ids in by_delta.items():
+                    Film.objects.filter(pk__in=film_ids).update(views=F("views") + n)
+                transaction.on_commit(lambda: invalidate_film(*totals))
+        except IntegrityError:
+            # Already applied before a crash removed the file; just drop it
+            pass
+        path.unlink(missing_ok=True)
+        # With the file gone the id can never be seen again
+        ViewCountBatch.objects.filter(pk=batch_id).delete()
+
+    def recover(self):
+        """
+        Apply journals and batches left by dead processes. A dead process's
+        lock is free; holding it, its files are claimed by renaming them to
+        this process, so concurrent recoveries never apply one twice.
+        """
+        if not self.spool_dir.exists():
+            return
+        pids = set()
+        for path in self.spool_dir.iterdir():
+            parts = path.stem.split("-")
+            if len(parts) >= 2 and parts[1].isdigit() and int(parts[1]) != os.getpid():
+                pids.add(int(parts[1]))
+        for pid in pids:
+            lock_fd = _lock(self.lock_path(pid), blocking=False)
+            if lock_fd is None:
+                continue
+            try:
+                claimed = []
+                for path in self.spool_dir.glob(f"views-{pid}[.-]*"):
+                    if path.suffix not in (".journal", ".batch"):
+                        continue
+                    batch_id = path.stem.rsplit("-", 1)[1] if path.suffix == ".batch" else uuid.uuid4().hex
+                    target = self.spool_dir / f"views-{os.getpid()}-{batch_id}.batch"
+                    os.replace(path, target)
+                    claimed.append(target)
+                self.lock_path(pid).unlink(missing_ok=True)
+            finally:
+                os.close(lock_fd)
+            with self.flush_lock:
+                for path in claimed:
+                    self.apply_batch(path)
+
+    def close(self):
+        if self.journal is None or self.journal_pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final view counter flush failed; journal kept for recovery")
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.close)
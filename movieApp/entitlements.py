@@ -0,0 +1,197 @@
+"""
+Rentals and purchases, and the access check playback authorization uses.
+
+Each user's entitlements are loaded with one query into a map of film id
+to expiry (None for purchases) and cached like film detail payloads: in
+this process first, then in Django's cache, keyed by a per-user version
+that buy(), rent() and the expiry sweep bump. An access check is then a
+version read from the cache and a dict lookup; expiries are compared at
+check time, so a rental stops granting access the moment it ends even
+before the sweep marks it expired. The version lives in the shared cache
+(core.E001), so a sale made in another process is seen on the next check.
+"""
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Value
+from django.utils import timezone
+
+from core.lru import LRUCache
+from .cache import invalidate_film
+from .models import Film, FilmStatus, Purchase, Rental
+
+VERSION_KEY = "entitlements:version:{}"
+PAYLOAD_KEY = "entitlements:{}:{}"
+
+Access = namedtuple("Access", ["kind", "expires_at"])
+
+_local = LRUCache(maxsize=getattr(settings, "ENTITLEMENT_LRU_SIZE", 4096))
+_sweep_checked_at = 0.0
+
+
+def _timeout():
+    return getattr(settings, "ENTITLEMENT_CACHE_TIMEOUT", 15 * 60)
+
+
+def _version(user_id):
+    version = cache.get(VERSION_KEY.format(user_id))
+    if version is None:
+        cache.add(VERSION_KEY.format(user_id), uuid.uuid4().hex, _timeout())
+        version = cache.get(VERSION_KEY.format(user_id))
+    return version
+
+
+def load_entitlements(user_id):
+    """{film id: expiry timestamp, or None if bought} from one UNION query."""
+    purchases = Purchase.objects.filter(user_id=user_id).values_list(
+        "film_id", Value(None, output_field=DateTimeField()),
+    )
+    rentals = Rental.objects.filter(user_id=user_id, expires_at__gt=timezone.now()).values_list(
+        "film_id", "expires_at",
+    )
+    films = {}
+    for film_id, expires_at in purchases.union(rentals, all=True):
+        if expires_at is None:
+            films[film_id] = None
+        elif films.get(film_id, 0) is not None:
+            films[film_id] = max(films.get(film_id, 0), expires_at.timestamp())
+    return films
+
+
+def entitlements_for(user_id):
+    """Cached load_entitlements()."""
+    version = _version(user_id)
+    key = PAYLOAD_KEY.format(user_id, version)
+    films = _local.get(key)
+    if films is None:
+        films = cache.get(key)
+        if films is None:
+            films = load_entitlements(user_id)
+            cache.set(key, films, _timeout())
+        _local.set(key, films)
+    return films
+
+
+def _cached_access(films, film_id):
+    if film_id not in films:
+        return None
+    expires = films[film_id]
+    if expires is None:
+        return Access("purchase", None)
+    if expires <= time.time():
+        return None
+    return Access("rental", datetime.fromtimestamp(expires, tz=dt_timezone.utc))
+
+
+def invalidate_entitlements(*user_ids):
+    """Drop cached entitlements for the given users (all processes)."""
+    cache.delete_many([VERSION_KEY.format(user_id) for user_id in user_ids])
+
+
+def privileged_access(user, film):
+    """Access for staff and the film's owner, who may play it in any status."""
+    if user is None or not user.is_authenticated:
+        return None
+    if user.is_staff:
+        return Access("staff", None)
+    if film.filmmaker_id == user.pk:
+        return Access("owner", None)
+    return None
+
+
+def access_for(user, film):
+    """
+    Access(kind, expires_at) if the user may play the film, else None. Only
+    staff and the owner may play a film that is not published.
+    film needs pk, filmmaker_id, status, rent_price and buy_price loaded.
+    """
+    if film.status != FilmStatus.PUBLISHED:
+        return privileged_access(user, film)
+    if not film.rent_price and not film.buy_price:
+        return Access("free", None)
+    access = privileged_access(user, film)
+    if access is not None:
+        return access
+    if user is None or not user.is_authenticated:
+        return None
+    return _cached_access(entitlements_for(user.pk), film.pk)
+
+
+def has_access(user, film):
+    return access_for(user, film) is not None
+
+
+def _record_sale(user_id, film_id, price):
+    # Concurrent sales of the same film must not overwrite each other's total
+    Film.objects.filter(pk=film_id).update(total_earning=F("total_earning") + price)
+    transaction.on_commit(lambda: (invalidate_entitlements(user_id), invalidate_film(film_id)))
+
+
+def buy(user, film):
+    """(Purchase, created). Buying a film twice returns the first purchase."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                purchase = Purchase.objects.create(
+                    user=user, film=film, price=film.buy_price, currency=film.currency,
+                )
+        except IntegrityError:
+            return Purchase.objects.get(user=user, film=film), False
+        _record_sale(user.pk, film.pk, film.buy_price)
+    return purchase, True
+
+
+def rent(user, film):
+    """(Rental, created). A rental that has not ended yet is returned as is."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Serializes rentals of the film (the sale updates this row anyway),
+        # so two concurrent requests cannot both find no active rental
+        Film.objects.select_for_update().filter(pk=film.pk).values_list("pk").first()
+        active = Rental.objects.filter(user=user, film=film, expires_at__gt=now).order_by("-expires_at").first()
+        if active is not None:
+            return active, False
+        rental = Rental.objects.create(
+            user=user, film=film, price=film.rent_price, currency=film.currency,
+            expires_at=now + timedelta(hours=film.rental_hours),
+        )
+        _record_sale(user.pk, film.pk, film.rent_price)
+    _schedule_sweep()
+    return rental, True
+
+
+def expire_rentals(batch_size=None):
+    """
+    Mark ended rentals as expired, batch_size rows per UPDATE, and drop the
+    affected users' cached entitlements. Returns the number of rentals.
+    """
+    batch_size = batch_size or getattr(settings, "RENTAL_SWEEP_BATCH_SIZE", 1000)
+    now = timezone.now()
+    total = 0
+    while True:
+        batch = list(
+            Rental.objects.filter(expired=False, expires_at__lte=now)
+            .order_by("expires_at").values_list("pk", "user_id")[:batch_size]
+        )
+        if not batch:
+            return total
+        Rental.objects.filter(pk__in=[pk for pk, _ in batch]).update(expired=True)
+        invalidate_entitlements(*{user_id for _, user_id in batch})
+        total += len(batch)
+
+
+def _schedule_sweep():
+    # At most one check per process per interval
+    global _sweep_checked_at
+    interval = getattr(settings, "RENTAL_SWEEP_INTERVAL", 15 * 60)
+    now = time.monotonic()
+    if now - _sweep_checked_at < interval:
+        return
+    _sweep_checked_at = now
+    from .tasks import sweep_expired_rentals
+    sweep_expired_rentals.enqueue_unique(delay=timedelta(seconds=interval))
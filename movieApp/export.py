@@ -0,0 +1,101 @@
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Film, FilmStatus
+from .serializers import FilmListSerializer
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+# What non-staff users may export
+PUBLIC_STATUSES = (FilmStatus.PUBLISHED,)
+# Rows are joined into pieces of roughly this size before being yielded
+BUFFER_SIZE = 64 * 1024
+
+
+def export_queryset(statuses=None):
+    """
+    The catalog in primary key order. catalog() joins the filmmaker and
+    prefetches genres, which iterator(chunk_size=...) does once per chunk.
+    """
+    queryset = Film.objects.catalog().order_by("pk")
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def iter_rows(queryset, chunk_size=2000):
+    """Yield one dict per film while holding at most one chunk in memory."""
+    # One serializer instance for every row; binding fields per row is the
+    # expensive part of serializer.data
+    serializer = FilmListSerializer()
+    for film in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(film)
+
+
+def _dumps(row):
+    return json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def _buffered(pieces):
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_ndjson(rows):
+    return _buffered(_dumps(row) + "\n" for row in rows)
+
+
+def iter_json_array(rows):
+    def pieces():
+        yield "["
+        for i, row in enumerate(rows):
+            yield ("," if i else "") + _dumps(row)
+        yield "]\n"
+    return _buffered(pieces())
+
+
+def gzip_stream(chunks, level=6):
+    """Compress an iterable of bytes into a single gzip member as it goes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_catalog(file_format="ndjson", statuses=None, chunk_size=2000, compress=False):
+    """Iterable of bytes for the whole catalog in the given format."""
+    rows = iter_rows(export_queryset(statuses), chunk_size=chunk_size)
+    chunks = iter_ndjson(rows) if file_format == "ndjson" else iter_json_array(rows)
+    return gzip_stream(chunks) if compress else chunks
+
+
+async def aiter_chunks(chunks):
+    """
+    Async iterator over a sync iterable of bytes, for StreamingHttpResponse
+    under ASGI (which would otherwise read a sync iterator into a list
+    before sending anything). Each chunk is produced on the thread that
+    serves sync ORM work, so the queryset's cursor stays on one connection.
+    """
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(iterator, None)) is not None:
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
@@ -0,0 +1,85 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Film, FilmStatus, FilmType
+
+# Public ordering name -> keyset ordering; the trailing "-id" keeps it unique
+FILM_ORDERINGS = {
+    "created_at": ("created_at", "id"),
+    "-created_at": ("-created_at", "-id"),
+    "views": ("views", "id"),
+    "-views": ("-views", "-id"),
+    "published_at": ("published_at", "id"),
+    "-published_at": ("-published_at", "-id"),
+    "rent_price": ("rent_price", "id"),
+    "-rent_price": ("-rent_price", "-id"),
+}
+DEFAULT_FILM_ORDERING = "-created_at"
+
+
+def _choice(params, name, choices):
+    value = params.get(name)
+    if value is None or value == "":
+        return None
+    if value not in choices:
+        raise ValidationError({name: f"Must be one of: {', '.join(choices)}."})
+    return value
+
+
+def _number(params, name, cast):
+    value = params.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return cast(value)
+    except (ValueError, InvalidOperation):
+        raise ValidationError({name: "Must be a number."})
+
+
+def filter_films(queryset, params):
+    """
+    Apply catalog query parameters to a Film queryset.
+
+    Supported parameters: status, type, genre (comma separated names),
+    year_min, year_max, price_min, price_max (rent price) and ordering
+    (one of FILM_ORDERINGS). Returns the filtered queryset and the keyset
+    ordering to paginate it with.
+    """
+    film_status = _choice(params, "status", FilmStatus.values)
+    if film_status:
+        queryset = queryset.filter(status=film_status)
+
+    film_type = _choice(params, "type", FilmType.values)
+    if film_type:
+        queryset = queryset.filter(type=film_type)
+
+    genre = params.get("genre")
+    if genre:
+        names = [name.strip() for name in genre.split(",") if name.strip()]
+        # Subquery on the through table avoids duplicate rows for multi-genre films
+        film_ids = Film.genre.through.objects.filter(genre__name__in=names).values("film_id")
+        queryset = queryset.filter(pk__in=film_ids)
+
+    year_min = _number(params, "year_min", int)
+    if year_min is not None:
+        queryset = queryset.filter(year__gte=year_min)
+    year_max = _number(params, "year_max", int)
+    if year_max is not None:
+        queryset = queryset.filter(year__lte=year_max)
+
+    price_min = _number(params, "price_min", Decimal)
+    if price_min is not None:
+        queryset = queryset.filter(rent_price__gte=price_min)
+    price_max = _number(params, "price_max", Decimal)
+    if price_max is not None:
+        queryset = queryset.filter(rent_price__lte=price_max)
+
+    ordering = params.get("ordering") or DEFAULT_FILM_ORDERING
+    if ordering not in FILM_ORDERINGS:
+        raise ValidationError({"ordering": f"Must be one of: {', '.join(FILM_ORDERINGS)}."})
+    if ordering.lstrip("-") == "published_at":
+        # A keyset cursor cannot seek past NULLs; unpublished films have no date
+        queryset = queryset.filter(published_at__isnull=False)
+
+    return queryset, FILM_ORDERINGS[ordering]
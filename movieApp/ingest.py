@@ -0,0 +1,186 @@
+import csv
+import json
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+
+from accounts.models import User
+from .models import Film, Genre
+from .search import get_search_backend
+
+IMPORT_FIELDS = (
+    "title", "year", "logline", "type", "thumbnail", "trailer", "full_film",
+    "status", "duration_s", "currency", "rent_price", "rental_hours",
+    "buy_price", "published_at",
+)
+# CloudinaryField accepts "" in clean_fields, so required columns are checked up front
+REQUIRED_FIELDS = tuple(
+    name for name in IMPORT_FIELDS
+    if not Film._meta.get_field(name).blank and not Film._meta.get_field(name).has_default()
+)
+_GENRE_SPLIT_RE = re.compile(r"[|,]")
+
+
+def parse_ndjson(lines):
+    """Yield (line number, row dict or error message) from NDJSON lines."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, "Each line must be a JSON object."
+            continue
+        yield number, row
+
+
+def parse_csv(lines):
+    """Yield (row number, row dict) from CSV lines with a header row."""
+    for number, row in enumerate(csv.DictReader(lines), start=2):
+        yield number, row
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def error(self, row, errors):
+        self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self):
+        return {"created": self.created, "failed": len(self.errors), "errors": self.errors}
+
+
+class FilmImporter:
+    """
+    Bulk-insert films from parsed rows.
+
+    All genre names are resolved with one query and missing genres are
+    created with a single bulk_create. Films and their genre through rows are
+    then inserted in batches, each batch in its own transaction, so one bad
+    batch does not roll back the rest of the import.
+    """
+
+    def __init__(self, filmmaker=None, allow_filmmaker_column=False, batch_size=1000):
+        self.filmmaker = filmmaker
+        self.allow_filmmaker_column = allow_filmmaker_column
+        self.batch_size = batch_size
+
+    @staticmethod
+    def genre_names(value):
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = _GENRE_SPLIT_RE.split(value)
+        return [str(name).strip() for name in value if str(name).strip()]
+
+    def resolve_filmmakers(self, rows):
+        if not self.allow_filmmaker_column:
+            return {}
+        emails = {row.get("filmmaker_email") for _, row in rows if isinstance(row, dict) and row.get("filmmaker_email")}
+        return {user.email: user for user in User.objects.filter(email__in=emails).only("id", "email", "full_name")}
+
+    def resolve_genres(self, names):
+        names = set(names)
+        if not names:
+            return {}
+        genres = dict(Genre.objects.filter(name__in=names).values_list("name", "id"))
+        missing = names - genres.keys()
+        if missing:
+            Genre.objects.bulk_create([Genre(name=name) for name in missing], ignore_conflicts=True)
+            # ignore_conflicts does not return primary keys, so read them back
+            genres.update(Genre.objects.filter(name__in=missing).values_list("name", "id"))
+        return genres
+
+    def build(self, number, row, filmmakers, report):
+        """Validate one row without touching the database. Returns (film, genre names) or None."""
+        filmmaker = self.filmmaker
+        if self.allow_filmmaker_column and row.get("filmmaker_email"):
+            filmmaker = filmmakers.get(row["filmmaker_email"])
+            if filmmaker is None:
+                report.error(number, {"filmmaker_email": ["User does not exist."]})
+                return None
+        if filmmaker is None:
+            report.error(number, {"filmmaker": ["A filmmaker is required."]})
+            return None
+
+        # Empty cells fall back to the model defaults
+        values = {name: row[name] for name in IMPORT_FIELDS if row.get(name) not in (None, "")}
+        missing = [name for name in REQUIRED_FIELDS if name not in values]
+        if missing:
+            report.error(number, {name: ["This field is required."] for name in missing})
+            return None
+        film = Film(filmmaker=filmmaker, **values)
+        try:
+            film.clean_fields(exclude=["id", "filmmaker"])
+        except ValidationError as e:
+            report.error(number, e.message_dict)
+            return None
+        return film, self.genre_names(row.get("genre") or row.get("genres"))
+
+    def run(self, parsed_rows):
+        report = ImportReport()
+        rows = list(parsed_rows)
+        filmmakers = self.resolve_filmmakers(rows)
+
+        built = []
+        for number, row in rows:
+            if not isinstance(row, dict):
+                report.error(number, {"non_field_errors": [row]})
+                continue
+            result = self.build(number, row, filmmakers, report)
+            if result is not None:
+                built.append((number, *result))
+
+        genres = self.resolve_genres(name for _, _, names in built for name in names)
+        for start in range(0, len(built), self.batch_size):
+            self.insert_batch(built[start:start + self.batch_size], genres, report)
+        return report
+
+    @staticmethod
+    def insert_through_rows(rows):
+        """
+        Write (film_id, genre_id) pairs with one executemany. Through rows are
+        two plain columns, so building model instances for bulk_create would
+        cost more than the insert itself.
+        """
+        through = Film.genre.through._meta
+        film_column = through.get_field("film").column
+        genre_column = through.get_field("genre").column
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {quote(through.db_table)} ({quote(film_column)}, {quote(genre_column)}) "
+                "VALUES (%s, %s)",
+                rows,
+            )
+
+    def insert_batch(self, batch, genres, report):
+        films = [film for _, film, _ in batch]
+        # Film ids are generated client-side, so through rows can be built up front
+        through = [
+            (film.pk, genres[name])
+            for _, film, names in batch
+            for name in dict.fromkeys(names)
+        ]
+        documents = [
+            (film.pk, film.title, film.logline, " ".join(dict.fromkeys(names)), film.filmmaker.full_name)
+            for _, film, names in batch
+        ]
+        try:
+            with transaction.atomic():
+                Film.objects.bulk_create(films, batch_size=self.batch_size)
+                self.insert_through_rows(through)
+                # bulk_create skips post_save, so index the batch explicitly
+                get_search_backend().add_documents(documents)
+        except DatabaseError as e:
+            for number, _, _ in batch:
+                report.error(number, {"non_field_errors": [f"Batch insert failed: {e}"]})
+            return
+        report.created += len(films)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from movieApp.entitlements import expire_rentals
+
+
+class Command(BaseCommand):
+    help = "Mark rentals that have ended as expired, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Rentals per UPDATE.")
+
+    def handle(self, *args, **options):
+        count = expire_rentals(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {count} rentals."))
@@ -0,0 +1,40 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from movieApp.export import EXPORT_FORMATS, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream the film catalog to a file (or stdout) as NDJSON or a JSON array."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file; '-' for stdout.")
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), help="Defaults to the file extension, else ndjson.")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output (implied by a .gz path).")
+        parser.add_argument("--status", help="Comma-separated statuses to include (default: all).")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        compress = options["gzip"] or path.endswith(".gz")
+        name = path[:-3] if path.endswith(".gz") else path
+        file_format = options["format"] or ("json" if name.endswith(".json") else "ndjson")
+        statuses = [value for value in (options["status"] or "").split(",") if value] or None
+
+        chunks = export_catalog(file_format, statuses, chunk_size=options["chunk_size"], compress=compress)
+        started = time.monotonic()
+        written = 0
+        out = sys.stdout.buffer if path == "-" else open(path, "wb")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if path != "-":
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written} bytes to {path} in {time.monotonic() - started:.1f}s."
+            ))
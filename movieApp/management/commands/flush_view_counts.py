@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movieApp.counters import view_counter
+
+
+class Command(BaseCommand):
+    help = "Apply view-counter journals left behind by stopped processes."
+
+    def handle(self, *args, **options):
+        view_counter.recover()
+        self.stdout.write(self.style.SUCCESS("View counter spool recovered."))
@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from movieApp.ingest import FilmImporter, parse_csv, parse_ndjson
+
+
+class Command(BaseCommand):
+    help = "Bulk import films from an NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV (.csv) file")
+        parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension.")
+        parser.add_argument("--filmmaker", help="Email of the filmmaker for rows without filmmaker_email.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--report", help="Write the full JSON report (with row errors) to this path.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+
+        filmmaker = None
+        if options["filmmaker"]:
+            try:
+                filmmaker = User.objects.get(email=options["filmmaker"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['filmmaker']} does not exist.")
+
+        importer = FilmImporter(
+            filmmaker=filmmaker, allow_filmmaker_column=True, batch_size=options["batch_size"],
+        )
+        started = time.monotonic()
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = parse_csv(f) if file_format == "csv" else parse_ndjson(f)
+            report = importer.run(rows)
+        elapsed = time.monotonic() - started
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as out:
+                json.dump(report.as_dict(), out, indent=2)
+        for error in report.errors[:20]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if len(report.errors) > 20:
+            self.stderr.write(f"... and {len(report.errors) - 20} more errors")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} films in {elapsed:.1f}s ({len(report.errors)} failed)."
+        ))
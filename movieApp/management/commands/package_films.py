@@ -0,0 +1,61 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from movieApp.models import Film
+from movieApp.packaging import package_many
+
+ASSETS = ("trailer", "full_film")
+
+
+class Command(BaseCommand):
+    help = (
+        "Package films into HLS ladders from local source files, named by "
+        "Cloudinary public id under --source-root, several films at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("film_ids", nargs="*", help="Films to package (default: all with a local source).")
+        parser.add_argument("--asset", choices=ASSETS, help="Only this asset (default: both).")
+        parser.add_argument("--source-root", default=None, help="Defaults to PLAYBACK_MEDIA_ROOT.")
+        parser.add_argument("--workers", type=int, default=None, help="Encoder processes (default: PACKAGING_WORKERS).")
+        parser.add_argument("--force", action="store_true", help="Also films that already have a package.")
+
+    def handle(self, *args, **options):
+        root = options["source_root"] or settings.PLAYBACK_MEDIA_ROOT
+        if not root:
+            raise CommandError("Pass --source-root or set PLAYBACK_MEDIA_ROOT.")
+        assets = [options["asset"]] if options["asset"] else list(ASSETS)
+        films = Film.objects.only("id", "renditions", *ASSETS)
+        if options["film_ids"]:
+            films = films.filter(pk__in=options["film_ids"])
+
+        items = []
+        for film in films.iterator(chunk_size=500):
+            for asset in assets:
+                resource = getattr(film, asset)
+                if not resource or (film.renditions.get(asset, {}).get("status") == "ready" and not options["force"]):
+                    continue
+                name = f"{resource.public_id}.{resource.format}" if resource.format else resource.public_id
+                source = Path(root) / name
+                if source.is_file():
+                    items.append((film.pk, asset, source))
+        if not items:
+            self.stdout.write("Nothing to package.")
+            return
+
+        started = time.perf_counter()
+        failed = 0
+        for (film_id, asset, _), result in package_many(items, workers=options["workers"]):
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(f"{film_id} {asset}: {result}")
+            else:
+                names = ", ".join(r["name"] for r in result["renditions"])
+                self.stdout.write(f"{film_id} {asset}: {names}")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Packaged {len(items) - failed} of {len(items)} assets in {elapsed:.1f}s."
+        ))
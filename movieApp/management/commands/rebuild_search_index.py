@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from movieApp.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the film search index from the Film table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt with {type(backend).__name__}."))
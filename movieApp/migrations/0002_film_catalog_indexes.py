@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['-created_at', '-id'], name='movieApp_fi_created_b7f07f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', '-created_at'], name='movieApp_fi_status_e79f52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'type', '-published_at'], name='movieApp_fi_status_3197fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', '-views'], name='movieApp_fi_status_9c5dfd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='film',
+            index=models.Index(fields=['status', 'rent_price'], name='movieApp_fi_status_f9b4a1_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.db import migrations
+
+SEARCH_TABLE = "movieapp_film_search"
+
+
+def _rowid(film_id):
+    digest = hashlib.blake2b(film_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "film_id UNINDEXED, title, logline, genres, filmmaker, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+    # Backfill existing films; signals are not connected to historical models
+    Film = apps.get_model("movieApp", "Film")
+    rows = []
+    for film in Film.objects.select_related("filmmaker").prefetch_related("genre").iterator(chunk_size=500):
+        genres = " ".join(g.name for g in film.genre.all())
+        rows.append((_rowid(film.pk), film.pk, film.title, film.logline, genres, film.filmmaker.full_name))
+    if rows:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, film_id, title, logline, genres, filmmaker) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0002_film_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:40
+
+import cloudinary.models
+import django.db.models.deletion
+import movieApp.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0003_film_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='film',
+            name='full_film',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='film',
+            name='trailer',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.CharField(default=movieApp.models.generate_short_uuid, editable=False, max_length=10, primary_key=True, serialize=False, unique=True)),
+                ('field', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('trailer', 'Trailer'), ('full_film', 'Full Film')], max_length=12)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('receiving', 'Receiving'), ('assembling', 'Assembling'), ('transferring', 'Transferring'), ('complete', 'Complete'), ('failed', 'Failed')], default='receiving', max_length=12)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('film', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='movieApp.film')),
+                ('uploader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='movieApp.uploadsession')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
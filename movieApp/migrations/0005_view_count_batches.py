@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0004_chunked_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewCountBatch',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('applied_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0005_view_count_batches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position_s', models.PositiveIntegerField(default=0)),
+                ('duration_s', models.PositiveIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('last_watched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('film', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to='movieApp.film')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='watch_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('completed', False)), fields=['user', '-last_watched_at'], name='watch_progress_resume_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'film'), name='watch_progress_user_film')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movieApp', '0007_entitlements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='film',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
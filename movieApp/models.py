@@ -1,5 +1,6 @@
 from django.db import models
 from accounts.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import shortuuid
 from cloudinary.models import CloudinaryField
@@ -31,6 +32,26 @@ class Genre(models.Model):
         return self.name
 
 
+class FilmQuerySet(models.QuerySet):
+    # Columns needed by FilmListSerializer; keep in sync with its Meta.fields
+    CATALOG_FIELDS = (
+        "id", "title", "year", "logline", "type", "thumbnail", "status",
+        "duration_s", "currency", "rent_price", "buy_price", "views",
+        "created_at", "published_at", "filmmaker__id", "filmmaker__full_name",
+    )
+
+    def catalog(self):
+        """
+        Planned queryset for catalog pages: one query for the films (with the
+        filmmaker joined in) and one for all of their genres.
+        """
+        return (
+            self.select_related("filmmaker")
+            .prefetch_related(models.Prefetch("genre", queryset=Genre.objects.only("id", "name")))
+            .only(*self.CATALOG_FIELDS)
+        )
+
+
 class Film(models.Model):
     id = models.CharField(
         primary_key=True, max_length=10,
@@ -45,8 +66,10 @@ class Film(models.Model):
 
     # Cloudinary uploads (separate folders)
     thumbnail = CloudinaryField('image', folder='thumbnails')
-    trailer = CloudinaryField(resource_type='video', folder='trailers')
-    full_film = CloudinaryField(resource_type='video', folder='full_films')
+    # Large videos may be attached later through the chunked upload API
+    # Authenticated: only reachable through signed URLs (movieApp.playback)
+    trailer = CloudinaryField(resource_type='video', type='authenticated', folder='trailers', blank=True, null=True)
+    full_film = CloudinaryField(resource_type='video', type='authenticated', folder='full_films', blank=True, null=True)
 
     status = models.CharField(max_length=12, choices=FilmStatus.choices, default=FilmStatus.REVIEW)
     duration_s = models.PositiveIntegerField(default=0, help_text="Duration in seconds")
@@ -61,21 +84,168 @@ class Film(models.Model):
 
     views = models.PositiveIntegerField(default=0)
     total_earning = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # HLS packages per asset ("trailer", "full_film"), written by movieApp.packaging
+    renditions = models.JSONField(default=dict, blank=True)
+
+    objects = FilmQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Catalog filters always lead with status; ordering columns follow
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["status", "-created_at"]),
+            models.Index(fields=["status", "type", "-published_at"]),
+            models.Index(fields=["status", "-views"]),
+            models.Index(fields=["status", "rent_price"]),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.year}) - {self.filmmaker.email}"
 
-# class FilmWatchHistory(models.Model):
-#     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="watch_history")
-#     film = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="watch_history")
-#     watched_at = models.DateTimeField(auto_now_add=True)
+class UploadField(models.TextChoices):
+    THUMBNAIL = "thumbnail", _("Thumbnail")
+    TRAILER = "trailer", _("Trailer")
+    FULL_FILM = "full_film", _("Full Film")
+
+class UploadStatus(models.TextChoices):
+    RECEIVING = "receiving", _("Receiving")
+    ASSEMBLING = "assembling", _("Assembling")
+    TRANSFERRING = "transferring", _("Transferring")
+    COMPLETE = "complete", _("Complete")
+    FAILED = "failed", _("Failed")
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload of one media file for a film."""
+    id = models.CharField(
+        primary_key=True, max_length=10,
+        default=generate_short_uuid, editable=False, unique=True
+    )
+    film = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="upload_sessions")
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    field = models.CharField(max_length=12, choices=UploadField.choices)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=12, choices=UploadStatus.choices, default=UploadStatus.RECEIVING)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.filename} -> {self.film_id}.{self.field} ({self.status})"
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.total_size // self.chunk_size))
 
-#     class Meta:
-#         unique_together = ('user', 'film')
-#         ordering = ["-watched_at"]
+    def expected_chunk_size(self, index: int) -> int:
+        if index == self.total_chunks - 1:
+            return self.total_size - self.chunk_size * index
+        return self.chunk_size
 
-#     def __str__(self):
-#         return f"{self.user.username} watched {self.film.title} on {self.watched_at}"
\ No newline at end of file
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("session", "index"),)
+        ordering = ["index"]
+
+    def __str__(self):
+        return f"{self.session_id}#{self.index}"
+
+class ViewCountBatch(models.Model):
+    """Marks a view-counter batch as applied so it is never counted twice."""
+    id = models.CharField(primary_key=True, max_length=32)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.id
+
+class WatchProgress(models.Model):
+    """
+    Where a user is in a film. Written in batches from player heartbeats by
+    movieApp.progress, which also sets last_watched_at from the heartbeat.
+    """
+    # Leading column of both the unique constraint and the resume index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="watch_progress", db_index=False)
+    film = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="watch_progress")
+    position_s = models.PositiveIntegerField(default=0)
+    duration_s = models.PositiveIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    last_watched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "film"], name="watch_progress_user_film"),
+        ]
+        indexes = [
+            # "Continue watching": a user's unfinished films, most recent first
+            models.Index(
+                fields=["user", "-last_watched_at"], condition=models.Q(completed=False),
+                name="watch_progress_resume_idx",
+            ),
+        ]
+
+    @property
+    def percent(self) -> int:
+        if not self.duration_s:
+            return 0
+        p = int((self.position_s / max(1, self.duration_s)) * 100)
+        return 100 if self.completed else min(p, 99)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.film_id} ({self.percent}%)"
+
+
+class Purchase(models.Model):
+    """Permanent access to a film. Recorded by movieApp.entitlements.buy()."""
+    # Leading column of the unique constraint
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="purchases", db_index=False)
+    film = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="purchases")
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="USD")
+    purchased_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "film"], name="purchase_user_film"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} bought {self.film_id}"
+
+
+class Rental(models.Model):
+    """
+    Access to a film until expires_at. Recorded by movieApp.entitlements.rent();
+    `expired` is set by the batch sweep, access checks compare expires_at.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rentals", db_index=False)
+    film = models.ForeignKey(Film, on_delete=models.CASCADE, related_name="rentals")
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="USD")
+    rented_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    expired = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Access checks: a user's rentals of a film, latest expiry last
+            models.Index(fields=["user", "film", "expires_at"], name="rental_access_idx"),
+            # Expiry sweep: only rentals not yet swept
+            models.Index(fields=["expires_at"], condition=models.Q(expired=False), name="rental_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} rented {self.film_id} until {self.expires_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,345 @@
+"""
+HLS packaging for uploaded trailers and full films.
+
+After an upload has been pushed to the media host, transfer_session() moves
+the assembled file into PACKAGING_ROOT/incoming and queues the
+package_film job. The job hands the file to a bounded process pool
+(PACKAGING_WORKERS processes, started with "spawn" because job workers are
+multithreaded), where package_source() encodes every PACKAGING_LADDER rung
+the source is tall enough for into an HLS playlist with its segments, and
+writes a master playlist over them. The parent process then records the
+result on Film.renditions, and the staged file is deleted once the job
+succeeds or gives up.
+
+Packages are content addressed: their directory is named after the SHA-256
+of the source plus a fingerprint of the ladder, so re-uploading the same
+file reuses the existing package, a changed ladder gets a fresh one, and
+paths never change once written. Packages are built in a temporary
+directory and renamed into place, so readers never see half a ladder.
+
+Nothing under PACKAGING_ROOT is served directly: PackageView serves one
+film's ready package (package_path()) under a signed, per-user URL prefix
+from movieApp.playback.package_url().
+
+The encoder is PACKAGING_ENCODER (ffmpeg by default); anything with the
+same probe()/encode() methods can stand in for it.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+EXTINF_RE = re.compile(r"^#EXTINF:([\d.]+)")
+
+
+class PackagingError(Exception):
+    pass
+
+
+class FFmpegEncoder:
+    """H.264/AAC HLS renditions with ffmpeg and ffprobe (must be on PATH)."""
+
+    def __init__(self, segment_seconds=6, ffmpeg="ffmpeg", ffprobe="ffprobe"):
+        self.segment_seconds = segment_seconds
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+
+    def _run(self, args):
+        try:
+            result = subprocess.run(args, capture_output=True, text=True)
+        except FileNotFoundError:
+            raise PackagingError(f"{args[0]} is not installed.")
+        if result.returncode != 0:
+            raise PackagingError(f"{args[0]} failed: {result.stderr.strip()[-500:]}")
+        return result.stdout
+
+    def probe(self, source):
+        """{"width", "height", "duration"} of the first video stream."""
+        output = self._run([
+            self.ffprobe, "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height:format=duration", "-of", "json", str(source),
+        ])
+        data = json.loads(output)
+        if not data.get("streams"):
+            raise PackagingError("The source has no video stream.")
+        stream = data["streams"][0]
+        return {
+            "width": stream["width"],
+            "height": stream["height"],
+            "duration": float(data.get("format", {}).get("duration") or 0),
+        }
+
+    def encode(self, source, rendition, out_dir):
+        """Write out_dir/index.m3u8 and its segments for one ladder rung."""
+        self._run([
+            self.ffmpeg, "-nostdin", "-y", "-i", str(source),
+            "-vf", f"scale={rendition['width']}:{rendition['height']}",
+            "-c:v", "libx264", "-profile:v", "main", "-preset", "veryfast",
+            "-b:v", str(rendition["video_bitrate"]),
+            "-maxrate", str(rendition["video_bitrate"]),
+            "-bufsize", str(rendition["video_bitrate"] * 2),
+            # Keyframes on segment boundaries so every segment starts cleanly
+            "-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})",
+            "-c:a", "aac", "-b:a", str(rendition["audio_bitrate"]), "-ac", "2",
+            "-f", "hls", "-hls_time", str(self.segment_seconds), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", str(Path(out_dir) / "seg_%05d.ts"),
+            str(Path(out_dir) / "index.m3u8"),
+        ])
+
+
+def ladder():
+    return getattr(settings, "PACKAGING_LADDER", [])
+
+
+def packaging_root():
+    return Path(getattr(settings, "PACKAGING_ROOT", Path(settings.BASE_DIR) / "packages"))
+
+
+def options():
+    """Everything package_source() needs, so pool processes never read settings."""
+    return {
+        "root": str(packaging_root()),
+        "ladder": ladder(),
+        "encoder": getattr(settings, "PACKAGING_ENCODER", "movieApp.packaging.FFmpegEncoder"),
+        "encoder_options": getattr(settings, "PACKAGING_ENCODER_OPTIONS", {}),
+    }
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ladder_fingerprint(rungs, encoder):
+    data = json.dumps([encoder, rungs], sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def plan(rungs, width, height):
+    """Rungs no taller than the source (at least the smallest), with even widths."""
+    rungs = sorted(rungs, key=lambda rung: rung["height"], reverse=True)
+    fitting = [rung for rung in rungs if rung["height"] <= height] or rungs[-1:]
+    return [
+        dict(rung, width=max(2, round(width * rung["height"] / height / 2) * 2))
+        for rung in fitting
+    ]
+
+
+def read_playlist(path):
+    """(segment count, total seconds) of a media playlist."""
+    segments, duration = 0, 0.0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            match = EXTINF_RE.match(line)
+            if match:
+                duration += float(match.group(1))
+            elif line and not line.startswith("#"):
+                segments += 1
+    return segments, duration
+
+
+def master_playlist(renditions):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for r in renditions:
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={r['bandwidth']},RESOLUTION={r['width']}x{r['height']},NAME=\"{r['name']}\"")
+        lines.append(r["playlist"])
+    return "\n".join(lines) + "\n"
+
+
+def package_source(source, opts):
+    """
+    Build (or reuse) the package for a source file and return its manifest.
+    Runs in a pool process; touches only the filesystem.
+    """
+    source = Path(source)
+    root = Path(opts["root"])
+    digest = file_sha256(source)
+    package_id = f"{digest}-{ladder_fingerprint(opts['ladder'], opts['encoder'])}"
+    relative = Path(digest[:2]) / package_id
+    final = root / relative
+    manifest_path = final / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    encoder = import_string(opts["encoder"])(**opts["encoder_options"])
+    info = encoder.probe(source)
+    build = root / ".tmp" / uuid.uuid4().hex
+    build.mkdir(parents=True)
+    try:
+        renditions = []
+        for rung in plan(opts["ladder"], info["width"], info["height"]):
+            out_dir = build / rung["name"]
+            out_dir.mkdir()
+            encoder.encode(source, rung, out_dir)
+            segments, duration = read_playlist(out_dir / "index.m3u8")
+            if not segments:
+                raise PackagingError(f"The {rung['name']} rendition has no segments.")
+            renditions.append({
+                "name": rung["name"],
+                "width": rung["width"],
+                "height": rung["height"],
+                "bandwidth": rung["video_bitrate"] + rung["audio_bitrate"],
+                "playlist": f"{rung['name']}/index.m3u8",
+                "segments": segments,
+                "duration": round(duration, 3),
+            })
+        (build / "master.m3u8").write_text(master_playlist(renditions))
+        manifest = {
+            "source_sha256": digest,
+            "path": relative.as_posix(),
+            "master": (relative / "master.m3u8").as_posix(),
+            "duration": round(info["duration"], 3),
+            "source_width": info["width"],
+            "source_height": info["height"],
+            "renditions": renditions,
+        }
+        (build / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        final.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(build, final)
+        except OSError:
+            # Another process finished the same package first; keep theirs
+            if not manifest_path.exists():
+                raise
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+    return manifest
+
+
+# ----------------------------------------------------------------------------
+# Process pool
+# ----------------------------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+# (film id, field) -> package directory, or "" when there is no ready package
+_packages = LRUCache(maxsize=4096, ttl=60)
+
+
+def _new_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def packaging_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(getattr(settings, "PACKAGING_WORKERS", None) or os.cpu_count() or 1)
+    return _pool
+
+
+def stage_source(path, name):
+    """Move an assembled upload into PACKAGING_ROOT/incoming and return its new path."""
+    incoming = packaging_root() / "incoming"
+    incoming.mkdir(parents=True, exist_ok=True)
+    target = incoming / f"{name}{Path(path).suffix}"
+    shutil.move(str(path), target)
+    return target
+
+
+def package_path(film_id, field):
+    """Directory of the film's ready package for field, relative to PACKAGING_ROOT, or None."""
+    from .models import Film
+
+    path = _packages.get((film_id, field))
+    if path is None:
+        renditions = Film.objects.filter(pk=film_id).values_list("renditions", flat=True).first() or {}
+        manifest = renditions.get(field) or {}
+        path = manifest.get("path", "") if manifest.get("status") == "ready" else ""
+        _packages.set((film_id, field), path)
+    return path or None
+
+
+def record(film_id, field, manifest, public_id=None):
+    """
+    Store a manifest on Film.renditions[field]. Skipped (returns False) if the
+    film was deleted or its asset was replaced after the source was staged.
+    """
+    from django.db import transaction
+    from .models import Film
+
+    with transaction.atomic():
+        film = Film.objects.select_for_update().filter(pk=film_id).first()
+        if film is None:
+            return False
+        current = getattr(film, field)
+        if public_id is not None and (current is None or current.public_id != public_id):
+            return False
+        film.renditions = dict(film.renditions, **{
+            field: dict(manifest, status="ready", packaged_at=timezone.now().isoformat()),
+        })
+        film.save(update_fields=["renditions", "updated_at"])
+    _packages.delete((film_id, field))
+    return True
+
+
+def record_failure(film_id, field, error):
+    from django.db import transaction
+    from .models import Film
+
+    with transaction.atomic():
+        film = Film.objects.select_for_update().filter(pk=film_id).first()
+        if film is None:
+            return
+        film.renditions = dict(film.renditions, **{field: {"status": "failed", "error": str(error)[:500]}})
+        film.save(update_fields=["renditions", "updated_at"])
+    _packages.delete((film_id, field))
+
+
+def package(film_id, field, source, public_id=None, keep_source=False):
+    """Package one staged source in the pool and record the result."""
+    manifest = packaging_pool().submit(package_source, str(source), options()).result()
+    record(film_id, field, manifest, public_id)
+    if not keep_source:
+        Path(source).unlink(missing_ok=True)
+    return manifest
+
+
+def package_many(items, keep_source=True, workers=None):
+    """
+    Package (film_id, field, source) items concurrently, at most `workers`
+    at a time (default: the shared pool of PACKAGING_WORKERS). Yields
+    (item, manifest or exception) as each finishes.
+    """
+    opts = options()
+    pool = _new_pool(workers) if workers else packaging_pool()
+    try:
+        futures = {pool.submit(package_source, str(source), opts): (film_id, field, source)
+                   for film_id, field, source in items}
+        for future in as_completed(futures):
+            film_id, field, source = item = futures[future]
+            try:
+                manifest = future.result()
+            except Exception as exc:
+                record_failure(film_id, field, exc)
+                yield item, exc
+                continue
+            record(film_id, field, manifest)
+            if not keep_source:
+                Path(source).unlink(missing_ok=True)
+            yield item, manifest
+    finally:
+        if workers:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+    """
+    Keyset (cursor) pagination over a fixed, unique ordering.
+
+    The cursor stores the ordering values of the last row on the page, so the
+    next page is a single indexed range query instead of an OFFSET scan.
+    The last ordering field must be unique (the primary key) to break ties.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.next_cursor = None
+        self.request = None
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def page_queryset(self, queryset, request):
+        """The ordered, seeked queryset for this page; it includes one extra row."""
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            values = self.decode_cursor(encoded, queryset.model)
+            queryset = queryset.filter(self.build_seek_filter(values))
+
+        # Fetch one extra row to learn whether a next page exists
+        return queryset[:page_size + 1], page_size
+
+    def finish_page(self, page, page_size):
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def paginate_queryset(self, queryset, request):
+        queryset, page_size = self.page_queryset(queryset, request)
+        return self.finish_page(list(queryset), page_size)
+
+    async def apaginate_queryset(self, queryset, request):
+        queryset, page_size = self.page_queryset(queryset, request)
+        page = [obj async for obj in queryset.aiterator(chunk_size=page_size + 1)]
+        return self.finish_page(page, page_size)
+
+    def build_seek_filter(self, values):
+        """
+        Expand (f1, f2, ..., fn) > (v1, v2, ..., vn) into
+        f1 > v1 OR (f1 = v1 AND f2 > v2) OR ... honouring each field's direction.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            model_field = instance._meta.get_field(name)
+            values.append(model_field.value_to_string(instance))
+        raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def decode_cursor(self, encoded, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        decoded = []
+        for field, value in zip(self.ordering, values):
+            # encode_cursor only writes strings; anything else was tampered with
+            if not isinstance(value, str):
+                raise NotFound(self.invalid_cursor_message)
+            model_field = model._meta.get_field(field.lstrip("-"))
+            try:
+                value = model_field.to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            decoded.append(value)
+        return decoded
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+
+class FilmCursorPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,163 @@
+"""
+Short-lived signed playback URLs for a film's trailer and full film.
+
+A playback URL points at PlaybackView (the stand-in media server) and
+carries the user, an expiry, a key id and an HMAC-SHA256 signature over all
+of them. Expiries are rounded up to PLAYBACK_URL_BUCKET seconds, so every
+request for the same (film, asset, user) within a bucket gets the same URL
+from a bounded LRU instead of signing again.
+
+Signing keys rotate on their own: the key for an expiry is derived from a
+master key and the PLAYBACK_KEY_ROTATION period the expiry falls in, so a
+leaked derived key is only good for one period. Master keys are listed in
+PLAYBACK_SIGNING_KEYS, newest first; only the first signs, and the rest
+keep verifying URLs issued before a master key was replaced.
+
+HLS packages are signed the same way, but the user, expiry, key id and
+signature go into a path prefix (package_url()), so the relative playlist
+and segment URLs inside the master playlist inherit them. Players fetch
+segments from one master playlist URL for the whole film, so these live
+for PLAYBACK_HLS_URL_TTL instead. The signed message starts with the URL
+kind ("play:" or "hls:"), so a signature issued for one kind never
+verifies for the other.
+
+Assets on Cloudinary are uploaded as "authenticated", so they can only be
+fetched through signed delivery URLs; media_host_url() adds a token that
+expires with the playback URL when PLAYBACK_CLOUDINARY_TOKEN_KEY is set.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from collections import namedtuple
+from urllib.parse import urlencode
+
+import cloudinary.utils
+from django.conf import settings
+from django.urls import reverse
+
+from core.lru import LRUCache
+
+ASSETS = ("trailer", "full_film")
+
+SignedURL = namedtuple("SignedURL", ["url", "expires"])
+# Path segment standing in for an empty user id in package URLs
+ANONYMOUS = "-"
+
+_urls = LRUCache(maxsize=getattr(settings, "PLAYBACK_URL_CACHE_SIZE", 50000))
+_keys = LRUCache(maxsize=64)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def master_keys():
+    """{key id: secret}; the first entry signs."""
+    keys = _setting("PLAYBACK_SIGNING_KEYS", None)
+    return keys or {"default": settings.SECRET_KEY}
+
+
+def _derived_key(kid, period):
+    secret = master_keys()[kid]
+    key = _keys.get((kid, secret, period))
+    if key is None:
+        key = hmac.new(secret.encode("utf-8"), b"playback:%d" % period, hashlib.sha256).digest()
+        _keys.set((kid, secret, period), key)
+    return key
+
+
+def signature(kind, kid, film_id, asset, user_id, expires):
+    """kind ("play" or "hls") prefixes the message, binding the signature to one URL type."""
+    period = expires // _setting("PLAYBACK_KEY_ROTATION", 24 * 60 * 60)
+    message = f"{kind}:{film_id}\n{asset}\n{user_id}\n{expires}".encode("utf-8")
+    digest = hmac.new(_derived_key(kid, period), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def _url_ttl():
+    return _setting("PLAYBACK_URL_TTL", 15 * 60)
+
+
+def _hls_url_ttl():
+    return _setting("PLAYBACK_HLS_URL_TTL", 4 * 60 * 60)
+
+
+def _expiry(now, ttl):
+    bucket = _setting("PLAYBACK_URL_BUCKET", 5 * 60)
+    return -(-(int(now) + ttl) // bucket) * bucket
+
+
+def _signed_url(kind, film_id, asset, user_id, ttl, build):
+    if asset not in ASSETS:
+        raise ValueError(f"Unknown asset '{asset}'.")
+    expires = _expiry(time.time(), ttl)
+    kid = next(iter(master_keys()))
+    key = (kind, kid, film_id, asset, user_id, expires)
+    url = _urls.get(key)
+    if url is None:
+        url = build(kid, expires, signature(kind, kid, film_id, asset, user_id, expires))
+        # Never outlive the URL itself
+        _urls.set(key, url, ttl=max(1, expires - time.time()))
+    return SignedURL(url, expires)
+
+
+def playback_url(film_id, asset, user_id=""):
+    """
+    SignedURL for the asset; valid for PLAYBACK_URL_TTL seconds plus up to one
+    bucket. Callers check access first (movieApp.entitlements).
+    """
+    def build(kid, expires, sig):
+        query = urlencode({"u": user_id, "exp": expires, "kid": kid, "sig": sig})
+        return f"{reverse('film-play', args=[film_id, asset])}?{query}"
+    return _signed_url("play", film_id, asset, user_id, _url_ttl(), build)
+
+
+def package_url(film_id, asset, user_id=""):
+    """
+    SignedURL of the master playlist of the asset's HLS package; valid for
+    PLAYBACK_HLS_URL_TTL seconds plus up to one bucket. Callers check access
+    first.
+    """
+    def build(kid, expires, sig):
+        return reverse("film-hls", kwargs={
+            "pk": film_id, "asset": asset, "exp": expires, "kid": kid,
+            "user": user_id or ANONYMOUS, "sig": sig, "path": "master.m3u8",
+        })
+    return _signed_url("hls", film_id, asset, user_id, _hls_url_ttl(), build)
+
+
+def verify(film_id, asset, params, hls=False):
+    """
+    True if params (the playback URL's query, or the package URL's path
+    prefix with hls=True) carry a valid, unexpired signature for this film
+    and asset. The comparison is constant time.
+    """
+    try:
+        expires = int(params.get("exp", ""))
+    except ValueError:
+        return False
+    kid = params.get("kid", "")
+    sig = params.get("sig", "")
+    now = time.time()
+    ttl = (_hls_url_ttl() if hls else _url_ttl()) + _setting("PLAYBACK_URL_BUCKET", 5 * 60)
+    if asset not in ASSETS or kid not in master_keys() or not now < expires <= now + ttl:
+        return False
+    expected = signature("hls" if hls else "play", kid, film_id, asset, params.get("u", ""), expires)
+    return hmac.compare_digest(expected.encode("ascii"), sig.encode("ascii", "replace"))
+
+
+def media_host_url(resource, expires):
+    """Signed Cloudinary delivery URL for a stored resource, valid until expires."""
+    options = {
+        "resource_type": resource.resource_type,
+        "type": resource.type,
+        "version": resource.version,
+        "format": resource.format,
+        "sign_url": True,
+    }
+    token_key = _setting("PLAYBACK_CLOUDINARY_TOKEN_KEY", "")
+    if token_key:
+        options["auth_token"] = {"key": token_key, "expiration": expires}
+    url, _ = cloudinary.utils.cloudinary_url(resource.public_id, **options)
+    return url
@@ -0,0 +1,182 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.utils import timezone
+
+from accounts.models import User
+from core.lru import LRUCache
+from .models import Film, WatchProgress
+
+logger = logging.getLogger(__name__)
+
+UPDATE_FIELDS = ["position_s", "duration_s", "completed", "last_watched_at"]
+
+# film id -> duration_s for films known to exist; heartbeats for unknown ids
+# are rejected before they reach the buffer
+_films = LRUCache(maxsize=10000, ttl=10 * 60)
+_NO_FILM = -1
+
+
+def film_duration(film_id):
+    """Duration in seconds of an existing film, or None if there is no such film."""
+    duration = _films.get(film_id)
+    if duration is None:
+        duration = Film.objects.filter(pk=film_id).values_list("duration_s", flat=True).first()
+        if duration is None:
+            # Short-lived so a film created right after a miss is found soon
+            _films.set(film_id, _NO_FILM, ttl=30)
+            return None
+        _films.set(film_id, duration)
+    return None if duration == _NO_FILM else duration
+
+
+class ProgressBuffer:
+    """
+    Write-behind store for player heartbeats.
+
+    Heartbeats only replace the pending entry for their (user, film) pair, so
+    a player reporting every few seconds costs one row write per flush
+    interval instead of one UPDATE per heartbeat. Every flush_interval
+    seconds, or once flush_threshold pairs are pending, the entries are
+    upserted with bulk_create(update_conflicts=True). Unlike the view
+    counter nothing is journaled: a crash loses at most one interval of
+    positions, which the next heartbeat replaces anyway.
+    """
+
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, "WATCH_PROGRESS_FLUSH_INTERVAL", 10.0)
+
+    @property
+    def flush_threshold(self):
+        return self._flush_threshold or getattr(settings, "WATCH_PROGRESS_FLUSH_THRESHOLD", 500)
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="watch-progress", daemon=True)
+            self.thread.start()
+
+    def record(self, user_id, film_id, position_s, duration_s, completed=False):
+        ratio = getattr(settings, "WATCH_PROGRESS_COMPLETE_RATIO", 0.95)
+        completed = completed or (duration_s > 0 and position_s >= duration_s * ratio)
+        entry = WatchProgress(
+            user_id=user_id, film_id=film_id,
+            position_s=min(position_s, duration_s) if duration_s else position_s,
+            duration_s=duration_s, completed=completed, last_watched_at=timezone.now(),
+        )
+        with self.lock:
+            self.pending[(user_id, film_id)] = entry
+            self._ensure_thread()
+            if len(self.pending) >= self.flush_threshold:
+                self.wakeup.set()
+        return entry
+
+    def pending_for(self, user_id, film_id=None):
+        """Entries recorded in this process that are not yet in the database."""
+        with self.lock:
+            if film_id is not None:
+                entry = self.pending.get((user_id, film_id))
+                return [entry] if entry else []
+            return [entry for (uid, _), entry in self.pending.items() if uid == user_id]
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Watch progress flush failed; entries kept for retry")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                entries, self.pending = list(self.pending.values()), {}
+            if not entries:
+                return 0
+            try:
+                self.write(entries)
+            except Exception:
+                # Put them back unless a newer heartbeat arrived meanwhile
+                with self.lock:
+                    for entry in entries:
+                        self.pending.setdefault((entry.user_id, entry.film_id), entry)
+                raise
+            return len(entries)
+
+    @staticmethod
+    def write(entries):
+        try:
+            WatchProgress.objects.bulk_create(
+                entries, batch_size=500, update_conflicts=True,
+                unique_fields=["user", "film"], update_fields=UPDATE_FIELDS,
+            )
+        except IntegrityError:
+            # A user or film was deleted since its heartbeat; drop those rows
+            users = set(User.objects.filter(pk__in={e.user_id for e in entries}).values_list("pk", flat=True))
+            films = set(Film.objects.filter(pk__in={e.film_id for e in entries}).values_list("pk", flat=True))
+            entries = [e for e in entries if e.user_id in users and e.film_id in films]
+            for entry in entries:
+                entry.pk = None
+            WatchProgress.objects.bulk_create(
+                entries, batch_size=500, update_conflicts=True,
+                unique_fields=["user", "film"], update_fields=UPDATE_FIELDS,
+            )
+
+    def close(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final watch progress flush failed")
+
+
+progress_buffer = ProgressBuffer()
+atexit.register(progress_buffer.close)
+
+
+def continue_watching(user, limit=20):
+    """
+    The user's unfinished films, most recently watched first: one query on
+    watch_progress_resume_idx with the film joined in. Heartbeats still
+    buffered in this process are overlaid on the rows they update; films
+    with no row yet cost one more query.
+    """
+    rows = list(
+        WatchProgress.objects.filter(user=user, completed=False, position_s__gt=0)
+        .select_related("film")
+        .only(*UPDATE_FIELDS, "user_id", "film__id", "film__title", "film__thumbnail", "film__type", "film__duration_s")
+        .order_by("-last_watched_at")[:limit]
+    )
+    pending = {entry.film_id: entry for entry in progress_buffer.pending_for(user.pk)}
+    if not pending:
+        return rows
+    for row in rows:
+        entry = pending.pop(row.film_id, None)
+        if entry is not None:
+            for field in UPDATE_FIELDS:
+                setattr(row, field, getattr(entry, field))
+    # Films first played since the last flush have no row yet
+    new = [entry for entry in pending.values() if not entry.completed and entry.position_s > 0]
+    if new:
+        films = Film.objects.only("id", "title", "thumbnail", "type", "duration_s").in_bulk([e.film_id for e in new])
+        for entry in new:
+            if entry.film_id in films:
+                entry.film = films[entry.film_id]
+                rows.append(entry)
+    rows = [row for row in rows if not row.completed]
+    rows.sort(key=lambda row: row.last_watched_at, reverse=True)
+    return rows[:limit]
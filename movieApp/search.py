@@ -0,0 +1,199 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Film
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _documents(film_ids):
+    """Yield (film_id, title, logline, genres, filmmaker) for the given films."""
+    films = (
+        Film.objects.filter(pk__in=list(film_ids))
+        .select_related("filmmaker")
+        .prefetch_related("genre")
+        .only("id", "title", "logline", "filmmaker__id", "filmmaker__full_name")
+    )
+    for film in films:
+        genres = " ".join(g.name for g in film.genre.all())
+        yield film.pk, film.title, film.logline, genres, film.filmmaker.full_name
+
+
+class BaseSearchBackend:
+    """
+    Interface for film search backends. Backends keep their own index in sync
+    through update()/remove(), which the Film signals call incrementally.
+    """
+
+    def update(self, film_ids):
+        raise NotImplementedError
+
+    def add_documents(self, documents):
+        """
+        Index films that are not in the index yet, from already loaded
+        (film_id, title, logline, genres, filmmaker) tuples.
+        """
+        self.update([doc[0] for doc in documents])
+
+    def remove(self, film_ids):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=20, prefix=False, status=None):
+        """
+        Return film ids ordered from best to worst match, only films with the
+        given status when one is passed.
+        """
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Fallback that filters the Film table directly. It needs no index, so it
+    works on any database, but every query is a LIKE scan.
+    """
+
+    def update(self, film_ids):
+        pass
+
+    def add_documents(self, documents):
+        pass
+
+    def remove(self, film_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit=20, prefix=False, status=None):
+        terms = _TOKEN_RE.findall(query)
+        if not terms:
+            return []
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term)
+                | Q(logline__icontains=term)
+                | Q(genre__name__iexact=term)
+                | Q(filmmaker__full_name__icontains=term)
+            )
+        films = Film.objects.filter(condition)
+        if status is not None:
+            films = films.filter(status=status)
+        film_ids = films.values_list("id", flat=True).distinct()
+        return list(film_ids[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Inverted index in an SQLite FTS5 virtual table (created by migration
+    0003_film_search_index), ranked with BM25.
+
+    FTS5 rows are addressed by an integer rowid, so each film id is hashed to
+    a stable 64-bit rowid; updates and deletes then hit the rowid b-tree
+    instead of scanning the UNINDEXED film_id column.
+    """
+    table = "movieapp_film_search"
+    # BM25 column weights: film_id, title, logline, genres, filmmaker
+    weights = (0.0, 10.0, 2.0, 4.0, 3.0)
+    batch_size = 500
+
+    @staticmethod
+    def rowid(film_id):
+        digest = hashlib.blake2b(film_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def update(self, film_ids):
+        film_ids = list(film_ids)
+        if not film_ids:
+            return
+        documents = list(_documents(film_ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Films that no longer exist simply drop out of the index
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(self.rowid(film_id),) for film_id in film_ids],
+            )
+            self._insert(cursor, documents)
+
+    def add_documents(self, documents):
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._insert(cursor, documents)
+
+    def _insert(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, film_id, title, logline, genres, filmmaker) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            [(self.rowid(doc[0]), *doc) for doc in documents],
+        )
+
+    def remove(self, film_ids):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s",
+                [(self.rowid(film_id),) for film_id in film_ids],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        film_ids = Film.objects.order_by().values_list("id", flat=True)
+        batch = []
+        for film_id in film_ids.iterator(chunk_size=self.batch_size):
+            batch.append(film_id)
+            if len(batch) >= self.batch_size:
+                self.update(batch)
+                batch = []
+        self.update(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+    def build_match(self, query, prefix=False):
+        """
+        Turn free text into an FTS5 MATCH expression. Every token is quoted so
+        user input can never inject FTS5 operators.
+        """
+        terms = _TOKEN_RE.findall(query)
+        if not terms:
+            return None
+        parts = [f'"{term}"' for term in terms]
+        if prefix:
+            parts[-1] += "*"
+        return " ".join(parts)
+
+    def search(self, query, limit=20, prefix=False, status=None):
+        match = self.build_match(query, prefix=prefix)
+        if match is None:
+            return []
+        weights = ", ".join(str(w) for w in self.weights)
+        params = [match]
+        join = ""
+        if status is not None:
+            # Filter before LIMIT so hidden films do not use up the page
+            join = f"JOIN {Film._meta.db_table} film ON film.id = {self.table}.film_id AND film.status = %s "
+            params.insert(0, status)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {self.table}.film_id FROM {self.table} {join}WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, {weights}) LIMIT %s",
+                [*params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = getattr(settings, "FILM_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
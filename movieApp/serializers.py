@@ -1,13 +1,26 @@
 from rest_framework import serializers
-from .models import Film, Genre
+from .models import Film, Genre, UploadSession, WatchProgress
+from .counters import view_counter
 
-class FilmSerializer(serializers.ModelSerializer):
+
+class PendingViewsMixin:
+    """Add views this process has counted but not yet flushed to the database."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if "views" in data:
+            data["views"] += view_counter.pending_for(instance.pk)
+        return data
+
+
+class FilmSerializer(PendingViewsMixin, serializers.ModelSerializer):
     genre = serializers.ListField(child=serializers.CharField(), write_only=True)
     genres_display = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Film
-        fields = '__all__'
+        # Package paths are only handed out through signed playback URLs
+        exclude = ('renditions',)
         read_only_fields = ('filmmaker',)
 
     def get_genres_display(self, obj):
@@ -24,3 +37,74 @@ class FilmSerializer(serializers.ModelSerializer):
             genre_objs.append(genre_obj)
         film.genre.set(genre_objs)
         return film
+
+
+class FilmListSerializer(PendingViewsMixin, serializers.ModelSerializer):
+    """
+    Slim projection for catalog pages. Expects a queryset built with
+    Film.objects.catalog() so genres and filmmaker come from the prefetch cache.
+    """
+    genres_display = serializers.SerializerMethodField(read_only=True)
+    filmmaker_name = serializers.CharField(source="filmmaker.full_name", read_only=True)
+
+    class Meta:
+        model = Film
+        fields = (
+            "id", "title", "year", "logline", "type", "genres_display",
+            "thumbnail", "status", "duration_s", "currency", "rent_price",
+            "buy_price", "views", "created_at", "published_at",
+            "filmmaker", "filmmaker_name",
+        )
+        read_only_fields = fields
+
+    def get_genres_display(self, obj):
+        return [g.name for g in obj.genre.all()]
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            "id", "film", "field", "filename", "total_size", "chunk_size",
+            "total_chunks", "received_chunks", "status", "error",
+            "created_at", "updated_at",
+        )
+        read_only_fields = ("chunk_size", "status", "error")
+
+    def get_received_chunks(self, obj):
+        return sorted(obj.chunks.values_list("index", flat=True))
+
+    def validate_film(self, film):
+        if film.filmmaker_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("You can only upload media for your own films.")
+        return film
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Total size must be positive.")
+        return value
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    position_s = serializers.IntegerField(min_value=0)
+    duration_s = serializers.IntegerField(min_value=0, required=False)
+    completed = serializers.BooleanField(required=False, default=False)
+
+
+class WatchProgressSerializer(serializers.ModelSerializer):
+    """Progress with a small summary of the film, for "continue watching"."""
+    film_title = serializers.CharField(source="film.title", read_only=True)
+    film_type = serializers.CharField(source="film.type", read_only=True)
+    thumbnail = serializers.CharField(source="film.thumbnail", read_only=True)
+    percent = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WatchProgress
+        fields = (
+            "film", "film_title", "film_type", "thumbnail",
+            "position_s", "duration_s", "percent", "completed", "last_watched_at",
+        )
+        read_only_fields = fields
@@ -0,0 +1,55 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Film
+from .search import get_search_backend
+from .cache import invalidate_film
+
+
+@receiver(post_save, sender=Film)
+def film_saved(sender, instance, **kwargs):
+    get_search_backend().update([instance.pk])
+    invalidate_film(instance.pk)
+
+
+@receiver(post_delete, sender=Film)
+def film_deleted(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+    invalidate_film(instance.pk)
+
+
+@receiver(m2m_changed, sender=Film.genre.through)
+def film_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # instance is a Genre; remember its films before the relation is emptied
+        instance._cleared_film_ids = list(instance.film_set.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        film_ids = [instance.pk]
+    elif action == "post_clear":
+        film_ids = getattr(instance, "_cleared_film_ids", [])
+    else:
+        film_ids = list(pk_set)
+    if not film_ids:
+        return
+
+    get_search_backend().update(film_ids)
+    # Genre edits do not save the Film row; bump updated_at for Last-Modified
+    Film.objects.filter(pk__in=film_ids).update(updated_at=timezone.now())
+    invalidate_film(*film_ids)
+
+
+@receiver(post_save, sender=User)
+def index_filmmaker_name(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and "full_name" not in update_fields:
+        return
+    film_ids = list(instance.films.values_list("id", flat=True))
+    if film_ids:
+        get_search_backend().update(film_ids)
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from jobs.queue import job
+
+from . import packaging, transfer
+
+
+def _transfer_gave_up(error, session_id):
+    transfer.mark_failed(session_id, error)
+
+
+@job("movieApp.transfer_upload", max_attempts=5, concurrency=2, timeout=6 * 3600,
+     backoff=30, on_give_up=_transfer_gave_up)
+def transfer_upload(session_id):
+    transfer.transfer_session(session_id)
+
+
+@job("movieApp.sweep_expired_rentals", max_attempts=3, timeout=600)
+def sweep_expired_rentals():
+    """Mark ended rentals as expired in batches."""
+    from .entitlements import expire_rentals
+    expire_rentals()
+
+
+def _packaging_gave_up(error, film_id, field, source, public_id=None):
+    packaging.record_failure(film_id, field, error)
+    # The staged copy is only kept for retries
+    Path(source).unlink(missing_ok=True)
+
+
+@job("movieApp.package_film", max_attempts=3, concurrency=2, timeout=6 * 3600,
+     backoff=60, on_give_up=_packaging_gave_up)
+def package_film(film_id, field, source, public_id=None):
+    packaging.package(film_id, field, source, public_id)
@@ -1,3 +1,654 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.tokens import UserRefreshToken
+from core.checks import check_shared_cache
+from jobs.queue import registry as jobs_registry
+from . import entitlements, packaging, playback, progress, uploads
+from .counters import ViewCounter, _lock
+from .filters import FILM_ORDERINGS
+from .ingest import FilmImporter, parse_csv, parse_ndjson
+from .models import Film, FilmStatus, Genre, Purchase, UploadSession, ViewCountBatch, WatchProgress
+from .search import DatabaseSearchBackend, SQLiteFTSBackend, get_search_backend
+from .serializers import FilmSerializer
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_local_cache_is_rejected(self):
+        self.assertEqual([e.id for e in check_shared_cache(None)], ["core.E001"])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                                           "LOCATION": "cache"}})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        now = timezone.now()
+        for i in range(7):
+            # Repeated views, prices and dates so ties have to be broken by id
+            Film.objects.create(
+                filmmaker=maker, title=f"Film {i}", type="movie", thumbnail="image/upload/v1/x.jpg",
+                status=FilmStatus.PUBLISHED, views=i % 3, rent_price=Decimal(i % 2),
+                published_at=now - timedelta(days=i % 4) if i != 6 else None,
+            )
+
+    def walk(self, ordering):
+        titles = []
+        url = f"/flims/films-list/?ordering={ordering}&page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles += [film["title"] for film in response.json()["results"]]
+            url = response.json()["next"]
+        return titles
+
+    def test_every_ordering_walks_each_film_once(self):
+        for ordering, keyset in FILM_ORDERINGS.items():
+            with self.subTest(ordering=ordering):
+                films = Film.objects.order_by(*keyset)
+                if ordering.lstrip("-") == "published_at":
+                    films = films.filter(published_at__isnull=False)
+                self.assertEqual(self.walk(ordering), [film.title for film in films])
+
+    def test_tampered_cursors_are_rejected(self):
+        cursors = [[None, None], [5, "x"], [[1], "a"], ["not a date", "x"], ["2026-01-01T00:00:00Z"], {"a": 1}]
+        for ordering in ("-created_at", "-published_at", "views", "rent_price"):
+            for values in cursors:
+                cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+                with self.subTest(ordering=ordering, values=values):
+                    response = self.client.get(f"/flims/films-list/?ordering={ordering}&cursor={cursor}")
+                    self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/flims/films-list/?cursor=%%%").status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        self.staff = User.objects.create_user(email="staff@example.com", password="x", full_name="Staff",
+                                              terms_agreed=True, is_staff=True)
+        self.published = self.film("Harbour Lights", "A ferry at night", FilmStatus.PUBLISHED)
+        self.logline_only = self.film("Night Shift", "Dockers working the harbour", FilmStatus.PUBLISHED)
+        self.hidden = {
+            self.film(f"Harbour {film_status}", "Not out yet", film_status).pk
+            for film_status in (FilmStatus.REVIEW, FilmStatus.REJECTED)
+        }
+
+    def film(self, title, logline, film_status):
+        return Film.objects.create(filmmaker=self.maker, title=title, logline=logline, type="movie",
+                                   thumbnail="image/upload/v1/x.jpg", status=film_status)
+
+    def search(self, user=None, q="harbour"):
+        headers = {}
+        if user is not None:
+            headers["authorization"] = f"Bearer {UserRefreshToken.for_user(user).access_token}"
+        response = self.client.get("/flims/search/", {"q": q}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return [film["id"] for film in response.json()["results"]]
+
+    def test_only_staff_find_unpublished_films(self):
+        self.assertEqual(set(self.search()), {self.published.pk, self.logline_only.pk})
+        self.assertEqual(set(self.search(self.maker)), {self.published.pk, self.logline_only.pk})
+        self.assertEqual(set(self.search(self.staff)), {self.published.pk, self.logline_only.pk} | self.hidden)
+
+    def test_backends_filter_by_status_before_the_limit(self):
+        for backend in (SQLiteFTSBackend(), DatabaseSearchBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                found = backend.search("harbour", limit=2, status=FilmStatus.PUBLISHED)
+                self.assertEqual(set(found), {self.published.pk, self.logline_only.pk})
+                self.assertEqual(len(backend.search("harbour", limit=10)), 2 + len(self.hidden))
+
+    def test_fts_ranks_titles_first_and_quotes_operators(self):
+        backend = SQLiteFTSBackend()
+        self.assertEqual(backend.search("harbour", status=FilmStatus.PUBLISHED),
+                         [self.published.pk, self.logline_only.pk])
+        self.assertEqual(backend.search("harb", prefix=True, status=FilmStatus.PUBLISHED)[0], self.published.pk)
+        self.assertEqual(backend.search('harbour" OR NEAR(lights'), [])
+        self.assertEqual(self.search(q="dockers"), [self.logline_only.pk])
+
+
+class ViewCounterRecoveryTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool = Path(tmp.name)
+        self.counter = ViewCounter(spool_dir=self.spool)
+        maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        self.film = Film.objects.create(filmmaker=maker, title="Counted", type="movie",
+                                        thumbnail="image/upload/v1/x.jpg", status=FilmStatus.PUBLISHED)
+
+    def spool_file(self, name, n):
+        (self.spool / name).write_text(f"{self.film.pk}\t{n}\n")
+
+    def views(self):
+        return Film.objects.values_list("views", flat=True).get(pk=self.film.pk)
+
+    def test_files_of_a_dead_process_are_applied_once(self):
+        self.spool_file("views-999999.journal", 2)
+        self.spool_file("views-999999-abc.batch", 4)
+        self.counter.recover()
+        self.assertEqual(self.views(), 6)
+        self.assertEqual(list(self.spool.iterdir()), [])
+        # Files are gone, so their batch ids are too
+        self.assertFalse(ViewCountBatch.objects.exists())
+        self.counter.recover()
+        self.assertEqual(self.views(), 6)
+
+    def test_batch_applied_before_a_crash_is_not_counted_again(self):
+        # The UPDATE committed but the process died before deleting the file,
+        # and the file only turns up much later (restored volume)
+        ViewCountBatch.objects.create(id="abc")
+        ViewCountBatch.objects.update(applied_at=timezone.now() - timedelta(days=30))
+        self.spool_file("views-999999-abc.batch", 4)
+        self.counter.recover()
+        self.assertEqual(self.views(), 0)
+        self.assertFalse((self.spool / "views-999999-abc.batch").exists())
+        self.assertFalse(ViewCountBatch.objects.exists())
+
+    def test_live_owner_keeps_its_files(self):
+        self.spool_file("views-424242.journal", 3)
+        owner = _lock(self.counter.lock_path(424242))
+        try:
+            self.counter.recover()
+            self.assertEqual(self.views(), 0)
+            self.assertTrue((self.spool / "views-424242.journal").exists())
+        finally:
+            os.close(owner)
+        self.counter.recover()
+        self.assertEqual(self.views(), 3)
+
+    def test_flushed_batches_leave_no_ids_behind(self):
+        with mock.patch.object(ViewCounter, "_ensure_thread"):
+            self.counter.increment(self.film.pk, 2)
+            self.counter.flush()
+        self.assertEqual(self.views(), 2)
+        self.assertFalse(ViewCountBatch.objects.exists())
+        # This process still owns its journal
+        self.assertIsNone(_lock(self.counter.lock_path(), blocking=False))
+        os.close(self.counter.lock_fd)
+        self.counter.journal.close()
+
+    def test_reused_pid_does_not_hide_an_orphan(self):
+        # pid 1 is alive, but it holds no view counter lock
+        self.spool_file("views-1.journal", 5)
+        self.counter.recover()
+        self.assertEqual(self.views(), 5)
+
+
+class ChunkedUploadTests(TestCase):
+    data = b"0123456789"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(UPLOAD_STAGING_ROOT=Path(tmp.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        film = Film.objects.create(filmmaker=self.user, title="Upload", type="movie", thumbnail="image/upload/v1/x.jpg")
+        # Chunks of 4, 4 and 2 bytes
+        self.session = UploadSession.objects.create(film=film, uploader=self.user, field="trailer",
+                                                    filename="t.mp4", total_size=10, chunk_size=4)
+        self.token = str(UserRefreshToken.for_user(self.user).access_token)
+
+    def put(self, index, body, checksum=None):
+        return self.client.put(
+            f"/flims/uploads/{self.session.pk}/chunks/{index}/", body, content_type="application/octet-stream",
+            headers={"authorization": f"Bearer {self.token}",
+                     "x-chunk-sha256": checksum or hashlib.sha256(body).hexdigest()},
+        )
+
+    def chunk(self, index):
+        return self.data[index * 4:index * 4 + 4]
+
+    def staged(self):
+        return sorted(path.name for path in uploads.session_dir(self.session).iterdir())
+
+    def test_out_of_order_chunks_assemble_in_order(self):
+        for index in (2, 0, 1):
+            self.assertEqual(self.put(index, self.chunk(index)).status_code, 201)
+        self.assertEqual(uploads.assemble(self.session).read_bytes(), self.data)
+
+    def test_resending_a_chunk(self):
+        self.assertEqual(self.put(0, self.chunk(0)).status_code, 201)
+        self.assertEqual(self.put(0, self.chunk(0)).status_code, 200)
+        # A resend with different bytes replaces the stored chunk
+        self.assertEqual(self.put(0, b"abcd").status_code, 201)
+        self.assertEqual(uploads.chunk_path(self.session, 0).read_bytes(), b"abcd")
+        self.assertEqual(self.session.chunks.get(index=0).sha256, hashlib.sha256(b"abcd").hexdigest())
+
+    def test_size_and_checksum_mismatches_are_rejected(self):
+        self.assertEqual(self.put(0, b"01234").status_code, 400)
+        self.assertEqual(self.put(0, b"012").status_code, 400)
+        self.assertEqual(self.put(0, self.chunk(0), checksum="0" * 64).status_code, 400)
+        self.assertEqual(self.staged(), [])
+        self.assertFalse(self.session.chunks.exists())
+
+    def test_concurrent_writes_of_one_index_do_not_mix(self):
+        class InterleavedStream(io.BytesIO):
+            """Runs another write of the same chunk after the first block."""
+            def __init__(self, data, between):
+                super().__init__(data)
+                self.between = between
+
+            def read(self, size=-1):
+                block = super().read(size)
+                if self.between is not None and self.tell() == len(block):
+                    between, self.between = self.between, None
+                    between()
+                return block
+
+        def resend():
+            uploads.write_chunk(self.session, 0, io.BytesIO(b"abcd"), 4, hashlib.sha256(b"abcd").hexdigest())
+
+        with mock.patch.object(uploads, "STREAM_BLOCK_SIZE", 2):
+            uploads.write_chunk(self.session, 0, InterleavedStream(self.chunk(0), resend), 4,
+                                hashlib.sha256(self.chunk(0)).hexdigest())
+        self.assertEqual(uploads.chunk_path(self.session, 0).read_bytes(), self.chunk(0))
+        self.assertEqual(self.staged(), ["000000.part"])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="ann@example.com", password="x", full_name="Ann", terms_agreed=True)
+        for i in range(5):
+            Film.objects.create(
+                filmmaker=self.user, title=f"Film {i}", type="movie", thumbnail="image/upload/v1/x.jpg",
+                status=FilmStatus.PUBLISHED if i % 2 else FilmStatus.REVIEW,
+            )
+        self.token = str(UserRefreshToken.for_user(self.user).access_token)
+
+    async def test_asgi_export_streams_an_async_iterator(self):
+        response = await self.async_client.get("/flims/export/", headers={"authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(sorted(json.loads(line)["title"] for line in body.splitlines()), ["Film 1", "Film 3"])
+
+    def test_wsgi_export_stays_sync(self):
+        response = self.client.get("/flims/export/", headers={"authorization": f"Bearer {self.token}"})
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 2)
+
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        self.maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        self.viewer = User.objects.create_user(email="viewer@example.com", password="x", full_name="Viewer", terms_agreed=True)
+        self.film = Film.objects.create(
+            filmmaker=self.maker, title="Paid", type="movie", thumbnail="image/upload/v1/x.jpg",
+            status=FilmStatus.PUBLISHED, rent_price=Decimal("3.50"), buy_price=Decimal("10"),
+        )
+
+    def test_denial_is_served_from_the_cache_until_a_sale(self):
+        self.assertIsNone(entitlements.access_for(self.viewer, self.film))
+        # A repeated denial does not reload from the database
+        with self.assertNumQueries(0):
+            self.assertFalse(entitlements.has_access(self.viewer, self.film))
+        with self.captureOnCommitCallbacks(execute=True):
+            entitlements.buy(self.viewer, self.film)
+        self.assertEqual(entitlements.access_for(self.viewer, self.film).kind, "purchase")
+        with self.assertNumQueries(0):
+            self.assertTrue(entitlements.has_access(self.viewer, self.film))
+
+    def test_renting_twice_charges_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, created = entitlements.rent(self.viewer, self.film)
+        self.assertTrue(created)
+        with self.captureOnCommitCallbacks(execute=True):
+            second, created = entitlements.rent(self.viewer, self.film)
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        self.film.refresh_from_db()
+        self.assertEqual(self.film.total_earning, Decimal("3.50"))
+
+
+class FilmImportTests(TestCase):
+    def setUp(self):
+        self.maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        Genre.objects.create(name="Drama")
+
+    def row(self, title, **extra):
+        return {"title": title, "type": "movie", "thumbnail": "image/upload/v1/x.jpg", **extra}
+
+    def ndjson(self, *rows):
+        return [json.dumps(row) for row in rows]
+
+    def test_valid_rows_are_saved_and_bad_rows_reported(self):
+        lines = self.ndjson(self.row("Quay", genre="Drama|Noir"), {"title": "No type"}) + ["{not json", "[1]"]
+        lines.append(json.dumps(self.row("Tide", genres=["Noir", "Drama", "Noir"], status="bogus")))
+        report = FilmImporter(filmmaker=self.maker).run(parse_ndjson(lines))
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error["row"] for error in report.errors], [2, 3, 4, 5])
+        self.assertEqual(set(report.errors[0]["errors"]), {"type", "thumbnail"})
+        self.assertIn("status", report.errors[3]["errors"])
+
+        film = Film.objects.get(title="Quay")
+        self.assertEqual(film.filmmaker_id, self.maker.pk)
+        self.assertEqual(sorted(film.genre.values_list("name", flat=True)), ["Drama", "Noir"])
+        self.assertEqual(Genre.objects.count(), 2)
+        # bulk_create skips post_save; the importer indexes the films itself
+        self.assertEqual(get_search_backend().search("quay"), [film.pk])
+        self.assertEqual(get_search_backend().search("noir"), [film.pk])
+
+    def test_a_failed_batch_does_not_roll_back_the_others(self):
+        rows = [self.row(f"Film {i}", genre="Drama") for i in range(5)]
+        with mock.patch.object(FilmImporter, "insert_through_rows",
+                               side_effect=[None, DatabaseError("disk I/O error"), None]):
+            report = FilmImporter(filmmaker=self.maker, batch_size=2).run(parse_ndjson(self.ndjson(*rows)))
+        self.assertEqual(report.created, 3)
+        self.assertEqual([error["row"] for error in report.errors], [3, 4])
+        self.assertIn("disk I/O error", report.errors[0]["errors"]["non_field_errors"][0])
+        self.assertEqual(sorted(Film.objects.values_list("title", flat=True)), ["Film 0", "Film 1", "Film 4"])
+        self.assertEqual(set(get_search_backend().search("drama")),
+                         set(Film.objects.values_list("pk", flat=True)))
+
+    def test_filmmaker_column_and_csv(self):
+        lines = [
+            "title,type,thumbnail,filmmaker_email,genre",
+            "Ferry,movie,image/upload/v1/x.jpg,maker@example.com,Drama",
+            "Dock,movie,image/upload/v1/x.jpg,nobody@example.com,",
+        ]
+        report = FilmImporter(allow_filmmaker_column=True).run(parse_csv(lines))
+        self.assertEqual(report.as_dict()["created"], 1)
+        self.assertEqual(report.errors, [{"row": 3, "errors": {"filmmaker_email": ["User does not exist."]}}])
+        self.assertEqual(Film.objects.get(title="Ferry").filmmaker_id, self.maker.pk)
+
+    def test_endpoint_imports_for_the_signed_in_user(self):
+        token = UserRefreshToken.for_user(self.maker).access_token
+        body = "\n".join(self.ndjson(self.row("Pier"), {"title": "Broken"}))
+        response = self.client.post("/flims/bulk-import/", body, content_type="application/x-ndjson",
+                                    headers={"authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()["created"], response.json()["failed"]), (1, 1))
+        self.assertEqual(Film.objects.get(title="Pier").filmmaker_id, self.maker.pk)
+
+
+class WatchProgressTests(TestCase):
+    def setUp(self):
+        self.maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        self.viewer = User.objects.create_user(email="viewer@example.com", password="x", full_name="Viewer", terms_agreed=True)
+        self.films = [
+            Film.objects.create(filmmaker=self.maker, title=f"Film {i}", type="movie",
+                                thumbnail="image/upload/v1/x.jpg", status=FilmStatus.PUBLISHED, duration_s=1000)
+            for i in range(3)
+        ]
+        self.headers = {"authorization": f"Bearer {UserRefreshToken.for_user(self.viewer).access_token}"}
+        # Flushes happen when the tests call flush(), not on the background thread
+        patcher = mock.patch.object(progress.ProgressBuffer, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        progress.progress_buffer.pending.clear()
+        self.addCleanup(progress.progress_buffer.pending.clear)
+        progress._films.clear()
+
+    def heartbeat(self, film, position_s):
+        response = self.client.post(f"/flims/films/{film.pk}/progress/", {"position_s": position_s},
+                                    content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def continue_watching(self):
+        response = self.client.get("/flims/continue-watching/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [(row["film"], row["position_s"]) for row in response.json()["results"]]
+
+    def test_heartbeats_coalesce_into_one_upsert(self):
+        buffer = progress.ProgressBuffer()
+        film = self.films[0]
+        buffer.record(self.viewer.pk, film.pk, 10, 1000)
+        buffer.record(self.viewer.pk, film.pk, 20, 1000)
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 1)
+        buffer.record(self.viewer.pk, film.pk, 960, 1000)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.flush(), 0)
+        row = WatchProgress.objects.get(user=self.viewer, film=film)
+        self.assertEqual((row.position_s, row.completed), (960, True))
+
+    def test_failed_flush_keeps_entries_unless_replaced(self):
+        buffer = progress.ProgressBuffer()
+        first, second = self.films[:2]
+        buffer.record(self.viewer.pk, first.pk, 10, 1000)
+        buffer.record(self.viewer.pk, second.pk, 10, 1000)
+
+        def fail(entries):
+            buffer.record(self.viewer.pk, second.pk, 50, 1000)  # arrives mid-flush
+            raise DatabaseError("database is locked")
+        with mock.patch.object(buffer, "write", side_effect=fail), self.assertRaises(DatabaseError):
+            buffer.flush()
+        self.assertEqual(buffer.pending_for(self.viewer.pk, first.pk)[0].position_s, 10)
+        self.assertEqual(buffer.pending_for(self.viewer.pk, second.pk)[0].position_s, 50)
+
+    def test_continue_watching_overlays_buffered_heartbeats(self):
+        old, newer, finished = self.films
+        for film, position in ((old, 100), (newer, 200), (finished, 300)):
+            self.heartbeat(film, position)
+        progress.progress_buffer.flush()
+        self.assertEqual(self.continue_watching(), [(finished.pk, 300), (newer.pk, 200), (old.pk, 100)])
+
+        # Buffered: old moves ahead and to the top, finished is completed
+        self.heartbeat(old, 400)
+        self.assertEqual(self.heartbeat(finished, 990)["completed"], True)
+        self.assertEqual(self.continue_watching(), [(old.pk, 400), (newer.pk, 200)])
+        response = self.client.get(f"/flims/films/{old.pk}/progress/", headers=self.headers)
+        self.assertEqual(response.json()["position_s"], 400)
+        self.assertEqual(WatchProgress.objects.get(user=self.viewer, film=old).position_s, 100)
+
+        progress.progress_buffer.flush()
+        self.assertEqual(self.continue_watching(), [(old.pk, 400), (newer.pk, 200)])
+
+    def test_first_heartbeat_shows_before_the_flush(self):
+        self.heartbeat(self.films[1], 30)
+        self.assertEqual(self.continue_watching(), [(self.films[1].pk, 30)])
+        self.assertFalse(WatchProgress.objects.exists())
+        missing = self.client.post("/flims/films/nope/progress/", {"position_s": 1},
+                                   content_type="application/json", headers=self.headers)
+        self.assertEqual(missing.status_code, 404)
+
+
+class PlaybackTests(TestCase):
+    def setUp(self):
+        self.maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        # Free, but still in review
+        self.film = Film.objects.create(
+            filmmaker=self.maker, title="Draft", type="movie", thumbnail="image/upload/v1/x.jpg",
+            status=FilmStatus.REVIEW, trailer="video/authenticated/v1/trailers/t.mp4",
+            full_film="video/authenticated/v1/full_films/f.mp4",
+        )
+
+    def auth(self, user):
+        return {"authorization": f"Bearer {UserRefreshToken.for_user(user).access_token}"}
+
+    def test_unpublished_film_is_only_playable_by_staff_and_owner(self):
+        for asset in playback.ASSETS:
+            response = self.client.get(f"/flims/films/{self.film.pk}/playback/?asset={asset}")
+            self.assertEqual(response.status_code, 403, asset)
+        self.assertFalse(self.client.get(f"/flims/films/{self.film.pk}/access/").json()["access"])
+
+        response = self.client.get(f"/flims/films/{self.film.pk}/playback/", headers=self.auth(self.maker))
+        self.assertEqual(response.status_code, 200)
+        access = self.client.get(f"/flims/films/{self.film.pk}/access/", headers=self.auth(self.maker)).json()
+        self.assertEqual(access["kind"], "owner")
+
+        Film.objects.filter(pk=self.film.pk).update(status=FilmStatus.PUBLISHED)
+        self.assertEqual(self.client.get(f"/flims/films/{self.film.pk}/playback/").status_code, 200)
+
+    @override_settings(PLAYBACK_CLOUDINARY_TOKEN_KEY="00112233445566778899aabbccddeeff")
+    def test_redirect_is_signed_and_expires_with_the_playback_url(self):
+        signed = playback.playback_url(self.film.pk, "full_film")
+        response = self.client.get(signed.url)
+        self.assertEqual(response.status_code, 302)
+        location = response["Location"]
+        self.assertIn("/video/authenticated/", location)
+        self.assertIn(f"__cld_token__=exp={signed.expires}~hmac=", location)
+        self.assertEqual(response["Cache-Control"], "private, no-store")
+        self.assertEqual(self.client.get(signed.url.replace("sig=", "sig=x")).status_code, 403)
+
+    def test_play_and_package_signatures_are_not_interchangeable(self):
+        Film.objects.filter(pk=self.film.pk).update(status=FilmStatus.PUBLISHED)
+        play = playback.playback_url(self.film.pk, "trailer", "u1")
+        play_params = dict(part.split("=", 1) for part in play.url.split("?", 1)[1].split("&"))
+        self.assertTrue(playback.verify(self.film.pk, "trailer", play_params))
+        self.assertFalse(playback.verify(self.film.pk, "trailer", play_params, hls=True))
+
+        with override_settings(PLAYBACK_HLS_URL_TTL=playback._url_ttl()):
+            package = playback.package_url(self.film.pk, "trailer", "u1")
+        exp, kid, user, sig = package.url.split("/")[-5:-1]
+        hls_params = {"exp": exp, "kid": kid, "u": user, "sig": sig}
+        self.assertTrue(playback.verify(self.film.pk, "trailer", hls_params, hls=True))
+        self.assertFalse(playback.verify(self.film.pk, "trailer", hls_params))
+        # The package signature replayed on the play URL is refused
+        response = self.client.get(play.url.replace(play_params["sig"], sig))
+        self.assertEqual(response.status_code, 403)
+
+
+class StubEncoder:
+    """Writes tiny playlists and segments instead of running ffmpeg."""
+    calls = 0
+
+    def __init__(self, segment_seconds=6):
+        self.segment_seconds = segment_seconds
+
+    def probe(self, source):
+        if Path(source).read_bytes().startswith(b"BAD"):
+            raise packaging.PackagingError("The source has no video stream.")
+        return {"width": 1280, "height": 720, "duration": 20.0}
+
+    def encode(self, source, rendition, out_dir):
+        type(self).calls += 1
+        lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:6"]
+        for i, seconds in enumerate([6, 6, 6, 2]):
+            (Path(out_dir) / f"seg_{i:05d}.ts").write_bytes(rendition["name"].encode() + bytes([i]))
+            lines += [f"#EXTINF:{seconds}.000,", f"seg_{i:05d}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        (Path(out_dir) / "index.m3u8").write_text("\n".join(lines) + "\n")
+
+
+LADDER = [
+    {"name": "1080p", "height": 1080, "video_bitrate": 5_000_000, "audio_bitrate": 128_000},
+    {"name": "480p", "height": 480, "video_bitrate": 1_400_000, "audio_bitrate": 96_000},
+    {"name": "720p", "height": 720, "video_bitrate": 2_800_000, "audio_bitrate": 128_000},
+]
+
+
+class PackagingTestCase(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name) / "packages"
+        settings_override = override_settings(
+            PACKAGING_ROOT=self.root, PACKAGING_LADDER=LADDER,
+            PACKAGING_ENCODER="movieApp.tests.StubEncoder", PACKAGING_ENCODER_OPTIONS={},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        packaging._packages.clear()
+        self.source = Path(tmp.name) / "upload.mp4"
+        self.source.write_bytes(b"film" * 1000)
+
+    def stage(self, name="session"):
+        copy = self.source.with_name(f"{name}.mp4")
+        copy.write_bytes(self.source.read_bytes())
+        return packaging.stage_source(copy, name)
+
+
+class PackageSourceTests(PackagingTestCase):
+    def test_plan_skips_rungs_taller_than_the_source(self):
+        rungs = packaging.plan(LADDER, 1280, 720)
+        self.assertEqual([(r["name"], r["width"]) for r in rungs], [("720p", 1280), ("480p", 854)])
+        # A source below every rung still gets the smallest one
+        self.assertEqual([r["name"] for r in packaging.plan(LADDER, 320, 180)], ["480p"])
+
+    def test_layout_and_reuse(self):
+        StubEncoder.calls = 0
+        manifest = packaging.package_source(self.source, packaging.options())
+        digest = packaging.file_sha256(self.source)
+        self.assertTrue(manifest["path"].startswith(f"{digest[:2]}/{digest}-"))
+        self.assertEqual(manifest["master"], f"{manifest['path']}/master.m3u8")
+        self.assertEqual([r["name"] for r in manifest["renditions"]], ["720p", "480p"])
+        self.assertEqual((manifest["renditions"][0]["segments"], manifest["renditions"][0]["duration"]), (4, 20.0))
+        package = self.root / manifest["path"]
+        self.assertIn("480p/index.m3u8", (package / "master.m3u8").read_text())
+        self.assertTrue((package / "720p" / "seg_00003.ts").is_file())
+        self.assertEqual(list((self.root / ".tmp").iterdir()), [])
+
+        # The same bytes reuse the package without encoding again
+        self.assertEqual(packaging.package_source(self.stage(), packaging.options()), manifest)
+        self.assertEqual(StubEncoder.calls, 2)
+
+        # A different ladder gets its own package
+        with override_settings(PACKAGING_LADDER=LADDER[1:2]):
+            other = packaging.package_source(self.source, packaging.options())
+        self.assertNotEqual(other["path"], manifest["path"])
+
+
+class PackageRecordTests(PackagingTestCase):
+    def setUp(self):
+        super().setUp()
+        maker = User.objects.create_user(email="maker@example.com", password="x", full_name="Maker", terms_agreed=True)
+        self.film = Film.objects.create(
+            filmmaker=maker, title="Packaged", type="movie", thumbnail="image/upload/v1/x.jpg",
+            status=FilmStatus.PUBLISHED, trailer="video/authenticated/v1/trailers/t.mp4",
+        )
+        self.manifest = packaging.package_source(self.source, packaging.options())
+
+    def test_record_skips_a_replaced_asset(self):
+        self.assertFalse(packaging.record(self.film.pk, "trailer", self.manifest, public_id="trailers/old"))
+        self.film.refresh_from_db()
+        self.assertEqual(self.film.renditions, {})
+
+        self.assertTrue(packaging.record(self.film.pk, "trailer", self.manifest, public_id="trailers/t"))
+        self.film.refresh_from_db()
+        self.assertEqual(self.film.renditions["trailer"]["status"], "ready")
+        self.assertEqual(packaging.package_path(self.film.pk, "trailer"), self.manifest["path"])
+
+    def test_giving_up_records_the_failure_and_deletes_the_staged_source(self):
+        staged = self.stage()
+        package_film = jobs_registry["movieApp.package_film"]
+        package_film.on_give_up(packaging.PackagingError("ffmpeg failed"), self.film.pk, "trailer", str(staged))
+        self.film.refresh_from_db()
+        self.assertEqual(self.film.renditions["trailer"], {"status": "failed", "error": "ffmpeg failed"})
+        self.assertFalse(staged.exists())
+        self.assertIsNone(packaging.package_path(self.film.pk, "trailer"))
+
+    def test_packages_are_only_served_under_a_signed_prefix(self):
+        packaging.record(self.film.pk, "trailer", self.manifest)
+        staged = self.stage()
+        self.assertNotIn("renditions", FilmSerializer(self.film).data)
+
+        response = self.client.get(f"/flims/films/{self.film.pk}/playback/?asset=trailer")
+        hls_url = response.json()["hls_url"]
+        self.assertTrue(hls_url.endswith("/master.m3u8"))
+        response = self.client.get(hls_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, max-age=3600")
+        response.close()
+
+        # Relative playlist and segment URLs resolve under the same prefix
+        prefix = hls_url.rsplit("/", 1)[0]
+        response = self.client.get(f"{prefix}/720p/seg_00000.ts", headers={"range": "bytes=0-3"})
+        self.assertEqual((response.status_code, response["Content-Type"]), (206, "video/mp2t"))
+        response.close()
+
+        self.assertEqual(self.client.get(f"{prefix}/../../incoming/{staged.name}").status_code, 404)
+        tampered = hls_url.replace("/master.m3u8", "x/master.m3u8")
+        self.assertEqual(self.client.get(tampered).status_code, 403)
+        self.assertEqual(self.client.get(f"/hls/{self.manifest['master']}").status_code, 404)
+        self.assertEqual(self.client.get(f"/hls/incoming/{staged.name}").status_code, 404)
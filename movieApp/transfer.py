@@ -0,0 +1,66 @@
+import logging
+
+import cloudinary
+import cloudinary.uploader
+from django.conf import settings
+from django.db import transaction
+
+from . import packaging, uploads
+from .models import Film, UploadSession, UploadStatus
+
+logger = logging.getLogger(__name__)
+
+
+def push_to_media_host(path, field):
+    """Upload an assembled file to Cloudinary and return the stored resource."""
+    model_field = Film._meta.get_field(field)
+    options = dict(model_field.options)
+    options["resource_type"] = model_field.resource_type
+    options["type"] = model_field.type
+    result = cloudinary.uploader.upload_large(str(path), **options)
+    return cloudinary.CloudinaryResource(
+        result["public_id"],
+        format=result.get("format"),
+        version=result.get("version"),
+        type=result.get("type"),
+        resource_type=result.get("resource_type"),
+    )
+
+
+def transfer_session(session_id):
+    """
+    Assemble a fully received upload session and attach it to its film.
+    Raises on failure so the job queue can retry.
+    """
+    session = UploadSession.objects.get(pk=session_id)
+    if session.status == UploadStatus.COMPLETE:
+        return
+
+    path = uploads.assemble(session)
+    UploadSession.objects.filter(pk=session.pk).update(status=UploadStatus.TRANSFERRING)
+    resource = push_to_media_host(path, session.field)
+
+    with transaction.atomic():
+        film = Film.objects.select_for_update().get(pk=session.film_id)
+        setattr(film, session.field, resource)
+        film.save(update_fields=[session.field, "updated_at"])
+        UploadSession.objects.filter(pk=session.pk).update(status=UploadStatus.COMPLETE, error="")
+    if getattr(settings, "PACKAGING_ENABLED", False):
+        # Keep the assembled file for the packaging job instead of deleting it
+        from .tasks import package_film
+        source = packaging.stage_source(path, session.pk)
+        package_film.enqueue(film.pk, session.field, str(source), resource.public_id)
+    uploads.discard(session)
+
+
+def mark_failed(session_id, error):
+    logger.error("Media transfer failed for upload %s: %s", session_id, error)
+    UploadSession.objects.filter(pk=session_id).update(status=UploadStatus.FAILED, error=str(error))
+
+
+def submit_transfer(session):
+    """Queue a fully received session for the background transfer job."""
+    from .tasks import transfer_upload
+
+    UploadSession.objects.filter(pk=session.pk).update(status=UploadStatus.ASSEMBLING)
+    transfer_upload.enqueue(session.pk)
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class ChunkError(Exception):
+    """Raised when a received chunk does not match what the session expects."""
+
+
+def staging_root() -> Path:
+    return Path(getattr(settings, "UPLOAD_STAGING_ROOT", Path(settings.BASE_DIR) / "upload_staging"))
+
+
+def session_dir(session) -> Path:
+    return staging_root() / session.pk
+
+
+def chunk_path(session, index: int) -> Path:
+    return session_dir(session) / f"{index:06d}.part"
+
+
+def assembled_path(session) -> Path:
+    suffix = Path(session.filename).suffix
+    return session_dir(session) / f"assembled{suffix}"
+
+
+def write_chunk(session, index: int, stream, expected_size: int, expected_sha256: str) -> str:
+    """
+    Stream one chunk from `stream` to the staging store, hashing as it goes.
+
+    The chunk is written to a temporary file and renamed into place only
+    after its size and SHA-256 match, so a dropped connection never leaves a
+    partial chunk behind. Each write gets its own temporary file, so
+    concurrent retries of one index never mix their bytes; the last rename
+    wins with a complete chunk. Returns the hex digest.
+    """
+    directory = session_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    final = chunk_path(session, index)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f"{index:06d}.", suffix=".tmp")
+    tmp = Path(tmp)
+
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = stream.read(min(STREAM_BLOCK_SIZE, expected_size - received + 1))
+                if not block:
+                    break
+                received += len(block)
+                if received > expected_size:
+                    raise ChunkError(f"Chunk {index} is larger than {expected_size} bytes.")
+                digest.update(block)
+                out.write(block)
+
+        if received != expected_size:
+            raise ChunkError(f"Chunk {index} has {received} bytes, expected {expected_size}.")
+        if digest.hexdigest() != expected_sha256.lower():
+            raise ChunkError(f"Chunk {index} checksum mismatch.")
+        os.replace(tmp, final)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return digest.hexdigest()
+
+
+def _copy_file(src_fd: int, dst_fd: int, count: int):
+    """
+    Append `count` bytes from src_fd to dst_fd without going through
+    userspace: copy_file_range (reflink/in-kernel copy), then sendfile,
+    then a plain buffered copy for platforms that have neither.
+    """
+    remaining = count
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining:
+                copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            pass
+    if remaining and hasattr(os, "sendfile"):
+        try:
+            offset = count - remaining
+            while remaining:
+                sent = os.sendfile(dst_fd, src_fd, offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        except OSError:
+            pass
+    if remaining:
+        os.lseek(src_fd, count - remaining, os.SEEK_SET)
+        with os.fdopen(os.dup(src_fd), "rb") as src, os.fdopen(os.dup(dst_fd), "ab") as dst:
+            shutil.copyfileobj(src, dst, STREAM_BLOCK_SIZE)
+
+
+def assemble(session) -> Path:
+    """
+    Concatenate all staged chunks into one file and remove the parts.
+    Safe to call again after a failed transfer: an already assembled file
+    is reused.
+    """
+    target = assembled_path(session)
+    parts = [chunk_path(session, index) for index in range(session.total_chunks)]
+    if target.exists() and not any(part.exists() for part in parts):
+        return target
+
+    with open(target, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as src:
+                _copy_file(src.fileno(), out.fileno(), os.fstat(src.fileno()).st_size)
+
+    if target.stat().st_size != session.total_size:
+        target.unlink()
+        raise ChunkError("Assembled file size does not match the declared total size.")
+    for part in parts:
+        part.unlink()
+    return target
+
+
+def discard(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
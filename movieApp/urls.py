@@ -1,7 +1,39 @@
-from django.urls import path
-from .views import FilmUploadView, FilmListView, FilmDetailView
+from django.conf import settings
+from django.urls import path, re_path
+from .views import (
+    FilmUploadView, FilmListView, FilmDetailView, FilmSearchView, FilmViewCountView, FilmBulkImportView, FilmExportView,
+    FilmListAsyncView, FilmDetailAsyncView, WatchProgressView, ContinueWatchingView,
+    FilmAccessView, FilmPurchaseView, FilmPlaybackView, PlaybackView, PackageView,
+    UploadSessionCreateView, UploadSessionDetailView, UploadChunkView, UploadCompleteView,
+)
+
+# Native async views under ASGI (see ASYNC_VIEWS in settings)
+film_list_view = FilmListAsyncView if settings.ASYNC_VIEWS else FilmListView
+film_detail_view = FilmDetailAsyncView if settings.ASYNC_VIEWS else FilmDetailView
+
 urlpatterns = [
-    path('films-list/', FilmListView.as_view(), name='film-list'),
-    path('films/<str:pk>/', FilmDetailView.as_view(), name='film-detail'),
+    path('films-list/', film_list_view.as_view(), name='film-list'),
+    path('films/<str:pk>/', film_detail_view.as_view(), name='film-detail'),
+    path('films/<str:pk>/view/', FilmViewCountView.as_view(), name='film-view'),
+    path('films/<str:pk>/progress/', WatchProgressView.as_view(), name='film-progress'),
+    path('films/<str:pk>/access/', FilmAccessView.as_view(), name='film-access'),
+    path('films/<str:pk>/rent/', FilmPurchaseView.as_view(kind='rent'), name='film-rent'),
+    path('films/<str:pk>/buy/', FilmPurchaseView.as_view(kind='buy'), name='film-buy'),
+    path('films/<str:pk>/playback/', FilmPlaybackView.as_view(), name='film-playback'),
+    path('play/<str:pk>/<str:asset>/', PlaybackView.as_view(), name='film-play'),
+    re_path(
+        r'^hls/(?P<pk>[^/]+)/(?P<asset>[^/]+)/(?P<exp>\d+)/(?P<kid>[^/]+)/(?P<user>[^/]+)/(?P<sig>[^/]+)/(?P<path>.+)$',
+        PackageView.as_view(), name='film-hls',
+    ),
+    path('continue-watching/', ContinueWatchingView.as_view(), name='continue-watching'),
     path('upload/', FilmUploadView.as_view(), name='film-upload'),
+    path('bulk-import/', FilmBulkImportView.as_view(), name='film-bulk-import'),
+    path('search/', FilmSearchView.as_view(), name='film-search'),
+    path('export/', FilmExportView.as_view(), name='film-export'),
+
+    # Resumable chunked uploads: init -> put chunks -> complete
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-create'),
+    path('uploads/<str:pk>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('uploads/<str:pk>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<str:pk>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
 ]
\ No newline at end of file
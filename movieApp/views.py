@@ -1,8 +1,32 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .models import Film
-from .serializers import FilmSerializer
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .models import Film, FilmStatus, UploadSession, UploadChunk, UploadStatus, WatchProgress
+from .serializers import (
+    FilmSerializer, FilmListSerializer, UploadSessionSerializer, HeartbeatSerializer, WatchProgressSerializer,
+)
+from . import uploads
+from .transfer import submit_transfer
+from .counters import view_counter
+from .progress import continue_watching, film_duration, progress_buffer
+from . import entitlements, packaging, playback
+from .cache import aget_film_detail, get_film_detail
+from .ingest import FilmImporter, parse_csv, parse_ndjson
+import codecs
+from datetime import datetime, timezone as dt_timezone
+from .pagination import FilmCursorPagination
+from .filters import filter_films
+from .search import get_search_backend
+from .export import EXPORT_FORMATS, PUBLIC_STATUSES, aiter_chunks, export_catalog
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from core.async_views import AsyncAPIView
+from core.media import serve as serve_media
 
 class FilmUploadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -15,28 +39,309 @@ class FilmUploadView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class FilmBulkImportView(APIView):
+    """
+    Import many films for the current user in one request. Send NDJSON
+    (application/x-ndjson) or CSV (text/csv) as the body, or as a multipart
+    'file' upload. Rows that fail validation are reported, the rest are saved.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if request.content_type.startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"message": "A 'file' upload is required."}, status=status.HTTP_400_BAD_REQUEST)
+            is_csv = upload.name.lower().endswith('.csv') or request.data.get('format') == 'csv'
+            lines = codecs.iterdecode(upload, 'utf-8')
+        else:
+            if request.stream is None:
+                return Response({"message": "Request body is empty."}, status=status.HTTP_400_BAD_REQUEST)
+            is_csv = request.content_type.startswith('text/csv')
+            lines = codecs.iterdecode(request.stream, 'utf-8')
+
+        rows = parse_csv(lines) if is_csv else parse_ndjson(lines)
+        try:
+            report = FilmImporter(filmmaker=request.user).run(rows)
+        except UnicodeDecodeError:
+            return Response({"message": "File must be UTF-8 encoded."}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST
+        return Response(report.as_dict(), status=response_status)
+
+
 class FilmListView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request):
-        films = Film.objects.all()
-        serializer = FilmSerializer(films, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        films, ordering = filter_films(Film.objects.catalog(), request.query_params)
+        paginator = FilmCursorPagination(ordering=ordering)
+        films = paginator.paginate_queryset(films, request)
+        serializer = FilmListSerializer(films, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         return FilmUploadView.as_view()(request)
     
+class FilmSearchView(APIView):
+    permission_classes = [permissions.AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"message": "Search query 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.max_limit)
+        except ValueError:
+            return Response({"message": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        prefix = request.query_params.get('prefix', '').lower() in ('1', 'true', 'yes')
+
+        # Only staff may find films that are not published
+        film_status = None if request.user.is_staff else FilmStatus.PUBLISHED
+        film_ids = get_search_backend().search(query, limit=max(limit, 1), prefix=prefix, status=film_status)
+        films = Film.objects.catalog().filter(pk__in=film_ids)
+        if film_status is not None:
+            films = films.filter(status=film_status)
+        films = {film.pk: film for film in films}
+        # Keep the backend's ranking order
+        ranked = [films[film_id] for film_id in film_ids if film_id in films]
+        serializer = FilmListSerializer(ranked, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
+
+
+class FilmViewCountView(APIView):
+    """
+    Record one play of a film. The increment is buffered and written in
+    batches by the view counter, so this never updates the Film row itself.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, pk):
+        views = Film.objects.filter(pk=pk).values_list('views', flat=True).first()
+        if views is None:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        view_counter.increment(pk)
+        return Response({"views": views + view_counter.pending_for(pk)}, status=status.HTTP_202_ACCEPTED)
+
+
+class WatchProgressView(APIView):
+    """
+    Player heartbeats (POST) and the resume position (GET) for one film.
+    Heartbeats are coalesced per (user, film) by the progress buffer and
+    written in batches, so POST does not touch the WatchProgress table.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        pending = progress_buffer.pending_for(request.user.pk, pk)
+        progress = pending[0] if pending else WatchProgress.objects.filter(user=request.user, film_id=pk).first()
+        if progress is None:
+            return Response({"film": pk, "position_s": 0, "percent": 0, "completed": False}, status=status.HTTP_200_OK)
+        return Response({
+            "film": pk,
+            "position_s": progress.position_s,
+            "duration_s": progress.duration_s,
+            "percent": progress.percent,
+            "completed": progress.completed,
+            "last_watched_at": progress.last_watched_at,
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request, pk):
+        serializer = HeartbeatSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        duration = film_duration(pk)
+        if duration is None:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        data = serializer.validated_data
+        progress = progress_buffer.record(
+            request.user.pk, pk, data["position_s"], duration or data.get("duration_s", 0), data["completed"],
+        )
+        return Response({
+            "position_s": progress.position_s,
+            "percent": progress.percent,
+            "completed": progress.completed,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ContinueWatchingView(APIView):
+    """The signed-in user's unfinished films, most recently watched first."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), settings.CONTINUE_WATCHING_MAX)
+        except ValueError:
+            return Response({"message": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        rows = continue_watching(request.user, limit)
+        return Response({"results": WatchProgressSerializer(rows, many=True).data}, status=status.HTTP_200_OK)
+
+
+class EntitlementMixin:
+    # Everything access checks and sales read from the film
+    film_fields = ("id", "filmmaker_id", "status", "currency", "rent_price", "rental_hours", "buy_price")
+
+    def get_film(self, pk):
+        return Film.objects.only(*self.film_fields).filter(pk=pk).first()
+
+
+class FilmAccessView(EntitlementMixin, APIView):
+    """Whether the requester may play a film, and until when."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        film = self.get_film(pk)
+        if film is None:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        access = entitlements.access_for(request.user, film)
+        return Response({
+            "film": pk,
+            "access": access is not None,
+            "kind": access.kind if access else None,
+            "expires_at": access.expires_at if access else None,
+        }, status=status.HTTP_200_OK)
+
+
+class FilmPurchaseView(EntitlementMixin, APIView):
+    """
+    Rent (kind="rent") or buy (kind="buy") a published film. Payment capture
+    happens before this is called; this records the sale and grants access.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    kind = None
+
+    def post(self, request, pk):
+        film = self.get_film(pk)
+        if film is None or film.status != FilmStatus.PUBLISHED:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        price = film.rent_price if self.kind == "rent" else film.buy_price
+        if not price:
+            return Response({"message": f"This film is not available to {self.kind}."}, status=status.HTTP_400_BAD_REQUEST)
+        if self.kind == "rent":
+            record, created = entitlements.rent(request.user, film)
+            expires_at = record.expires_at
+        else:
+            record, created = entitlements.buy(request.user, film)
+            expires_at = None
+        return Response({
+            "message": "Access granted." if created else "You already have access to this film.",
+            "film": pk,
+            "kind": "rental" if self.kind == "rent" else "purchase",
+            "price": record.price,
+            "currency": record.currency,
+            "expires_at": expires_at,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class FilmPlaybackView(EntitlementMixin, APIView):
+    """
+    A short-lived signed URL for a film's trailer (anyone, once published) or
+    full film (anyone with access, once published). Staff and the owner may
+    play either in any status. ?asset= picks one; the default is full_film.
+    """
+    permission_classes = [permissions.AllowAny]
+    film_fields = EntitlementMixin.film_fields + ("trailer", "full_film", "renditions")
+
+    def get(self, request, pk):
+        asset = request.query_params.get("asset", "full_film")
+        if asset not in playback.ASSETS:
+            return Response({"message": f"asset must be one of: {', '.join(playback.ASSETS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        film = self.get_film(pk)
+        if film is None or not getattr(film, asset):
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        if asset == "trailer":
+            allowed = film.status == FilmStatus.PUBLISHED or entitlements.privileged_access(user, film) is not None
+        else:
+            allowed = entitlements.has_access(user, film)
+        if not allowed:
+            return Response({"message": "You do not have access to this film."}, status=status.HTTP_403_FORBIDDEN)
+        user_id = user.pk if user.is_authenticated else ""
+        signed = playback.playback_url(pk, asset, user_id)
+        hls = None
+        if film.renditions.get(asset, {}).get("status") == "ready":
+            hls = playback.package_url(pk, asset, user_id)
+        return Response({
+            "url": request.build_absolute_uri(signed.url),
+            "expires_at": datetime.fromtimestamp(signed.expires, tz=dt_timezone.utc),
+            "hls_url": request.build_absolute_uri(hls.url) if hls else None,
+            "hls_expires_at": datetime.fromtimestamp(hls.expires, tz=dt_timezone.utc) if hls else None,
+        }, status=status.HTTP_200_OK)
+
+
+class PlaybackView(APIView):
+    """
+    Stand-in media server: checks a playback URL's signature, then serves the
+    asset from PLAYBACK_MEDIA_ROOT (with byte ranges, for seeking) or sends
+    the player to a signed Cloudinary URL that expires with the playback
+    URL. No session or token is needed, only the signature, which every
+    range request re-checks.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request, pk, asset):
+        if not playback.verify(pk, asset, request.query_params):
+            return Response({"detail": "Invalid or expired playback URL"}, status=status.HTTP_403_FORBIDDEN)
+        resource = Film.objects.filter(pk=pk).values_list(asset, flat=True).first()
+        if not resource:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        if settings.PLAYBACK_MEDIA_ROOT:
+            name = f"{resource.public_id}.{resource.format}" if resource.format else resource.public_id
+            return serve_media(request, name, settings.PLAYBACK_MEDIA_ROOT, cache_control="private, max-age=3600")
+        response = HttpResponseRedirect(playback.media_host_url(resource, int(request.query_params["exp"])))
+        # The target is signed for this user; shared caches must not reuse it
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+
+class PackageView(APIView):
+    """
+    HLS playlists and segments of a film's package. The signature is a path
+    prefix (movieApp.playback.package_url), so the relative URLs in the
+    playlists carry it too and every request is checked. Only the film's
+    own ready package is reachable, never the rest of PACKAGING_ROOT.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request, pk, asset, exp, kid, user, sig, path):
+        params = {"exp": exp, "kid": kid, "sig": sig, "u": "" if user == playback.ANONYMOUS else user}
+        if not playback.verify(pk, asset, params, hls=True):
+            return Response({"detail": "Invalid or expired playback URL"}, status=status.HTTP_403_FORBIDDEN)
+        directory = packaging.package_path(pk, asset)
+        if directory is None:
+            return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+        # Paid content behind per-user URLs: browsers may keep it, shared caches may not
+        return serve_media(request, path, packaging.packaging_root() / directory, cache_control="private, max-age=3600")
+
+
 class FilmDetailView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    @staticmethod
+    def build_detail(pk):
+        film = Film.objects.prefetch_related('genre').filter(pk=pk).first()
+        if film is None:
+            return None
+        return FilmSerializer(film).data, film.updated_at
+
     def get(self, request, pk):
-        try:
-            film = Film.objects.get(pk=pk)
-            serializer = FilmSerializer(film)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Film.DoesNotExist:
+        cached = get_film_detail(pk, self.build_detail)
+        if cached is None:
             return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        response = Response(cached.data, status=status.HTTP_200_OK)
+        response['ETag'] = cached.etag
+        response['Last-Modified'] = http_date(cached.last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return get_conditional_response(
+            request, etag=cached.etag, last_modified=int(cached.last_modified), response=response,
+        )
+
     def put(self, request, pk):
         try:
             film = Film.objects.get(pk=pk)
@@ -55,3 +360,191 @@ class FilmDetailView(APIView):
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Film.DoesNotExist:
             return Response({"detail": "Film not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+class FilmExportView(APIView):
+    """
+    Stream the whole catalog as NDJSON (default) or a JSON array
+    (?output=json; DRF reserves ?format). Rows are serialized as they are read, so memory stays
+    flat however large the catalog is. Gzipped when the client accepts it.
+    Staff can pass ?status=review,rejected; everyone else gets published films.
+    Under ASGI the body is an async iterator, so it streams there too.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 2000
+
+    def get(self, request):
+        file_format = request.query_params.get('output', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"message": f"output must be one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = PUBLIC_STATUSES
+        if request.user.is_staff:
+            requested = [value for value in request.query_params.get('status', '').split(',') if value]
+            statuses = requested or None
+
+        compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        chunks = export_catalog(file_format, statuses, chunk_size=self.chunk_size, compress=compress)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiter_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[file_format])
+        extension = 'ndjson' if file_format == 'ndjson' else 'json'
+        response['Content-Disposition'] = f'attachment; filename="films.{extension}"'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class FilmListAsyncView(AsyncAPIView):
+    """FilmListView for ASGI: the page is read with the async ORM, uploads go to the sync view."""
+
+    async def get(self, request):
+        films, ordering = filter_films(Film.objects.catalog(), request.query_params)
+        paginator = FilmCursorPagination(ordering=ordering)
+        films = await paginator.apaginate_queryset(films, request)
+        serializer = FilmListSerializer(films, many=True)
+        return {"next": paginator.get_next_link(), "results": serializer.data}
+
+    async def post(self, request):
+        return await self.delegate(FilmUploadView, request)
+
+
+class FilmDetailAsyncView(AsyncAPIView):
+    """FilmDetailView for ASGI: cached reads stay on the event loop, writes go to the sync view."""
+
+    @staticmethod
+    async def abuild_detail(pk):
+        film = await Film.objects.prefetch_related('genre').filter(pk=pk).afirst()
+        if film is None:
+            return None
+        return FilmSerializer(film).data, film.updated_at
+
+    async def get(self, request, pk):
+        cached = await aget_film_detail(pk, self.abuild_detail)
+        if cached is None:
+            return self.render({"detail": "Film not found"}, status.HTTP_404_NOT_FOUND)
+
+        response = self.render(cached.data)
+        response['ETag'] = cached.etag
+        response['Last-Modified'] = http_date(cached.last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return get_conditional_response(
+            request, etag=cached.etag, last_modified=int(cached.last_modified), response=response,
+        )
+
+    async def put(self, request, pk):
+        return await self.delegate(FilmDetailView, request, pk=pk)
+
+    async def delete(self, request, pk):
+        return await self.delegate(FilmDetailView, request, pk=pk)
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a resumable upload. The client then PUTs each chunk and calls
+    complete; GET on the session lists received chunks so it can resume.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            session = serializer.save(
+                uploader=request.user,
+                chunk_size=getattr(settings, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+            )
+            return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionMixin:
+    def get_session(self, request, pk):
+        try:
+            return UploadSession.objects.get(pk=pk, uploader=request.user)
+        except UploadSession.DoesNotExist:
+            return None
+
+
+class UploadSessionDetailView(UploadSessionMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        uploads.discard(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkView(UploadSessionMixin, APIView):
+    """
+    PUT the raw bytes of one chunk with an X-Chunk-SHA256 header. The body is
+    streamed straight to the staging store and never parsed or buffered.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, pk, index):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        if session.status != UploadStatus.RECEIVING:
+            return Response({"message": f"Upload is {session.status}."}, status=status.HTTP_409_CONFLICT)
+        if index >= session.total_chunks:
+            return Response({"message": "Chunk index out of range."}, status=status.HTTP_400_BAD_REQUEST)
+
+        checksum = request.headers.get('X-Chunk-SHA256')
+        if not checksum:
+            return Response({"message": "X-Chunk-SHA256 header is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        existing = session.chunks.filter(index=index).first()
+        if existing and existing.sha256 == checksum.lower():
+            # Already stored (a retried request); nothing to do
+            return Response({"index": index, "sha256": existing.sha256}, status=status.HTTP_200_OK)
+
+        expected_size = session.expected_chunk_size(index)
+        stream = request.stream
+        if stream is None:
+            return Response({"message": "Chunk body is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            digest = uploads.write_chunk(session, index, stream, expected_size, checksum)
+        except uploads.ChunkError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        UploadChunk.objects.update_or_create(
+            session=session, index=index,
+            defaults={"size": expected_size, "sha256": digest},
+        )
+        return Response({"index": index, "sha256": digest}, status=status.HTTP_201_CREATED)
+
+
+class UploadCompleteView(UploadSessionMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            try:
+                session = UploadSession.objects.select_for_update().get(pk=pk, uploader=request.user)
+            except UploadSession.DoesNotExist:
+                return Response({"detail": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+            if session.status != UploadStatus.RECEIVING:
+                return Response(UploadSessionSerializer(session).data, status=status.HTTP_202_ACCEPTED)
+
+            received = set(session.chunks.values_list("index", flat=True))
+            missing = [i for i in range(session.total_chunks) if i not in received]
+            if missing:
+                return Response(
+                    {"message": "Upload is incomplete.", "missing_chunks": missing},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            submit_transfer(session)
+
+        session.refresh_from_db()
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_202_ACCEPTED)